@@ -0,0 +1,202 @@
+"""
+Admission control for the orchestration endpoints.
+
+Without a limit, a slow Groq or Murf lets /chat and /process_speech pile up
+unbounded concurrent work. Memory grows and every request slows down
+together. AdmissionController caps concurrent requests at an adaptive limit:
+
+- A request over the limit waits in a bounded FIFO queue.
+- If the queue is full, it is turned away at once with 429.
+- If it waits longer than ADMISSION_QUEUE_TIMEOUT_SECONDS, it gets 503.
+- Both responses carry a Retry-After.
+
+The limit follows observed request latency, which is the sum of the pipeline
+stages behind the endpoint. A short-term average is compared with a long-term
+one:
+- While the short-term average stays within ADMISSION_LATENCY_TOLERANCE times
+  the long-term one and the limit is actually in use, the limit grows
+  additively.
+- When latency rises past that tolerance, the limit shrinks in proportion to
+  the latency ratio.
+- 5xx responses (upstream outages, a saturated decoder pool) cut the limit
+  multiplicatively.
+- Requests the client abandons (cancelled, disconnected) free their slot
+  without feeding the limiter, since they say nothing about capacity.
+
+The long-term average keeps moving, so after a lasting shift in upstream
+latency the limit recovers to whatever concurrency the new latency sustains.
+"""
+import asyncio
+import math
+import os
+import time
+from collections import deque
+from typing import Any, Dict, Iterable, Optional
+
+from starlette.requests import ClientDisconnect
+from starlette.responses import JSONResponse
+
+import metrics
+
+ADMISSION_ENABLED = os.getenv('ADMISSION_ENABLED', 'true').lower() == 'true'
+ADMISSION_INITIAL_LIMIT = float(os.getenv('ADMISSION_INITIAL_LIMIT', '32'))
+ADMISSION_MIN_LIMIT = float(os.getenv('ADMISSION_MIN_LIMIT', '4'))
+ADMISSION_MAX_LIMIT = float(os.getenv('ADMISSION_MAX_LIMIT', '256'))
+ADMISSION_QUEUE_SIZE = int(os.getenv('ADMISSION_QUEUE_SIZE', '64'))
+ADMISSION_QUEUE_TIMEOUT_SECONDS = float(os.getenv('ADMISSION_QUEUE_TIMEOUT_SECONDS', '2'))
+ADMISSION_LATENCY_TOLERANCE = float(os.getenv('ADMISSION_LATENCY_TOLERANCE', '2.0'))
+ADMISSION_ERROR_BACKOFF = float(os.getenv('ADMISSION_ERROR_BACKOFF', '0.9'))
+ADMISSION_SHORT_ALPHA = 0.2    # short-term latency average: roughly the last 10 requests
+ADMISSION_LONG_ALPHA = 0.002   # long-term latency average: roughly the last 500 requests
+ADMISSION_SMOOTHING = 0.2      # fraction of a latency-driven decrease applied per completed request
+ADMISSION_MAX_RETRY_AFTER_SECONDS = 30
+
+ADMISSION_LIMIT = metrics.gauge('admission_limit', 'Current adaptive concurrency limit.')
+ADMISSION_IN_FLIGHT = metrics.gauge('admission_in_flight', 'Admitted requests currently running.')
+ADMISSION_QUEUED = metrics.gauge('admission_queued', 'Requests waiting for admission.')
+ADMISSION_REJECTIONS = metrics.counter('admission_rejections_total', 'Requests turned away (queue_full: 429, queue_timeout: 503).', ('reason',))
+ADMISSION_QUEUE_WAIT = metrics.histogram('admission_queue_wait_seconds', 'Time admitted requests spent queued.',
+                                         buckets=(0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 5.0))
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, status_code: int, detail: str, retry_after: int):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    def __init__(self, initial_limit: float = ADMISSION_INITIAL_LIMIT, min_limit: float = ADMISSION_MIN_LIMIT,
+                 max_limit: float = ADMISSION_MAX_LIMIT, queue_size: int = ADMISSION_QUEUE_SIZE,
+                 queue_timeout: float = ADMISSION_QUEUE_TIMEOUT_SECONDS, tolerance: float = ADMISSION_LATENCY_TOLERANCE):
+        self.limit = initial_limit
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.tolerance = tolerance
+        self.in_flight = 0
+        self._waiters: "deque[asyncio.Future]" = deque()
+        self._short_latency: Optional[float] = None
+        self._long_latency: Optional[float] = None
+        self._publish()
+
+    def _publish(self):
+        ADMISSION_LIMIT.set(self.limit)
+        ADMISSION_IN_FLIGHT.set(self.in_flight)
+        ADMISSION_QUEUED.set(len(self._waiters))
+
+    def _retry_after(self) -> int:
+        """Seconds until a slot is likely free: about one request's latency, at least 1."""
+        return max(1, min(ADMISSION_MAX_RETRY_AFTER_SECONDS, math.ceil(self._short_latency or 1.0)))
+
+    async def acquire(self):
+        """Waits for a slot; raises AdmissionRejected when the queue is full or the wait times out."""
+        if self.in_flight < int(self.limit) and not self._waiters:
+            self.in_flight += 1
+            self._publish()
+            return
+        if len(self._waiters) >= self.queue_size:
+            ADMISSION_REJECTIONS.inc(reason='queue_full')
+            raise AdmissionRejected(429, "Too many requests in progress, please retry", self._retry_after())
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self._publish()
+        start = time.monotonic()
+        try:
+            await asyncio.wait_for(waiter, self.queue_timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done() and not waiter.cancelled():
+                # A slot was handed over just as we gave up; pass it on.
+                self._release_slot()
+            else:
+                try:
+                    self._waiters.remove(waiter)
+                except ValueError:
+                    pass
+                self._publish()
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            ADMISSION_REJECTIONS.inc(reason='queue_timeout')
+            raise AdmissionRejected(503, "Server is busy, please retry", self._retry_after())
+        ADMISSION_QUEUE_WAIT.observe(time.monotonic() - start)
+
+    def _release_slot(self):
+        self.in_flight -= 1
+        while self._waiters and self.in_flight < int(self.limit):
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+        self._publish()
+
+    def release(self, latency: float, failed: bool = False):
+        """Frees a slot and adapts the limit to the finished request's latency and outcome."""
+        busy = self.in_flight >= self.limit / 2
+        if self._short_latency is None:
+            self._short_latency = self._long_latency = latency
+        else:
+            self._short_latency += ADMISSION_SHORT_ALPHA * (latency - self._short_latency)
+            self._long_latency += ADMISSION_LONG_ALPHA * (latency - self._long_latency)
+        if failed:
+            self.limit *= ADMISSION_ERROR_BACKOFF
+        else:
+            gradient = min(1.0, self.tolerance * self._long_latency / max(self._short_latency, 1e-6))
+            if gradient < 1.0:
+                self.limit -= ADMISSION_SMOOTHING * self.limit * (1.0 - max(gradient, 0.5))
+            elif busy:
+                self.limit += 1.0 / self.limit
+        self.limit = min(self.max_limit, max(self.min_limit, self.limit))
+        self._release_slot()
+
+    def abandon(self):
+        """Frees a slot whose request ended without an outcome, leaving the limit and latency averages alone."""
+        self._release_slot()
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "limit": round(self.limit, 1), "in_flight": self.in_flight, "queued": len(self._waiters),
+            "short_latency_seconds": round(self._short_latency or 0.0, 3),
+            "long_latency_seconds": round(self._long_latency or 0.0, 3),
+        }
+
+
+class AdmissionMiddleware:
+    """ASGI middleware admitting HTTP requests to `paths` through `controller`."""
+
+    def __init__(self, app, controller: AdmissionController, paths: Iterable[str]):
+        self.app = app
+        self.controller = controller
+        self.paths = frozenset(paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or scope['path'] not in self.paths:
+            return await self.app(scope, receive, send)
+        try:
+            await self.controller.acquire()
+        except AdmissionRejected as e:
+            response = JSONResponse({"detail": e.detail}, status_code=e.status_code,
+                                    headers={"Retry-After": str(e.retry_after)})
+            return await response(scope, receive, send)
+
+        status = None
+
+        async def send_with_status(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+            await send(message)
+
+        start = time.monotonic()
+        try:
+            await self.app(scope, receive, send_with_status)
+        except (asyncio.CancelledError, ClientDisconnect):
+            self.controller.abandon()
+            raise
+        except BaseException:
+            self.controller.release(time.monotonic() - start, failed=True)
+            raise
+        self.controller.release(time.monotonic() - start, failed=status is not None and status >= 500)
@@ -0,0 +1,113 @@
+"""
+TTS output format negotiation and local transcoding.
+
+Clients name the formats they can play, most preferred first (e.g. "opus,mp3"),
+optionally with a sample rate ("opus@16000"). Formats Murf can produce directly
+are requested upstream as-is; the rest (Opus, or rates Murf does not offer) are
+requested as FLAC and transcoded locally by ffmpeg, with a bounded number of
+concurrent ffmpeg processes.
+"""
+import asyncio
+import logging
+import os
+from typing import Optional, NamedTuple
+
+logger = logging.getLogger('MultiAgentOrchestrator')
+
+TTS_DEFAULT_FORMAT = os.getenv('TTS_DEFAULT_FORMAT', 'mp3@24000')
+TRANSCODE_CONCURRENCY = int(os.getenv('TRANSCODE_CONCURRENCY', str(os.cpu_count() or 2)))
+TRANSCODE_TIMEOUT_SECONDS = float(os.getenv('TRANSCODE_TIMEOUT_SECONDS', '10'))
+
+MURF_FORMATS = {'wav': 'WAV', 'mp3': 'MP3', 'flac': 'FLAC', 'ogg': 'OGG'}
+MURF_SAMPLE_RATES = (8000, 24000, 44100, 48000)
+# format name -> (ffmpeg codec, ffmpeg container, file extension)
+FFMPEG_CODECS = {
+    'opus': ('libopus', 'ogg', 'opus'),
+    'mp3': ('libmp3lame', 'mp3', 'mp3'),
+    'ogg': ('libvorbis', 'ogg', 'ogg'),
+    'wav': ('pcm_s16le', 'wav', 'wav'),
+    'flac': ('flac', 'flac', 'flac'),
+}
+DEFAULT_SAMPLE_RATES = {'opus': 24000, 'wav': 24000}
+MAX_SAMPLE_RATE = 48000
+
+
+class AudioFormat(NamedTuple):
+    name: str
+    sample_rate: int
+    upstream_format: str
+    upstream_sample_rate: int
+
+    @property
+    def needs_transcode(self) -> bool:
+        return MURF_FORMATS.get(self.name) != self.upstream_format or self.sample_rate != self.upstream_sample_rate
+
+    @property
+    def extension(self) -> str:
+        return FFMPEG_CODECS[self.name][2]
+
+
+def _parse(spec: str):
+    name, _, rate = spec.strip().lower().partition('@')
+    if name not in FFMPEG_CODECS:
+        return None
+    try:
+        sample_rate = int(rate) if rate else DEFAULT_SAMPLE_RATES.get(name, 24000)
+    except ValueError:
+        return None
+    if not 8000 <= sample_rate <= MAX_SAMPLE_RATE:
+        return None
+    return name, sample_rate
+
+
+def _resolve(name: str, sample_rate: int, allow_transcode: bool) -> Optional[AudioFormat]:
+    if name in MURF_FORMATS and sample_rate in MURF_SAMPLE_RATES:
+        return AudioFormat(name, sample_rate, MURF_FORMATS[name], sample_rate)
+    if not allow_transcode:
+        return None
+    # Ask Murf for lossless audio at the nearest rate that is not lower, then transcode.
+    upstream_rate = next((r for r in MURF_SAMPLE_RATES if r >= sample_rate), MURF_SAMPLE_RATES[-1])
+    return AudioFormat(name, sample_rate, 'FLAC', upstream_rate)
+
+
+def negotiate_format(preferences: Optional[str], allow_transcode: bool = True) -> AudioFormat:
+    """Picks the first acceptable format from a comma-separated preference list, else the server default."""
+    for spec in (preferences or '').split(','):
+        parsed = _parse(spec)
+        if parsed:
+            audio_format = _resolve(*parsed, allow_transcode)
+            if audio_format:
+                return audio_format
+    name, sample_rate = _parse(TTS_DEFAULT_FORMAT) or ('mp3', 24000)
+    return _resolve(name, sample_rate, allow_transcode) or AudioFormat('mp3', 24000, 'MP3', 24000)
+
+
+_transcode_slots: Optional[asyncio.Semaphore] = None
+
+
+async def transcode(data: bytes, audio_format: AudioFormat) -> bytes:
+    """Converts upstream audio to `audio_format` with ffmpeg over pipes; at most TRANSCODE_CONCURRENCY run at once."""
+    global _transcode_slots
+    if _transcode_slots is None:
+        _transcode_slots = asyncio.Semaphore(TRANSCODE_CONCURRENCY)
+    codec, container, _ = FFMPEG_CODECS[audio_format.name]
+    command = ['ffmpeg', '-hide_banner', '-loglevel', 'error', '-i', 'pipe:0',
+               '-ac', '1', '-ar', str(audio_format.sample_rate), '-c:a', codec]
+    if codec == 'libopus':
+        command += ['-b:a', '24k', '-application', 'voip']
+    command += ['-f', container, 'pipe:1']
+    async with _transcode_slots:
+        process = await asyncio.create_subprocess_exec(
+            *command, stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
+        try:
+            stdout, stderr = await asyncio.wait_for(process.communicate(data), TRANSCODE_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            raise RuntimeError(f"Transcoding to {audio_format.name} timed out")
+        finally:
+            # Timed out or cancelled: do not leave ffmpeg running, or give up the slot, while it still is.
+            if process.returncode is None:
+                process.kill()
+                await process.wait()
+    if process.returncode != 0:
+        raise RuntimeError(f"Transcoding to {audio_format.name} failed: {stderr.decode(errors='replace')}")
+    return stdout
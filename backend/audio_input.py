@@ -0,0 +1,158 @@
+"""
+Normalizes uploaded recordings to the 16kHz mono 16-bit WAV the STT backends expect.
+
+Uploads are identified by their leading bytes rather than by filename or content
+type. PCM WAV is handled in-process: passed through untouched when it is already
+in the target format, otherwise downmixed and resampled with NumPy. Only
+compressed or container formats (WebM/Opus, Ogg, MP3, MP4, ...) and WAV
+encodings the `wave` module cannot read are decoded, by the persistent decoder
+pool when one is running and by the ffmpeg CLI otherwise.
+"""
+import asyncio
+import logging
+import os
+import subprocess
+import wave
+from typing import Optional
+
+import metrics
+
+logger = logging.getLogger('MultiAgentOrchestrator')
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+TARGET_SAMPLE_RATE = 16000
+RESAMPLE_FILTER_TAPS = 63
+
+AUDIO_CONVERSIONS = metrics.counter(
+    'audio_input_conversions_total', 'Uploaded recordings normalized for STT, by container and conversion path.',
+    ('container', 'path'))
+
+
+def sniff_container(header: bytes) -> str:
+    """Best guess at an upload's container from its first bytes; 'unknown' when nothing matches."""
+    if header[:4] == b'RIFF' and header[8:12] == b'WAVE':
+        return 'wav'
+    if header[:4] == b'\x1a\x45\xdf\xa3':
+        return 'webm'  # EBML: WebM or Matroska
+    if header[:4] == b'OggS':
+        return 'ogg'
+    if header[:4] == b'fLaC':
+        return 'flac'
+    if header[4:8] == b'ftyp':
+        return 'mp4'
+    if header[:3] == b'ID3' or (len(header) > 1 and header[0] == 0xFF and header[1] & 0xE0 == 0xE0):
+        return 'mp3'
+    return 'unknown'
+
+
+def _pcm_to_float(data: bytes, sample_width: int, channels: int):
+    """Interleaved little-endian PCM as a (frames, channels) float32 array in [-1, 1)."""
+    if sample_width == 1:
+        samples = (np.frombuffer(data, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+    elif sample_width == 2:
+        samples = np.frombuffer(data, dtype='<i2').astype(np.float32) / 32768.0
+    elif sample_width == 3:
+        raw = np.frombuffer(data, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        ints = raw[:, 0] | (raw[:, 1] << 8) | (raw[:, 2] << 16)
+        samples = (np.where(ints & 0x800000, ints - (1 << 24), ints)).astype(np.float32) / 8388608.0
+    elif sample_width == 4:
+        samples = np.frombuffer(data, dtype='<i4').astype(np.float32) / 2147483648.0
+    else:
+        raise ValueError(f"Unsupported sample width: {sample_width}")
+    return samples[:len(samples) - len(samples) % channels].reshape(-1, channels)
+
+
+def _lowpass(signal, cutoff: float):
+    """Windowed-sinc FIR low-pass; `cutoff` is a fraction of the input sample rate (0..0.5)."""
+    n = np.arange(RESAMPLE_FILTER_TAPS) - (RESAMPLE_FILTER_TAPS - 1) / 2
+    taps = 2 * cutoff * np.sinc(2 * cutoff * n) * np.hamming(RESAMPLE_FILTER_TAPS)
+    return np.convolve(signal, (taps / taps.sum()).astype(np.float32), mode='same')
+
+
+def resample(signal, source_rate: int, target_rate: int = TARGET_SAMPLE_RATE):
+    """Resamples a mono float signal, low-pass filtering first when downsampling."""
+    if source_rate == target_rate or signal.size == 0:
+        return signal
+    if source_rate > target_rate:
+        signal = _lowpass(signal, 0.5 * target_rate / source_rate)
+        if source_rate % target_rate == 0:
+            return signal[::source_rate // target_rate]
+    n_out = int(round(signal.size * target_rate / source_rate))
+    positions = np.arange(n_out, dtype=np.float64) * (source_rate / target_rate)
+    return np.interp(positions, np.arange(signal.size), signal).astype(np.float32)
+
+
+def _convert_wav_in_process(input_path: str, output_path: str) -> Optional[str]:
+    """
+    Normalizes a PCM WAV without spawning ffmpeg. Returns the path taken
+    ('passthrough' or 'numpy'), or None when the file needs ffmpeg instead.
+    """
+    try:
+        with wave.open(input_path, 'rb') as wav:
+            channels, sample_width, rate = wav.getnchannels(), wav.getsampwidth(), wav.getframerate()
+            if (channels, sample_width, rate) == (1, 2, TARGET_SAMPLE_RATE):
+                passthrough = True
+            elif np is None:
+                return None
+            else:
+                passthrough = False
+                data = wav.readframes(wav.getnframes())
+    except (wave.Error, EOFError) as e:
+        # Float, A-law and other non-PCM encodings are not readable by `wave`.
+        logger.info(f"WAV upload needs ffmpeg: {e}")
+        return None
+
+    if passthrough:
+        os.replace(input_path, output_path)
+        return 'passthrough'
+
+    mono = _pcm_to_float(data, sample_width, channels).mean(axis=1)
+    mono = resample(mono, rate)
+    pcm = (np.clip(mono, -1.0, 1.0 - 1.0 / 32768) * 32768.0).astype('<i2')
+    with wave.open(output_path, 'wb') as out:
+        out.setnchannels(1)
+        out.setsampwidth(2)
+        out.setframerate(TARGET_SAMPLE_RATE)
+        out.writeframes(pcm.tobytes())
+    return 'numpy'
+
+
+def _convert_with_ffmpeg(input_path: str, output_path: str) -> bool:
+    try:
+        command = ['ffmpeg', '-i', input_path, '-ar', str(TARGET_SAMPLE_RATE), '-ac', '1', '-f', 'wav', output_path, '-y']
+        subprocess.run(command, check=True, capture_output=True)
+        return True
+    except (subprocess.CalledProcessError, FileNotFoundError) as e:
+        logger.error(f"Audio conversion failed: {e}")
+        # If ffmpeg command fails, log its output for debugging
+        if isinstance(e, subprocess.CalledProcessError):
+            logger.error(f"FFmpeg stderr: {e.stderr.decode()}")
+        return False
+
+
+async def convert_to_wav(input_path: str, output_path: str, decoder_pool=None) -> bool:
+    """
+    Writes `input_path` to `output_path` as 16kHz mono 16-bit WAV. A WAV that is
+    already in that format is moved rather than copied, so `input_path` may no
+    longer exist afterwards. Anything that is not PCM WAV goes to `decoder_pool`
+    when one is given (which may raise DecoderBusyError), else to the ffmpeg CLI.
+    """
+    with open(input_path, 'rb') as f:
+        container = sniff_container(f.read(16))
+
+    path = await asyncio.to_thread(_convert_wav_in_process, input_path, output_path) if container == 'wav' else None
+    if path is None:
+        if decoder_pool is not None:
+            ok, path = await decoder_pool.decode(input_path, output_path), 'decoder_pool'
+        else:
+            ok, path = await asyncio.to_thread(_convert_with_ffmpeg, input_path, output_path), 'ffmpeg'
+        if not ok:
+            metrics.DEPENDENCY_ERRORS.inc(dependency=path)
+            return False
+    AUDIO_CONVERSIONS.inc(container=container, path=path)
+    logger.info(f"Normalized {container} upload to WAV via {path}")
+    return True
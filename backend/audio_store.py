@@ -0,0 +1,122 @@
+"""
+Server-side cache of synthesized audio.
+
+Files are content-addressed by a hash of everything that determines the audio
+(text, voice settings, format), so the same reply is synthesized once and then
+served from disk by the `/audio/{name}` endpoint, or inlined as a data URI.
+"""
+import base64
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Optional, Dict, Any
+
+logger = logging.getLogger('MultiAgentOrchestrator')
+
+# remote: return Murf's temporary URL (one extra cross-origin fetch for the browser)
+# local:  download once, serve from /audio/{name} with range support and long cache headers
+# inline: return the audio itself as a base64 data URI
+TTS_AUDIO_DELIVERY = os.getenv('TTS_AUDIO_DELIVERY', 'local').lower()
+TTS_CACHE_DIR = os.getenv('TTS_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'tts-cache'))
+TTS_CACHE_MAX_BYTES = int(os.getenv('TTS_CACHE_MAX_BYTES', str(512 * 1024 * 1024)))
+
+MEDIA_TYPES = {
+    'wav': 'audio/wav',
+    'mp3': 'audio/mpeg',
+    'ogg': 'audio/ogg',
+    'flac': 'audio/flac',
+    'opus': 'audio/ogg',
+}
+AUDIO_NAME_RE = re.compile(r'^[0-9a-f]{64}\.(' + '|'.join(MEDIA_TYPES) + r')$')
+
+
+def audio_key(text: str, settings: Dict[str, Any]) -> str:
+    """Content hash of a synthesis request; identical text and settings share one cached file."""
+    material = json.dumps({"text": text, **settings}, sort_keys=True)
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class AudioStore:
+    def __init__(self, directory: str = TTS_CACHE_DIR, max_bytes: int = TTS_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, int]" = OrderedDict()  # name -> size, least recently used first
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        existing = []
+        for name in os.listdir(directory):
+            if AUDIO_NAME_RE.match(name):
+                stat = os.stat(os.path.join(directory, name))
+                existing.append((stat.st_mtime, name, stat.st_size))
+        for _, name, size in sorted(existing):
+            self._entries[name] = size
+            self._total_bytes += size
+
+    def path_for(self, name: str) -> Optional[str]:
+        """
+        Path of a cached file, or None. `name` must be a valid `<hash>.<ext>`.
+        Workers sharing the directory see each other's files: one found on disk
+        but missing from this process's index is adopted into it.
+        """
+        if not AUDIO_NAME_RE.match(name):
+            return None
+        path = os.path.join(self.directory, name)
+        try:
+            size = os.stat(path).st_size
+        except FileNotFoundError:
+            with self._lock:
+                # Evicted by another worker.
+                self._total_bytes -= self._entries.pop(name, 0)
+            return None
+        with self._lock:
+            if name in self._entries:
+                self._entries.move_to_end(name)
+            else:
+                self._entries[name] = size
+                self._total_bytes += size
+                self._evict()
+        return path
+
+    def put(self, name: str, data: bytes) -> str:
+        path = os.path.join(self.directory, name)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.part')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        with self._lock:
+            self._total_bytes += len(data) - self._entries.pop(name, 0)
+            self._entries[name] = len(data)
+            self._evict()
+        return path
+
+    def _evict(self):
+        """Drops least recently used files until under budget, always keeping the newest. Call with the lock held."""
+        while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+            evicted, size = self._entries.popitem(last=False)
+            self._total_bytes -= size
+            try:
+                os.unlink(os.path.join(self.directory, evicted))
+            except FileNotFoundError:
+                pass
+
+    def read(self, name: str) -> Optional[bytes]:
+        path = self.path_for(name)
+        if path is None:
+            return None
+        with open(path, 'rb') as f:
+            return f.read()
+
+
+def local_url(name: str) -> str:
+    return f"/audio/{name}"
+
+
+def data_uri(name: str, data: bytes) -> str:
+    media_type = MEDIA_TYPES[name.rsplit('.', 1)[1]]
+    return f"data:{media_type};base64,{base64.b64encode(data).decode('ascii')}"
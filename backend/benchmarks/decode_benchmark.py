@@ -0,0 +1,123 @@
+"""
+Compares decoding uploads with a fresh ffmpeg process per request against the
+persistent decoder pool.
+
+Every request decodes the same input file (a browser-style WebM/Opus recording
+by default) to 16kHz mono WAV. Each mode runs the same number of requests at the
+given concurrency and reports throughput, latency percentiles, and the client's
+CPU time (spawning processes shows up as user+system time here).
+
+Usage (from backend/):
+    python benchmarks/decode_benchmark.py --input recording.webm --requests 200 --concurrency 8
+    python benchmarks/decode_benchmark.py --generate 5    # synthesize a 5 second WebM/Opus input
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import audio_input  # noqa: E402
+import decoder_pool  # noqa: E402
+from stt_benchmark import percentile  # noqa: E402
+
+
+def generate_webm(path: str, seconds: float):
+    """Writes a WebM/Opus file with a sweeping tone, like a MediaRecorder upload."""
+    import av
+    import numpy as np
+    rate = 48000
+    with av.open(path, 'w', format='webm') as container:
+        stream = container.add_stream('libopus', rate=rate)
+        stream.layout = 'mono'
+        t = np.arange(int(rate * seconds)) / rate
+        samples = (0.3 * np.sin(2 * np.pi * (200 + 100 * t) * t)).astype(np.float32)
+        for start in range(0, samples.size, 960):
+            frame = av.AudioFrame.from_ndarray(samples[None, start:start + 960], format='flt', layout='mono')
+            frame.sample_rate = rate
+            for packet in stream.encode(frame):
+                container.mux(packet)
+        for packet in stream.encode(None):
+            container.mux(packet)
+
+
+async def run_mode(decode, input_path: str, requests: int, concurrency: int):
+    slots = asyncio.Semaphore(concurrency)
+    latencies, failures = [], 0
+    workdir = tempfile.mkdtemp()
+
+    async def one(i):
+        nonlocal failures
+        async with slots:
+            output_path = os.path.join(workdir, f'{i}.wav')
+            start = time.perf_counter()
+            ok = await decode(input_path, output_path)
+            latencies.append(time.perf_counter() - start)
+            failures += not ok
+            if os.path.exists(output_path):
+                os.unlink(output_path)
+
+    cpu_start, start = os.times(), time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    elapsed, cpu_end = time.perf_counter() - start, os.times()
+    shutil.rmtree(workdir, ignore_errors=True)
+    # Children's times cover finished ffmpeg processes; pool workers are still alive and are not counted.
+    cpu = sum(cpu_end[:4]) - sum(cpu_start[:4])
+    return {
+        'requests': requests,
+        'failures': failures,
+        'throughput_per_s': requests / elapsed if elapsed else 0.0,
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p95_ms': percentile(latencies, 0.95) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        'cpu_s': cpu,
+    }
+
+
+def print_row(name, r):
+    print(f"{name:<7} {r['requests']:>8} {r['failures']:>8} {r['throughput_per_s']:>8.1f} "
+          f"{r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} {r['p99_ms']:>8.1f} {r['cpu_s']:>8.2f}")
+
+
+async def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--input', help='Recording to decode on every request.')
+    parser.add_argument('--generate', type=float, metavar='SECONDS',
+                        help='Synthesize a WebM/Opus input of this length instead of --input.')
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--workers', type=int, default=decoder_pool.DECODER_POOL_SIZE)
+    args = parser.parse_args(argv)
+
+    input_path = args.input
+    if args.generate:
+        input_path = os.path.join(tempfile.mkdtemp(), 'generated.webm')
+        generate_webm(input_path, args.generate)
+    if not input_path:
+        parser.error("Pass --input or --generate")
+
+    print(f"{'mode':<7} {'requests':>8} {'failures':>8} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'cpu s':>8}")
+    if shutil.which('ffmpeg'):
+        async def spawn(src, dst):
+            return await asyncio.to_thread(audio_input._convert_with_ffmpeg, src, dst)
+        print_row('spawn', await run_mode(spawn, input_path, args.requests, args.concurrency))
+    else:
+        print(f"{'spawn':<7} skipped: ffmpeg is not on PATH")
+
+    if decoder_pool.PYAV_AVAILABLE:
+        pool = decoder_pool.DecoderPool(size=args.workers, queue_size=args.requests)
+        await pool.start(health_interval=0)
+        try:
+            print_row('pool', await run_mode(pool.decode, input_path, args.requests, args.concurrency))
+        finally:
+            await pool.close()
+    else:
+        print(f"{'pool':<7} skipped: PyAV is not installed")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
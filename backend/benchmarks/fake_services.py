@@ -0,0 +1,184 @@
+"""
+Local stand-ins for Groq, Murf and the Google Web Speech API.
+
+One server answers all three APIs closely enough for the orchestrator's clients:
+
+    POST /openai/v1/chat/completions   Groq (OpenAI-compatible) chat completions
+    POST /v1/speech/generate           Murf TTS; audio is served from /audio/<name>
+    POST /speech-api/v2/recognize      Google Web Speech v2 as used by SpeechRecognition
+
+Each service gets a latency distribution and an error rate. Latency specs are
+`fixed:S`, `uniform:LOW,HIGH`, `lognormal:MEDIAN,SIGMA` or `exp:MEAN` in seconds.
+Errors are HTTP 503 responses. Chat replies are plausible for each pipeline
+stage: tool selection uses the orchestrator's own rule-based router, so the
+tool calls are valid.
+
+Usage (from backend/):
+    python benchmarks/fake_services.py --port 9100 --groq-latency lognormal:0.35,0.4 --groq-error-rate 0.01
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import os
+import random
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import FastAPI, Request  # noqa: E402
+from fastapi.responses import JSONResponse, PlainTextResponse, Response  # noqa: E402
+
+import fallbacks  # noqa: E402
+
+UTTERANCES = [
+    "What's the status of order ord_12345?",
+    "Find running shoes under 100 dollars",
+    "Show me reviews for p002",
+    "What are your store hours?",
+    "Recommend something similar to p001",
+    "What's in my cart?",
+    "I'm looking for a leather wallet",
+    "What is your return policy?",
+]
+
+
+class Latency:
+    def __init__(self, spec: str):
+        kind, _, params = spec.partition(':')
+        values = [float(v) for v in params.split(',') if v]
+        samplers = {
+            'fixed': lambda: values[0],
+            'uniform': lambda: random.uniform(values[0], values[1]),
+            'lognormal': lambda: random.lognormvariate(math.log(values[0]), values[1]),
+            'exp': lambda: random.expovariate(1.0 / values[0]),
+        }
+        if kind not in samplers:
+            raise argparse.ArgumentTypeError(f"Unknown latency distribution '{kind}'; use one of {', '.join(samplers)}")
+        self.spec = spec
+        self.sample = samplers[kind]
+
+
+class FakeService:
+    def __init__(self, name: str, latency: Latency, error_rate: float):
+        self.name = name
+        self.latency = latency
+        self.error_rate = error_rate
+        self.requests = 0
+        self.errors = 0
+
+    async def delay_or_fail(self):
+        """Sleeps for a sampled latency; returns an error response to send instead, or None."""
+        self.requests += 1
+        await asyncio.sleep(max(0.0, self.latency.sample()))
+        if random.random() < self.error_rate:
+            self.errors += 1
+            return JSONResponse({'error': {'message': f'Injected {self.name} failure'}}, status_code=503)
+        return None
+
+
+def _chat_content(body) -> str:
+    messages = body.get('messages', [])
+    system = messages[0].get('content', '') if messages else ''
+    user = next((m.get('content', '') for m in reversed(messages) if m.get('role') == 'user'), '')
+    if 'Analyze the emotional tone' in user:
+        return "Primary: neutral\nConfidence: 0.8"
+    if 'Available tools' in system:
+        choice = fallbacks.route_by_rules(user)
+        return json.dumps({'tool_name': choice['tool_name'], 'parameters': choice.get('parameters', {})})
+    if 'Fill in the parameters' in user:
+        return "{}"
+    return "Here's what I found for you. Is there anything else I can help with?"
+
+
+def create_app(groq: FakeService, murf: FakeService, stt: FakeService) -> FastAPI:
+    app = FastAPI(title="Fake upstream services")
+
+    @app.api_route("/", methods=["GET", "HEAD"])
+    async def root():
+        return {"services": {s.name: {"requests": s.requests, "errors": s.errors, "latency": s.latency.spec}
+                             for s in (groq, murf, stt)}}
+
+    @app.post("/openai/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        error = await groq.delay_or_fail()
+        if error:
+            return error
+        content = _chat_content(body)
+        prompt_tokens = sum(len(m.get('content', '')) for m in body.get('messages', [])) // 4
+        completion_tokens = max(1, len(content) // 4)
+        return {
+            'id': f'chatcmpl-{uuid.uuid4().hex}', 'object': 'chat.completion', 'created': int(time.time()),
+            'model': body.get('model', 'fake'),
+            'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': content}, 'finish_reason': 'stop'}],
+            'usage': {'prompt_tokens': prompt_tokens, 'completion_tokens': completion_tokens,
+                      'total_tokens': prompt_tokens + completion_tokens},
+        }
+
+    @app.post("/v1/speech/generate")
+    async def speech_generate(request: Request):
+        body = await request.json()
+        error = await murf.delay_or_fail()
+        if error:
+            return error
+        extension = str(body.get('format', 'mp3')).lower()
+        size = 200 * len(body.get('text', ''))  # roughly 16 KB per second of speech at 128 kbps
+        return {'audioFile': f"{str(request.base_url).rstrip('/')}/audio/{size}-{uuid.uuid4().hex}.{extension}",
+                'audioLengthInSeconds': size / 16000}
+
+    @app.get("/audio/{name}")
+    async def audio(name: str):
+        size = int(name.split('-', 1)[0])
+        return Response(os.urandom(size), media_type='application/octet-stream')
+
+    @app.post("/speech-api/v2/recognize")
+    async def recognize(request: Request):
+        audio_bytes = await request.body()
+        error = await stt.delay_or_fail()
+        if error:
+            return error
+        transcript = UTTERANCES[int(hashlib.sha1(audio_bytes).hexdigest(), 16) % len(UTTERANCES)]
+        result = {'result': [{'alternative': [{'transcript': transcript, 'confidence': 0.92}], 'final': True}],
+                  'result_index': 0}
+        # The real API streams an empty result first.
+        return PlainTextResponse('{"result":[]}\n' + json.dumps(result) + '\n')
+
+    return app
+
+
+def add_service_arguments(parser: argparse.ArgumentParser):
+    for name, latency in (('groq', 'lognormal:0.3,0.4'), ('murf', 'lognormal:0.8,0.3'), ('stt', 'lognormal:0.5,0.3')):
+        parser.add_argument(f'--{name}-latency', type=Latency, default=Latency(latency),
+                            help=f"Latency distribution (default {latency}).")
+        parser.add_argument(f'--{name}-error-rate', type=float, default=0.0, help="Fraction of requests answered with 503.")
+
+
+def service_arguments(args) -> list:
+    """The fake-service options in `args` as command-line arguments, for starting this script as a subprocess."""
+    argv = []
+    for name in ('groq', 'murf', 'stt'):
+        argv += [f'--{name}-latency', getattr(args, f'{name}_latency').spec,
+                 f'--{name}-error-rate', str(getattr(args, f'{name}_error_rate'))]
+    return argv
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=9100)
+    add_service_arguments(parser)
+    args = parser.parse_args(argv)
+
+    import uvicorn
+    app = create_app(FakeService('groq', args.groq_latency, args.groq_error_rate),
+                     FakeService('murf', args.murf_latency, args.murf_error_rate),
+                     FakeService('stt', args.stt_latency, args.stt_error_rate))
+    uvicorn.run(app, host=args.host, port=args.port, log_level='warning')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,269 @@
+"""
+End-to-end load test of the orchestrator against local fake upstreams.
+
+The harness starts benchmarks/fake_services.py and an orchestrator (uvicorn
+main:app) wired to it. It then drives /chat and /process_speech at a fixed
+arrival rate. Requests are sent on schedule whether or not earlier ones have
+finished, so a slow server shows up as latency rather than as a lower request
+rate. At the end it reports per-endpoint throughput and latency percentiles,
+plus per-stage, per-LLM-stage and per-tool percentiles. Those come from the
+orchestrator's own /metrics histograms, scraped before and after the run.
+
+Chat utterances are generated from templates with varied products, orders and
+prices, and the orchestrator starts with its response cache off, so the stage
+percentiles measure the pipeline. Pass --response-cache to measure with it on;
+the report shows the cache hit rate either way.
+
+Usage (from backend/):
+    python benchmarks/load_test.py --rps 10 --duration 30 --speech-ratio 0.3
+    python benchmarks/load_test.py --rps 20 --groq-latency lognormal:0.5,0.6 --groq-error-rate 0.05
+    python benchmarks/load_test.py --rps 10 --response-cache
+    python benchmarks/load_test.py --target http://localhost:8000 --rps 5   # an already running, already wired server
+"""
+import argparse
+import asyncio
+import collections
+import io
+import math
+import os
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import time
+import wave
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import fake_services  # noqa: E402
+from stt_benchmark import percentile  # noqa: E402
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+UTTERANCE_TEMPLATES = [
+    "What's the status of order ord_{order}?",
+    "Find {item} under {price} dollars",
+    "Show me reviews for p{product:03d}",
+    "Recommend something similar to p{product:03d}",
+    "Add {quantity} of p{product:03d} to my cart",
+    "I'm looking for {item}",
+    "Do you have {item} in stock?",
+    "What are your store hours?",
+    "What is your return policy?",
+    "What's in my cart?",
+]
+ITEMS = ["running shoes", "a leather wallet", "yoga leggings", "a fitness tracker", "athletic socks", "a yoga mat",
+         "waterproof trail shoes", "wireless earbuds", "a gym bag", "a water bottle"]
+
+_SAMPLE_RE = re.compile(r'^(\w+)(?:\{(.*)\})? (\S+)$')
+_LABEL_RE = re.compile(r'(\w+)="((?:[^"\\]|\\.)*)"')
+
+
+def speech_wav(seed: int) -> bytes:
+    """A 16kHz mono WAV with a burst of voiced-like tone between silences; the seed varies the transcript."""
+    rate, rng = 16000, random.Random(seed)
+    pitch = rng.uniform(120, 240)
+    frames = bytearray()
+    for i in range(int(rate * 2.0)):
+        t = i / rate
+        voiced = 0.3 <= t < 1.6
+        sample = 0.35 * math.sin(2 * math.pi * pitch * t) * (0.6 + 0.4 * math.sin(2 * math.pi * 4 * t)) if voiced else 0.0
+        frames += int(sample * 32767 + rng.uniform(-30, 30)).to_bytes(2, 'little', signed=True)
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as out:
+        out.setnchannels(1)
+        out.setsampwidth(2)
+        out.setframerate(rate)
+        out.writeframes(bytes(frames))
+    return buffer.getvalue()
+
+
+def parse_histograms(text: str):
+    """{metric: {labels-without-le: {le: cumulative count}}} for every *_bucket series in a Prometheus scrape."""
+    histograms = collections.defaultdict(lambda: collections.defaultdict(dict))
+    for line in text.splitlines():
+        match = _SAMPLE_RE.match(line)
+        if not match or not match.group(1).endswith('_bucket'):
+            continue
+        labels = dict(_LABEL_RE.findall(match.group(2) or ''))
+        le = labels.pop('le')
+        histograms[match.group(1)[:-len('_bucket')]][tuple(sorted(labels.items()))][le] = float(match.group(3))
+    return histograms
+
+
+def parse_counter(text: str, metric: str):
+    """{labels: value} for every series of a counter in a Prometheus scrape."""
+    series = {}
+    for line in text.splitlines():
+        match = _SAMPLE_RE.match(line)
+        if match and match.group(1) == metric:
+            series[tuple(sorted(_LABEL_RE.findall(match.group(2) or '')))] = float(match.group(3))
+    return series
+
+
+def bucket_quantile(buckets, q: float) -> float:
+    """Estimates a quantile from cumulative bucket counts by interpolating inside the bucket that contains it."""
+    bounds = sorted(((float('inf') if le == '+Inf' else float(le)), count) for le, count in buckets.items())
+    total = bounds[-1][1] if bounds else 0
+    if not total:
+        return 0.0
+    rank, previous_bound, previous_count = q * total, 0.0, 0.0
+    for bound, count in bounds:
+        if count >= rank:
+            if math.isinf(bound):
+                return previous_bound
+            fraction = (rank - previous_count) / (count - previous_count) if count > previous_count else 1.0
+            return previous_bound + (bound - previous_bound) * fraction
+        previous_bound, previous_count = bound, count
+    return previous_bound
+
+
+def histogram_delta(before, after, metric: str):
+    """Per-series bucket counts observed between two scrapes."""
+    return {
+        series: {le: count - before.get(metric, {}).get(series, {}).get(le, 0.0) for le, count in buckets.items()}
+        for series, buckets in after.get(metric, {}).items()
+    }
+
+
+def utterance(rng: random.Random) -> str:
+    return rng.choice(UTTERANCE_TEMPLATES).format(
+        order=rng.randint(10000, 99999), item=rng.choice(ITEMS), price=rng.choice((30, 50, 80, 100, 150)),
+        product=rng.randint(1, 9), quantity=rng.randint(1, 3))
+
+
+async def wait_until_up(client: httpx.AsyncClient, url: str, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            if (await client.get(url)).status_code < 500:
+                return
+        except httpx.TransportError:
+            pass
+        if time.monotonic() > deadline:
+            raise RuntimeError(f"{url} did not come up within {timeout:.0f}s")
+        await asyncio.sleep(0.2)
+
+
+async def drive(client: httpx.AsyncClient, target: str, rps: float, duration: float, speech_ratio: float, seed: int):
+    rng = random.Random(seed)
+    wavs = [speech_wav(seed + i) for i in range(8)]
+    results = collections.defaultdict(list)  # endpoint -> [(seconds, status)]
+
+    async def one(i: int):
+        session_id = f"load-{i % 50}"
+        start = time.perf_counter()
+        try:
+            if rng.random() < speech_ratio:
+                endpoint = '/process_speech'
+                response = await client.post(target + endpoint, data={'session_id': session_id},
+                                             files={'audio_file': ('recording.wav', rng.choice(wavs), 'audio/wav')})
+            else:
+                endpoint = '/chat'
+                response = await client.post(target + endpoint, json={'text': utterance(rng),
+                                                                      'session_id': session_id})
+            status = response.status_code
+        except httpx.HTTPError as e:
+            status = type(e).__name__
+        results[endpoint].append((time.perf_counter() - start, status))
+
+    tasks, start = [], time.perf_counter()
+    for i in range(int(rps * duration)):
+        delay = start + i / rps - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(one(i)))
+    sent_for = time.perf_counter() - start
+    await asyncio.gather(*tasks)
+    return results, sent_for, time.perf_counter() - start
+
+
+def report(results, sent_for: float, elapsed: float, before_text: str, after_text: str):
+    before, after = parse_histograms(before_text), parse_histograms(after_text)
+    print(f"\nSent for {sent_for:.1f}s, all responses in after {elapsed:.1f}s\n")
+    print(f"{'endpoint':<16} {'requests':>8} {'ok':>6} {'errors':>6} {'req/s':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for endpoint, samples in sorted(results.items()):
+        ok = [s for s, status in samples if status == 200]
+        statuses = collections.Counter(str(status) for _, status in samples if status != 200)
+        print(f"{endpoint:<16} {len(samples):>8} {len(ok):>6} {len(samples) - len(ok):>6} {len(ok) / elapsed:>7.2f} "
+              f"{percentile(ok, 0.50) * 1000:>8.1f} {percentile(ok, 0.95) * 1000:>8.1f} {percentile(ok, 0.99) * 1000:>8.1f}"
+              + (f"  {dict(statuses)}" if statuses else ""))
+
+    lookups_before = parse_counter(before_text, 'response_cache_lookups_total')
+    lookups = {dict(labels).get('outcome'): value - lookups_before.get(labels, 0.0)
+               for labels, value in parse_counter(after_text, 'response_cache_lookups_total').items()}
+    total = sum(lookups.values())
+    if total:
+        print(f"\nResponse cache: {lookups.get('hit', 0):.0f} hits of {total:.0f} lookups "
+              f"({lookups.get('hit', 0) / total:.0%}); hits skip every stage below")
+    else:
+        print("\nResponse cache: no lookups (disabled, or every request had session context)")
+
+    for metric, title in (('request_stage_duration_seconds', 'stage'), ('llm_request_duration_seconds', 'llm stage'),
+                          ('tool_execution_duration_seconds', 'tool')):
+        delta = histogram_delta(before, after, metric)
+        if not delta:
+            continue
+        print(f"\n{title:<24} {'count':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}   (from {metric})")
+        for series, buckets in sorted(delta.items()):
+            count = buckets.get('+Inf', 0)
+            if not count:
+                continue
+            name = ",".join(v for _, v in series)
+            print(f"{name:<24} {count:>6.0f} " + " ".join(f"{bucket_quantile(buckets, q) * 1000:>8.1f}" for q in (0.5, 0.95, 0.99)))
+
+
+async def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rps', type=float, default=5.0, help='Target arrival rate, requests per second.')
+    parser.add_argument('--duration', type=float, default=30.0, help='Seconds to keep sending.')
+    parser.add_argument('--speech-ratio', type=float, default=0.3, help='Fraction of requests sent to /process_speech.')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--port', type=int, default=9000, help='Port for the orchestrator under test.')
+    parser.add_argument('--fake-port', type=int, default=9100, help='Port for the fake upstream services.')
+    parser.add_argument('--target', help='Load an already running orchestrator instead of starting one (and the fakes).')
+    parser.add_argument('--response-cache', action='store_true',
+                        help='Start the orchestrator with its response cache on (off by default, so stages are measured).')
+    fake_services.add_service_arguments(parser)
+    args = parser.parse_args(argv)
+
+    processes, logs = [], tempfile.mkdtemp(prefix='load-test-')
+    target = args.target.rstrip('/') if args.target else f'http://127.0.0.1:{args.port}'
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=200)
+    async with httpx.AsyncClient(timeout=120.0, limits=limits) as client:
+        try:
+            if not args.target:
+                fakes = f'http://127.0.0.1:{args.fake_port}'
+                processes.append(subprocess.Popen(
+                    [sys.executable, os.path.join(BACKEND_DIR, 'benchmarks', 'fake_services.py'),
+                     '--port', str(args.fake_port), *fake_services.service_arguments(args)],
+                    stdout=open(os.path.join(logs, 'fakes.log'), 'w'), stderr=subprocess.STDOUT))
+                await wait_until_up(client, fakes + '/')
+                env = dict(os.environ, GROQ_API_KEY='fake', GROQ_BASE_URL=fakes, MURF_API_KEY='fake',
+                           MURF_GENERATE_URL=fakes + '/v1/speech/generate', STT_BACKEND='google',
+                           GOOGLE_STT_ENDPOINT=fakes + '/speech-api/v2/recognize', TTS_PHRASE_BANK_ENABLED='false',
+                           RESPONSE_CACHE_ENABLED='true' if args.response_cache else 'false',
+                           TTS_CACHE_DIR=os.path.join(logs, 'tts-cache'))
+                processes.append(subprocess.Popen(
+                    [sys.executable, '-m', 'uvicorn', 'main:app', '--port', str(args.port), '--log-level', 'warning'],
+                    cwd=BACKEND_DIR, env=env, stdout=open(os.path.join(logs, 'orchestrator.log'), 'w'),
+                    stderr=subprocess.STDOUT))
+                await wait_until_up(client, target + '/health')
+                print(f"Fakes on {fakes}, orchestrator on {target}; logs in {logs}")
+
+            before = (await client.get(target + '/metrics')).text
+            print(f"Sending {args.rps:g} req/s for {args.duration:g}s ({args.speech_ratio:.0%} speech)...")
+            results, sent_for, elapsed = await drive(client, target, args.rps, args.duration, args.speech_ratio, args.seed)
+            after = (await client.get(target + '/metrics')).text
+            report(results, sent_for, elapsed, before, after)
+        finally:
+            for process in reversed(processes):
+                process.terminate()
+                process.wait(timeout=10)
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
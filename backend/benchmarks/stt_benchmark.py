@@ -0,0 +1,120 @@
+"""
+Compares STT backends on a fixed audio corpus.
+
+The corpus is a directory of 16kHz mono WAV files, each with an optional
+reference transcript in a `.txt` file of the same name. For every backend the
+harness transcribes the whole corpus at the given concurrency and reports
+throughput, latency percentiles and word error rate against the references.
+
+Usage (from backend/):
+    python benchmarks/stt_benchmark.py --corpus path/to/corpus --backends google,vosk,stub --concurrency 4
+"""
+import argparse
+import asyncio
+import os
+import re
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import stt_backends  # noqa: E402
+
+
+def _words(text: str):
+    return re.findall(r"[a-z0-9']+", text.lower())
+
+
+def word_error_rate(reference: str, hypothesis: str) -> float:
+    ref, hyp = _words(reference), _words(hypothesis)
+    if not ref:
+        return 0.0 if not hyp else 1.0
+    previous = list(range(len(hyp) + 1))
+    for i, r in enumerate(ref, 1):
+        current = [i] + [0] * len(hyp)
+        for j, h in enumerate(hyp, 1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (r != h))
+        previous = current
+    return previous[-1] / len(ref)
+
+
+def percentile(values, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0.0
+
+
+def load_corpus(directory: str):
+    corpus = []
+    for name in sorted(os.listdir(directory)):
+        if name.lower().endswith('.wav'):
+            path = os.path.join(directory, name)
+            reference_path = os.path.splitext(path)[0] + '.txt'
+            reference = None
+            if os.path.exists(reference_path):
+                with open(reference_path) as f:
+                    reference = f.read().strip()
+            corpus.append((path, reference))
+    return corpus
+
+
+async def run_backend(backend: stt_backends.STTBackend, corpus, concurrency: int):
+    slots = asyncio.Semaphore(concurrency)
+    latencies, errors, wers = [], 0, []
+
+    async def one(path, reference):
+        nonlocal errors
+        async with slots:
+            start = time.perf_counter()
+            try:
+                text = await backend.transcribe(path)
+            except (stt_backends.NoSpeechError, stt_backends.STTUnavailableError):
+                errors += 1
+                text = ''
+            latencies.append(time.perf_counter() - start)
+            if reference is not None:
+                wers.append(word_error_rate(reference, text))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(path, reference) for path, reference in corpus))
+    elapsed = time.perf_counter() - start
+    return {
+        'files': len(corpus),
+        'errors': errors,
+        'throughput_per_s': len(corpus) / elapsed if elapsed else 0.0,
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p95_ms': percentile(latencies, 0.95) * 1000,
+        'mean_ms': statistics.fmean(latencies) * 1000 if latencies else 0.0,
+        'wer': statistics.fmean(wers) if wers else None,
+    }
+
+
+async def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--corpus', required=True, help='Directory of WAV files with optional .txt references.')
+    parser.add_argument('--backends', default='stub', help='Comma-separated backend names.')
+    parser.add_argument('--concurrency', type=int, default=4)
+    args = parser.parse_args(argv)
+
+    corpus = load_corpus(args.corpus)
+    if not corpus:
+        parser.error(f"No WAV files found in {args.corpus}")
+
+    print(f"{'backend':<8} {'files':>6} {'errors':>6} {'files/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'mean ms':>8} {'WER':>6}")
+    for name in args.backends.split(','):
+        try:
+            backend = stt_backends.create_backend(name.strip())
+        except (ValueError, ImportError, stt_backends.STTUnavailableError) as e:
+            print(f"{name:<8} skipped: {e}")
+            continue
+        try:
+            r = await run_backend(backend, corpus, args.concurrency)
+        finally:
+            backend.close()
+        wer = f"{r['wer']:.3f}" if r['wer'] is not None else '-'
+        print(f"{name:<8} {r['files']:>6} {r['errors']:>6} {r['throughput_per_s']:>8.2f} "
+              f"{r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} {r['mean_ms']:>8.1f} {wer:>6}")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,231 @@
+"""
+Seeded synthetic catalogs, orders, reviews and carts for scale benchmarks.
+
+The same seed and sizes always produce the same dataset. The distributions
+loosely follow a real storefront:
+- Category sizes are skewed.
+- Each category has its own product nouns and tag vocabulary, and tags within
+  a category are drawn Zipf-style.
+- Prices are lognormal around a per-category median.
+- Ratings cluster around 4.2 and a few products are out of stock.
+- Orders and reviews favour a long-tailed set of popular products, so most
+  products have no reviews and a few have many.
+
+Records have the same shape as ecommerce_tools' MOCK_* tables, so `install`
+can swap a dataset into the running tools. The generated catalog.json can also
+be fed to `catalog_snapshot.py build --source`.
+
+Usage (from backend/):
+    python benchmarks/synthetic_data.py --products 100000 --seed 7 --output /tmp/dataset
+"""
+import argparse
+import bisect
+import itertools
+import json
+import math
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import catalog_snapshot  # noqa: E402
+import ecommerce_tools  # noqa: E402
+
+# name: (share of the catalog, median price, product nouns, tag vocabulary in popularity order)
+CATEGORIES = {
+    "Apparel": (0.24, 38.0, ["T-Shirt", "Hoodie", "Leggings", "Rain Jacket", "Athletic Socks", "Running Shorts", "Cap"],
+                ["apparel", "running", "breathable", "cotton", "gym", "yoga", "winter", "moisture-wicking"]),
+    "Footwear": (0.14, 95.0, ["Running Shoes", "Trail Runners", "Sneakers", "Hiking Boots", "Sandals", "Slippers"],
+                 ["running", "trail", "waterproof", "cushioned", "hiking", "casual", "outdoor"]),
+    "Electronics": (0.17, 120.0, ["Headphones", "Earbuds", "Fitness Tracker", "Action Camera", "Speaker", "Smartwatch", "Power Bank"],
+                    ["electronics", "wireless", "audio", "bluetooth", "fitness", "noise-cancelling", "4k", "health"]),
+    "Accessories": (0.13, 32.0, ["Leather Wallet", "Backpack", "Water Bottle", "Yoga Mat", "Sunglasses", "Belt"],
+                    ["accessory", "leather", "travel", "yoga", "eco-friendly", "fitness"]),
+    "Home": (0.11, 45.0, ["Throw Blanket", "Coffee Mug", "Desk Lamp", "Pillow", "Candle", "Towel Set"],
+             ["home", "cozy", "kitchen", "decor", "bedroom", "gift"]),
+    "Outdoor": (0.10, 85.0, ["Tent", "Sleeping Bag", "Camping Stove", "Headlamp", "Trekking Poles"],
+                ["outdoor", "camping", "hiking", "lightweight", "waterproof"]),
+    "Beauty": (0.07, 24.0, ["Face Serum", "Moisturizer", "Lip Balm", "Shampoo", "Sunscreen"],
+               ["beauty", "skincare", "vegan", "fragrance-free", "travel"]),
+    "Toys": (0.04, 29.0, ["Puzzle", "Building Set", "Plush Bear", "Board Game", "Kite"],
+             ["toys", "kids", "educational", "family", "outdoor"]),
+}
+SHARED_TAGS = ["unisex", "men", "women", "bestseller", "sustainable", "new", "sale", "premium", "kids"]
+ADJECTIVES = ["Classic", "Ultralight", "Pro", "Everyday", "Performance", "Eco", "Smart", "Premium", "Compact",
+              "Deluxe", "Vintage", "Urban", "Flex", "Summit", "Aero", "Nova"]
+FEATURES = ["durable construction", "a lifetime warranty", "recycled materials", "a slim profile", "all-day comfort",
+            "easy cleaning", "a water-resistant finish", "a travel-friendly design", "fast charging", "extra padding"]
+ORDER_STATUSES = (("Delivered", 55), ("Shipped", 20), ("Processing", 15), ("Cancelled", 5), ("Returned", 5))
+HELP_TOPICS = ["hours", "store hours", "return policy", "refund", "contact", "contact support", "shipping", "gift cards"]
+REVIEW_COMMENTS = {
+    5: ["Absolutely love this {noun}. Worth every penny.", "Best {noun} I've owned, and it arrived fast.",
+        "Exceeded my expectations. The {tag} features are great."],
+    4: ["Really solid {noun}, just a little pricey.", "Good quality overall. Runs slightly small.",
+        "Happy with it; the {tag} claim holds up."],
+    3: ["It's fine. Does the job but nothing special.", "Average {noun}. Expected more for the price."],
+    2: ["Disappointed. The {noun} started wearing out after a month.", "Not as described; the {tag} part is weak."],
+    1: ["Broke within a week. Returning it.", "Would not buy this {noun} again."],
+}
+_SYLLABLES = ["ka", "ri", "mo", "tan", "lee", "zo", "ben", "ash", "vi", "dan", "el", "sam", "jo", "nik", "ra"]
+
+
+def _zipf_cumulative(n: int, exponent: float = 1.0):
+    return list(itertools.accumulate(1.0 / (rank + 1) ** exponent for rank in range(n)))
+
+
+def _pick(rng: random.Random, items, cumulative):
+    return items[bisect.bisect_left(cumulative, rng.random() * cumulative[-1])]
+
+
+def _id_width(count: int, minimum: int) -> int:
+    return max(minimum, len(str(count)))
+
+
+def generate_products(count: int, rng: random.Random):
+    names = list(CATEGORIES)
+    shares = [CATEGORIES[name][0] for name in names]
+    tag_weights = {name: _zipf_cumulative(len(CATEGORIES[name][3]), 0.8) for name in names}
+    width = _id_width(count, 3)
+    products, rows_by_category = [], {name: [] for name in names}
+    for i in range(count):
+        category = rng.choices(names, shares)[0]
+        _, median_price, nouns, vocabulary = CATEGORIES[category]
+        noun = rng.choice(nouns)
+        tags = {_pick(rng, vocabulary, tag_weights[category]) for _ in range(rng.randint(2, 4))}
+        if rng.random() < 0.6:
+            tags.add(rng.choice(SHARED_TAGS))
+        name = f"{rng.choice(ADJECTIVES)} {noun}" + (f" v{rng.randint(2, 9)}" if rng.random() < 0.2 else "")
+        rows_by_category[category].append(i)
+        products.append({
+            "id": f"p{i + 1:0{width}d}", "name": name, "category": category,
+            "description": f"{name} in our {category.lower()} range, with {rng.choice(FEATURES)} and {rng.choice(FEATURES)}. "
+                           f"Great for {', '.join(sorted(tags))}.",
+            "price": round(max(2.99, rng.lognormvariate(math.log(median_price), 0.55)), 2),
+            "stock": 0 if rng.random() < 0.08 else int(rng.lognormvariate(math.log(60), 0.8)) + 1,
+            "rating": round(1 + 4 * rng.betavariate(8, 2), 1),
+            "tags": sorted(tags),
+            "related_product_ids": [],
+        })
+    for i, product in enumerate(products):
+        same_category = rows_by_category[product["category"]]
+        related = set()
+        for _ in range(rng.randint(1, 4)):
+            pool = same_category if rng.random() < 0.8 else range(count)
+            related.add(products[rng.choice(pool)]["id"])
+        related.discard(product["id"])
+        product["related_product_ids"] = sorted(related)
+    return products
+
+
+def _popularity(products, rng: random.Random):
+    """A random popularity ranking over products and its Zipf cumulative weights."""
+    ranked = list(products)
+    rng.shuffle(ranked)
+    return ranked, _zipf_cumulative(len(ranked))
+
+
+def generate_orders(count: int, products, rng: random.Random):
+    ranked, cumulative = _popularity(products, rng)
+    statuses, status_weights = zip(*ORDER_STATUSES)
+    width = _id_width(count, 5)
+    orders = {}
+    for i in range(count):
+        items, total = {}, 0.0
+        for _ in range(rng.choices((1, 2, 3, 4), (60, 25, 10, 5))[0]):
+            product = _pick(rng, ranked, cumulative)
+            quantity = rng.choices((1, 2, 3), (80, 15, 5))[0]
+            items[product["id"]] = items.get(product["id"], 0) + quantity
+            total += product["price"] * quantity
+        orders[f"ord_{i + 1:0{width}d}"] = {
+            "status": rng.choices(statuses, status_weights)[0],
+            "items": [{"product_id": product_id, "quantity": quantity} for product_id, quantity in items.items()],
+            "total": round(total, 2),
+        }
+    return orders
+
+
+def generate_reviews(count: int, products, rng: random.Random):
+    ranked, cumulative = _popularity(products, rng)
+    reviews = {}
+    for _ in range(count):
+        product = _pick(rng, ranked, cumulative)
+        rating = min(5, max(1, round(rng.gauss(product["rating"], 0.9))))
+        noun = product["name"].split(" ", 1)[-1].lower()
+        username = "".join(rng.choice(_SYLLABLES) for _ in range(rng.randint(2, 3))).capitalize()
+        reviews.setdefault(product["id"], []).append({
+            "username": f"{username}{rng.randint(1, 999)}" if rng.random() < 0.5 else username,
+            "rating": rating,
+            "comment": rng.choice(REVIEW_COMMENTS[rating]).format(noun=noun, tag=rng.choice(product["tags"])),
+        })
+    return reviews
+
+
+def generate_cart(items: int, products, rng: random.Random):
+    in_stock = [p for p in products if p["stock"] > 0] or products
+    return {p["id"]: rng.randint(1, 3) for p in rng.sample(in_stock, min(items, len(in_stock)))}
+
+
+def generate(products: int, orders: int = None, reviews: int = None, cart_items: int = 5, seed: int = 0):
+    """
+    A complete dataset: `products` products, `orders` orders (default one per
+    product), `reviews` reviews (default three per product) and a cart.
+    """
+    rng = random.Random(seed)
+    catalog = generate_products(products, rng)
+    return {
+        "products": catalog,
+        "orders": generate_orders(products if orders is None else orders, catalog, rng),
+        "reviews": generate_reviews(3 * products if reviews is None else reviews, catalog, rng),
+        "cart": generate_cart(cart_items, catalog, rng),
+    }
+
+
+def search_queries(dataset, count: int, rng: random.Random):
+    """Realistic search terms: mostly popular tags and product nouns, with some misses."""
+    vocabulary = sorted({tag for _, _, _, tags in CATEGORIES.values() for tag in tags} |
+                        {noun.lower() for _, _, nouns, _ in CATEGORIES.values() for noun in nouns})
+    cumulative = _zipf_cumulative(len(vocabulary), 0.7)
+    misses = ["snorkel", "piano", "lawnmower", "xyzzy"]
+    return [rng.choice(misses) if rng.random() < 0.1 else _pick(rng, vocabulary, cumulative) for _ in range(count)]
+
+
+def install(dataset, snapshot_path: str = None):
+    """
+    Replaces the contents of ecommerce_tools' in-memory tables with `dataset`,
+    in place, so modules that imported them see the new data. With
+    `snapshot_path`, product reads come from that snapshot file instead.
+    """
+    ecommerce_tools.MOCK_PRODUCTS[:] = dataset["products"]
+    for table, key in ((ecommerce_tools.MOCK_ORDERS, "orders"), (ecommerce_tools.MOCK_PRODUCT_REVIEWS, "reviews"),
+                       (ecommerce_tools.MOCK_SHOPPING_CART, "cart")):
+        table.clear()
+        table.update(dataset[key])
+    ecommerce_tools._CATALOG_SNAPSHOT = catalog_snapshot.open_snapshot(snapshot_path) if snapshot_path else None
+    ecommerce_tools.mark_changed(*ecommerce_tools.DATA_VERSIONS)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write a seeded synthetic dataset as JSON files.")
+    parser.add_argument("--products", type=int, default=10000)
+    parser.add_argument("--orders", type=int, help="Defaults to one per product.")
+    parser.add_argument("--reviews", type=int, help="Defaults to three per product.")
+    parser.add_argument("--cart-items", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", required=True, help="Directory for catalog.json, orders.json, reviews.json and cart.json.")
+    parser.add_argument("--snapshot", action="store_true", help="Also build catalog.snap from the catalog.")
+    args = parser.parse_args(argv)
+
+    dataset = generate(args.products, args.orders, args.reviews, args.cart_items, args.seed)
+    os.makedirs(args.output, exist_ok=True)
+    for key, filename in (("products", "catalog.json"), ("orders", "orders.json"), ("reviews", "reviews.json"), ("cart", "cart.json")):
+        with open(os.path.join(args.output, filename), "w") as f:
+            json.dump(dataset[key], f)
+    if args.snapshot:
+        catalog_snapshot.write_snapshot(dataset["products"], os.path.join(args.output, "catalog.snap"))
+    print(f"Wrote {len(dataset['products'])} products, {len(dataset['orders'])} orders and "
+          f"{sum(map(len, dataset['reviews'].values()))} reviews to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,289 @@
+"""
+Benchmarks every e-commerce tool function on synthetic datasets of several sizes.
+
+For each catalog size the harness generates a seeded dataset with
+synthetic_data.py and installs it into ecommerce_tools. It then times each
+tool on pre-generated, realistic arguments, first against the in-memory
+tables and then against a memory-mapped catalog snapshot. Argument generation
+and setup are not timed. Each tool runs for `--iterations` calls or
+`--max-seconds`, whichever comes first. The output reports calls per second
+and latency percentiles per tool, size and backing. It also reports the
+median peak memory a call allocates, measured with tracemalloc in a separate
+untimed pass.
+
+`--save-baseline` stores the results as JSON. `--check` reruns the baseline's
+configuration and exits with status 1 when a tool's median latency or peak
+allocation regresses beyond the tolerance. Latency baselines only mean
+something on the machine that recorded them, so re-record the committed
+baseline in benchmarks/baselines/ on the machine that runs the check.
+Allocation figures carry across machines.
+
+Usage (from backend/):
+    python benchmarks/tool_benchmark.py --sizes 1000,10000,100000
+    python benchmarks/tool_benchmark.py --sizes 100000 --tools search_products,recommend_products --backings snapshot
+    python benchmarks/tool_benchmark.py --save-baseline benchmarks/baselines/tool_benchmark.json
+    python benchmarks/tool_benchmark.py --check benchmarks/baselines/tool_benchmark.json --tolerance 0.3
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import catalog_snapshot  # noqa: E402
+import ecommerce_tools  # noqa: E402
+import synthetic_data  # noqa: E402
+from stt_benchmark import percentile  # noqa: E402
+
+BACKINGS = ("memory", "snapshot")
+ALLOCATION_SAMPLE_CALLS = 25
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines", "tool_benchmark.json")
+
+
+def tool_calls(dataset, count: int, rng: random.Random):
+    """{tool name: (function, [(args, kwargs), ...])} with `count` realistic calls per tool."""
+    products, orders = dataset["products"], list(dataset["orders"])
+    categories = list(synthetic_data.CATEGORIES)
+    reviewed = list(dataset["reviews"])
+
+    def product_id():
+        return rng.choice(products)["id"] if rng.random() < 0.95 else "p_missing"
+
+    def order_id():
+        return rng.choice(orders) if rng.random() < 0.9 else "ord_missing"
+
+    queries = synthetic_data.search_queries(dataset, count, rng)
+    return {
+        "search_products": (ecommerce_tools.search_products, [
+            ((query,), {"category": rng.choice(categories) if rng.random() < 0.3 else None,
+                        "max_price": rng.choice((25, 50, 100, 200)) if rng.random() < 0.3 else None})
+            for query in queries]),
+        "recommend_products": (ecommerce_tools.recommend_products, [
+            ((product_id(),), {"criteria": rng.choice(("related", "top-rated"))}) for _ in range(count)]),
+        "get_order_status": (ecommerce_tools.get_order_status, [((order_id(),), {}) for _ in range(count)]),
+        "initiate_payment": (ecommerce_tools.initiate_payment, [
+            ((order_id(), rng.choice(("card", "paypal", "apple pay"))), {}) for _ in range(count)]),
+        "get_general_help": (ecommerce_tools.get_general_help, [
+            ((rng.choice(synthetic_data.HELP_TOPICS),), {}) for _ in range(count)]),
+        "add_to_cart": (ecommerce_tools.add_to_cart, [((product_id(), rng.randint(1, 3)), {}) for _ in range(count)]),
+        "view_cart": (ecommerce_tools.view_cart, [((), {}) for _ in range(count)]),
+        "get_product_reviews": (ecommerce_tools.get_product_reviews, [
+            ((rng.choice(reviewed) if reviewed and rng.random() < 0.7 else product_id(),), {}) for _ in range(count)]),
+    }
+
+
+def time_calls(function, calls, max_seconds: float):
+    """
+    Per-call durations in seconds, stopping early once `max_seconds` have
+    elapsed (after at least 3 calls). Like timeit, the garbage collector is
+    paused so a collection does not land on whichever call happens to trigger it.
+    """
+    durations, deadline = [], time.perf_counter() + max_seconds
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for args, kwargs in calls:
+            start = time.perf_counter()
+            function(*args, **kwargs)
+            durations.append(time.perf_counter() - start)
+            if len(durations) >= 3 and time.perf_counter() > deadline:
+                break
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    return durations
+
+
+def allocation_peak(function, calls) -> float:
+    """Median peak bytes allocated during a call, over the first ALLOCATION_SAMPLE_CALLS calls."""
+    peaks = []
+    tracemalloc.start()
+    try:
+        for args, kwargs in calls[:ALLOCATION_SAMPLE_CALLS]:
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            function(*args, **kwargs)
+            peaks.append(tracemalloc.get_traced_memory()[1] - before)
+    finally:
+        tracemalloc.stop()
+    return statistics.median(peaks)
+
+
+def calibrate(repeats: int = 7) -> float:
+    """
+    Microseconds for a fixed pure-Python workload (best of `repeats`). The
+    ratio between two machines, or two runs on a loaded machine, rescales
+    baseline latencies before comparing them.
+    """
+    rng = random.Random(0)
+    rows = [{"id": f"p{i:05d}", "price": rng.random() * 100, "tags": ["a", "b", "c"][:i % 3 + 1]} for i in range(5000)]
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        matches = [r for r in rows if "b" in r["tags"] and r["price"] < 50]
+        sorted(matches, key=lambda r: r["price"])
+        {r["id"]: r for r in rows}
+        best = min(best, time.perf_counter() - start)
+    return best * 1e6
+
+
+def run_suite(sizes, backings=BACKINGS, tools=None, iterations: int = 200, max_seconds: float = 5.0, seed: int = 0,
+              repeats: int = 3):
+    """
+    Benchmarks the tools for every size and backing; returns one result dict
+    per (size, backing, tool). Each tool is timed `repeats` times after a short
+    warm-up, and the run with the lowest median is kept, which filters out
+    most interference from the rest of the machine.
+    """
+    results = []
+    with tempfile.TemporaryDirectory(prefix="tool-benchmark-") as directory:
+        for size in sizes:
+            dataset = synthetic_data.generate(size, seed=seed)
+            snapshot_path = os.path.join(directory, f"catalog-{size}.snap")
+            if "snapshot" in backings:
+                catalog_snapshot.write_snapshot(dataset["products"], snapshot_path)
+            for backing in backings:
+                calls = tool_calls(dataset, iterations, random.Random(seed))
+                for tool, (function, arguments) in calls.items():
+                    if tools and tool not in tools:
+                        continue
+                    runs = []
+                    for _ in range(repeats):
+                        # Each run starts from the dataset's cart, whatever earlier add_to_cart runs did to it.
+                        synthetic_data.install(dataset, snapshot_path if backing == "snapshot" else None)
+                        time_calls(function, arguments[:5], max_seconds)
+                        runs.append(time_calls(function, arguments, max_seconds / repeats))
+                    durations = min(runs, key=lambda run: percentile(run, 0.50))
+                    synthetic_data.install(dataset, snapshot_path if backing == "snapshot" else None)
+                    peak_bytes = allocation_peak(function, arguments)
+                    results.append({
+                        "tool": tool, "size": size, "backing": backing, "calls": len(durations),
+                        "mean_us": statistics.fmean(durations) * 1e6, "p50_us": percentile(durations, 0.50) * 1e6,
+                        "p95_us": percentile(durations, 0.95) * 1e6, "p99_us": percentile(durations, 0.99) * 1e6,
+                        "peak_bytes": peak_bytes,
+                    })
+    return results
+
+
+def print_results(results):
+    print(f"{'tool':<20} {'size':>8} {'backing':<9} {'calls':>6} {'calls/s':>10} {'mean us':>10} {'p50 us':>10} {'p95 us':>10} {'p99 us':>10} {'peak KiB':>9}")
+    for r in results:
+        print(f"{r['tool']:<20} {r['size']:>8} {r['backing']:<9} {r['calls']:>6} {1e6 / r['mean_us']:>10.0f} "
+              f"{r['mean_us']:>10.1f} {r['p50_us']:>10.1f} {r['p95_us']:>10.1f} {r['p99_us']:>10.1f} {r['peak_bytes'] / 1024:>9.1f}")
+
+
+def compare(results, baseline, speed: float, tolerance: float, alloc_tolerance: float, min_delta_us: float,
+            min_delta_bytes: int):
+    """
+    Regressions of `results` against `baseline`, as {(tool, size, backing): message}.
+    A tool regresses when its median latency or peak allocation exceeds the
+    baseline by more than the relative tolerance and by more than the absolute
+    floor. The floor keeps sub-microsecond tools from failing on timer noise.
+    Baseline latencies are first scaled by `speed`, the ratio of this
+    machine's calibration time to the baseline's.
+    """
+    previous = {(r["tool"], r["size"], r["backing"]): r for r in baseline["results"]}
+    regressions = {}
+    for r in results:
+        key = (r["tool"], r["size"], r["backing"])
+        old = previous.get(key)
+        if old is None:
+            continue
+        problems = []
+        expected = old["p50_us"] * speed
+        if r["p50_us"] > expected * (1 + tolerance) and r["p50_us"] - expected > min_delta_us:
+            problems.append(f"p50 {expected:.1f}us expected -> {r['p50_us']:.1f}us (+{r['p50_us'] / expected - 1:.0%})")
+        if r["peak_bytes"] > old["peak_bytes"] * (1 + alloc_tolerance) and r["peak_bytes"] - old["peak_bytes"] > min_delta_bytes:
+            problems.append(f"peak allocation {old['peak_bytes'] / 1024:.1f}KiB -> {r['peak_bytes'] / 1024:.1f}KiB")
+        if problems:
+            regressions[key] = f"{r['tool']} size={r['size']} backing={r['backing']}: " + "; ".join(problems)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", help="Comma-separated catalog sizes (default 1000,10000,100000).")
+    parser.add_argument("--backings", help="Comma-separated subset of: memory, snapshot (default both).")
+    parser.add_argument("--tools", help="Comma-separated tool names; defaults to all of them.")
+    parser.add_argument("--iterations", type=int, help="Calls per tool, size and backing (default 200).")
+    parser.add_argument("--max-seconds", type=float, default=5.0, help="Time budget per tool, size and backing.")
+    parser.add_argument("--repeats", type=int, default=3, help="Timed runs per tool, size and backing; the fastest is kept.")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--save-baseline", nargs="?", const=DEFAULT_BASELINE, metavar="PATH",
+                        help=f"Store the results as a baseline (default {os.path.relpath(DEFAULT_BASELINE)}).")
+    parser.add_argument("--check", nargs="?", const=DEFAULT_BASELINE, metavar="PATH",
+                        help="Compare against a baseline, reusing its sizes, backings, iterations and seed unless given.")
+    parser.add_argument("--confirm", type=int, default=2, help="Times to re-measure flagged cases before failing.")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative increase in median latency.")
+    parser.add_argument("--alloc-tolerance", type=float, default=0.10, help="Allowed relative increase in peak allocation.")
+    parser.add_argument("--min-delta-us", type=float, default=2.0, help="Latency increases below this never fail the check.")
+    parser.add_argument("--min-delta-bytes", type=int, default=1024, help="Allocation increases below this never fail the check.")
+    args = parser.parse_args(argv)
+
+    baseline, config = None, {"sizes": [1000, 10000, 100000], "backings": list(BACKINGS), "iterations": 200, "seed": 0}
+    if args.check:
+        with open(args.check) as f:
+            baseline = json.load(f)
+        config.update(baseline["config"])
+    if args.sizes:
+        config["sizes"] = [int(s) for s in args.sizes.split(",")]
+    if args.backings:
+        config["backings"] = [b for b in args.backings.split(",") if b]
+    for key in ("iterations", "seed"):
+        if getattr(args, key) is not None:
+            config[key] = getattr(args, key)
+    unknown = set(config["backings"]) - set(BACKINGS)
+    if unknown:
+        parser.error(f"Unknown backing(s): {', '.join(sorted(unknown))}")
+
+    calibration_us = calibrate()
+    results = run_suite(config["sizes"], config["backings"], set(args.tools.split(",")) if args.tools else None,
+                        config["iterations"], args.max_seconds, config["seed"], args.repeats)
+    print_results(results)
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save_baseline)), exist_ok=True)
+        with open(args.save_baseline, "w") as f:
+            json.dump({"config": config, "python": platform.python_version(), "machine": platform.machine(),
+                       "calibration_us": round(calibration_us, 1),
+                       "results": [{k: round(v, 1) if isinstance(v, float) else v for k, v in r.items()} for r in results]},
+                      f, indent=1)
+        print(f"\nSaved baseline to {args.save_baseline}")
+    if baseline is not None:
+        if baseline.get("python") != platform.python_version():
+            print(f"\nNote: baseline was recorded on Python {baseline.get('python')}, this is {platform.python_version()}.")
+        speed = calibration_us / baseline["calibration_us"]
+        print(f"\nCalibration: {calibration_us:.0f}us here vs {baseline['calibration_us']:.0f}us for the baseline "
+              f"(latencies scaled by {speed:.2f}).")
+        gate = (args.tolerance, args.alloc_tolerance, args.min_delta_us, args.min_delta_bytes)
+        regressions = compare(results, baseline, speed, *gate)
+        for _ in range(args.confirm):
+            if not regressions:
+                break
+            # Re-measure only the flagged cases and keep each one's best run, so a noisy neighbour cannot fail the check.
+            print(f"\nRe-measuring {len(regressions)} flagged case(s)...")
+            by_key = {(r["tool"], r["size"], r["backing"]): r for r in results}
+            for tool, size, backing in regressions:
+                rerun = run_suite([size], [backing], {tool}, config["iterations"], args.max_seconds, config["seed"], args.repeats)[0]
+                if rerun["p50_us"] < by_key[tool, size, backing]["p50_us"]:
+                    by_key[tool, size, backing].update(rerun)
+            regressions = compare(results, baseline, speed, *gate)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) against {args.check}:")
+            for line in regressions.values():
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"\nNo regressions against {args.check}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,303 @@
+"""
+Memory-mapped catalog snapshots.
+
+A snapshot is built once by an offline step and opened read-only by every
+uvicorn worker. Opening only maps the file and parses a fixed-size header,
+so worker startup does not depend on catalog size, and all workers share the
+same page-cache pages.
+
+Layout (all integers little-endian, every section 8-byte aligned):
+
+    header      magic, version, product count, term count
+    sections    (offset, length) pairs, one per entry in SECTIONS
+    price       float64[n]                  columnar arrays, one value per row
+    stock       int32[n]
+    rating      float32[n]
+    ids .. related                          string tables (see below)
+    id_index    uint32[n]                   rows sorted by product id
+    terms       string table[n_terms]       sorted vocabulary of word 2- and 3-grams
+    post_offs   uint32[n_terms + 1]         postings ranges into `postings`
+    postings    uint32[...]                 ascending row numbers per term
+
+A string table of `count` entries is uint32 offsets[count + 1] followed by the
+UTF-8 blob. List fields (tags, related ids) are joined with LIST_SEPARATOR.
+
+Usage:
+    python catalog_snapshot.py build --output catalog.snap [--source catalog.json]
+"""
+import argparse
+import itertools
+import json
+import mmap
+import os
+import re
+import struct
+import sys
+import tempfile
+from array import array
+from bisect import bisect_left
+from typing import Optional, Dict, Any, List, Iterable, Iterator, Tuple
+
+MAGIC = b"CATSNAP1"
+FORMAT_VERSION = 2
+LIST_SEPARATOR = "\x1f"
+NGRAM_SIZES = (2, 3)
+
+SECTIONS = (
+    "price", "stock", "rating",
+    "ids", "names", "categories", "descriptions", "tags", "related",
+    "id_index", "terms", "post_offs", "postings",
+)
+_HEADER = struct.Struct("<8sIII4x")
+_SECTION = struct.Struct("<QQ")
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def _tokens(text: str) -> List[str]:
+    return _TOKEN_RE.findall(text.lower())
+
+
+def _ngrams(token: str) -> Iterable[str]:
+    """Every 2- and 3-character substring of `token`; shorter tokens have none."""
+    for size in NGRAM_SIZES:
+        for i in range(len(token) - size + 1):
+            yield token[i:i + size]
+
+
+def _query_ngrams(token: str) -> Iterable[str]:
+    """The grams a word containing `token` must have: its 3-grams, or itself if it is 2 long."""
+    if len(token) == 2:
+        return (token,)
+    return (token[i:i + 3] for i in range(len(token) - 2))
+
+
+def _le_array(typecode: str, values: Iterable) -> bytes:
+    data = array(typecode, values)
+    if sys.byteorder != "little":
+        data.byteswap()
+    return data.tobytes()
+
+
+def _string_table(values: List[str]) -> bytes:
+    encoded = [v.encode("utf-8") for v in values]
+    offsets = [0]
+    for item in encoded:
+        offsets.append(offsets[-1] + len(item))
+    return _le_array("I", offsets) + b"".join(encoded)
+
+
+# --- Build step ---
+
+def build_sections(products: List[Dict[str, Any]]) -> Tuple[Dict[str, bytes], int]:
+    """Encodes a product list into the raw bytes of every snapshot section, plus the term count."""
+    postings: Dict[str, set] = {}
+    for row, p in enumerate(products):
+        text = " ".join([p["name"], p["category"], p["description"], " ".join(p.get("tags", []))])
+        for token in _tokens(text):
+            for gram in _ngrams(token):
+                postings.setdefault(gram, set()).add(row)
+
+    terms = sorted(postings, key=lambda t: t.encode("utf-8"))
+    post_offs, flat = [0], []
+    for term in terms:
+        flat.extend(sorted(postings[term]))
+        post_offs.append(len(flat))
+
+    return {
+        "price": _le_array("d", (float(p["price"]) for p in products)),
+        "stock": _le_array("i", (int(p["stock"]) for p in products)),
+        "rating": _le_array("f", (float(p.get("rating", 0)) for p in products)),
+        "ids": _string_table([p["id"] for p in products]),
+        "names": _string_table([p["name"] for p in products]),
+        "categories": _string_table([p["category"] for p in products]),
+        "descriptions": _string_table([p["description"] for p in products]),
+        "tags": _string_table([LIST_SEPARATOR.join(p.get("tags", [])) for p in products]),
+        "related": _string_table([LIST_SEPARATOR.join(p.get("related_product_ids", [])) for p in products]),
+        "id_index": _le_array("I", sorted(range(len(products)), key=lambda r: products[r]["id"].encode("utf-8"))),
+        "terms": _string_table(terms),
+        "post_offs": _le_array("I", post_offs),
+        "postings": _le_array("I", flat),
+    }, len(terms)
+
+
+def write_snapshot(products: List[Dict[str, Any]], path: str) -> None:
+    """Writes a snapshot atomically, so running workers never map a partial file."""
+    sections, n_terms = build_sections(products)
+    data = bytearray(_HEADER.pack(MAGIC, FORMAT_VERSION, len(products), n_terms))
+    data.extend(b"\0" * (_SECTION.size * len(SECTIONS)))
+    for i, name in enumerate(SECTIONS):
+        data.extend(b"\0" * (-len(data) % 8))
+        _SECTION.pack_into(data, _HEADER.size + i * _SECTION.size, len(data), len(sections[name]))
+        data.extend(sections[name])
+
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except Exception:
+        os.unlink(tmp_path)
+        raise
+
+
+# --- Zero-copy reader ---
+
+class _StringTable:
+    def __init__(self, view: memoryview, count: int):
+        self._offsets = view[:4 * (count + 1)].cast("I")
+        self._blob = view[4 * (count + 1):]
+
+    def raw(self, i: int) -> memoryview:
+        return self._blob[self._offsets[i]:self._offsets[i + 1]]
+
+    def __getitem__(self, i: int) -> str:
+        return str(self.raw(i), "utf-8")
+
+    def list(self, i: int) -> List[str]:
+        value = self[i]
+        return value.split(LIST_SEPARATOR) if value else []
+
+
+class CatalogSnapshot:
+    """Read-only view over a mapped snapshot file. Rows are materialized on demand."""
+
+    def __init__(self, path: str):
+        if sys.byteorder != "little":
+            raise ValueError("Catalog snapshots can only be mapped on little-endian hosts.")
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._mmap)
+        magic, version, self._n, n_terms = _HEADER.unpack_from(view)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError(f"{path} is not a version {FORMAT_VERSION} catalog snapshot.")
+
+        s = {}
+        for i, name in enumerate(SECTIONS):
+            off, length = _SECTION.unpack_from(view, _HEADER.size + i * _SECTION.size)
+            s[name] = view[off:off + length]
+
+        self._price = s["price"].cast("d")
+        self._stock = s["stock"].cast("i")
+        self._rating = s["rating"].cast("f")
+        self._ids = _StringTable(s["ids"], self._n)
+        self._names = _StringTable(s["names"], self._n)
+        self._categories = _StringTable(s["categories"], self._n)
+        self._descriptions = _StringTable(s["descriptions"], self._n)
+        self._tags = _StringTable(s["tags"], self._n)
+        self._related = _StringTable(s["related"], self._n)
+        self._id_index = s["id_index"].cast("I")
+        self._n_terms = n_terms
+        self._terms = _StringTable(s["terms"], n_terms)
+        self._post_offs = s["post_offs"].cast("I")
+        self._postings = s["postings"].cast("I")
+        self._rating_order: Optional[Dict[bytes, array]] = None
+
+    def __len__(self) -> int:
+        return self._n
+
+    def product(self, row: int) -> Dict[str, Any]:
+        return {
+            "id": self._ids[row], "name": self._names[row], "category": self._categories[row],
+            "description": self._descriptions[row],
+            "price": self._price[row], "stock": self._stock[row], "rating": round(self._rating[row], 2),
+            "tags": self._tags.list(row), "related_product_ids": self._related.list(row),
+        }
+
+    def products(self, rows: Optional[Iterable[int]] = None) -> Iterator[Dict[str, Any]]:
+        for row in range(self._n) if rows is None else rows:
+            yield self.product(row)
+
+    def category(self, row: int) -> str:
+        return self._categories[row]
+
+    def top_rated_rows(self, category: str, limit: int, exclude: Optional[int] = None) -> List[int]:
+        """Highest-rated rows of `category`, ties in catalog order, read from the columns without building rows."""
+        if self._rating_order is None:
+            # Built on first use rather than at open, so opening stays independent of catalog size.
+            order: Dict[bytes, List[int]] = {}
+            for row in range(self._n):
+                order.setdefault(self._categories.raw(row).tobytes(), []).append(row)
+            self._rating_order = {
+                key: array("I", sorted(rows, key=lambda r: -round(self._rating[r], 2))) for key, rows in order.items()
+            }
+        ranked = self._rating_order.get(category.encode("utf-8"), ())
+        return list(itertools.islice((r for r in ranked if r != exclude), limit))
+
+    def row_of(self, product_id: str) -> Optional[int]:
+        """Binary search over the id index."""
+        key = product_id.encode("utf-8")
+        lo, hi = 0, self._n
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._ids.raw(self._id_index[mid]).tobytes() < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self._n and self._ids.raw(self._id_index[lo]).tobytes() == key:
+            return self._id_index[lo]
+        return None
+
+    def find(self, product_id: str) -> Optional[Dict[str, Any]]:
+        row = self.row_of(product_id)
+        return self.product(row) if row is not None else None
+
+    def _postings_for(self, term: str) -> Optional[memoryview]:
+        key = term.encode("utf-8")
+        lo, hi = 0, self._n_terms
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._terms.raw(mid).tobytes() < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self._n_terms and self._terms.raw(lo).tobytes() == key:
+            return self._postings[self._post_offs[lo]:self._post_offs[lo + 1]]
+        return None
+
+    def candidate_rows(self, query: str) -> Optional[List[int]]:
+        """
+        Rows that may contain `query` as a substring, in catalog order: every
+        word of a match contains each query token, so it has all of that
+        token's n-grams. Returns None when no token is long enough to look up,
+        in which case callers fall back to a scan.
+        """
+        grams = {gram for token in _tokens(query) if len(token) >= 2 for gram in _query_ngrams(token)}
+        if not grams:
+            return None
+        lists = [self._postings_for(gram) for gram in grams]
+        if any(postings is None for postings in lists):
+            return []
+        lists.sort(key=len)
+        rows = list(lists[0])
+        for postings in lists[1:]:
+            if not rows:
+                break
+            # Both lists are ascending; galloping via bisect keeps this O(k log n).
+            rows = [r for r in rows if (i := bisect_left(postings, r)) < len(postings) and postings[i] == r]
+        return rows
+
+
+def open_snapshot(path: str) -> CatalogSnapshot:
+    return CatalogSnapshot(path)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Build a memory-mapped catalog snapshot.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="Write a snapshot from a JSON product list or the mock catalog.")
+    build.add_argument("--output", required=True)
+    build.add_argument("--source", help="JSON file containing a list of products. Defaults to MOCK_PRODUCTS.")
+    args = parser.parse_args(argv)
+
+    if args.source:
+        with open(args.source) as f:
+            products = json.load(f)
+    else:
+        import ecommerce_tools
+        products = ecommerce_tools.MOCK_PRODUCTS
+    write_snapshot(products, args.output)
+    print(f"Wrote {len(products)} products to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
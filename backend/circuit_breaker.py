@@ -0,0 +1,112 @@
+"""
+Per-dependency circuit breakers.
+
+A breaker watches a sliding window of recent calls. When enough of them fail,
+or are slower than the configured threshold, it opens and callers skip the
+dependency entirely, falling back to a degraded path at once. After a cool-down
+it lets a few probe calls through (half-open) and closes again if they succeed.
+Every allowed call must end in record() or, if it has no outcome (cancelled by a
+client disconnect or a deadline), abandon(); otherwise its probe slot stays taken.
+"""
+import threading
+import time
+from collections import deque
+from typing import Dict, Any
+
+import metrics
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+BREAKER_TRANSITIONS = metrics.counter('circuit_breaker_transitions_total', 'Circuit breaker state changes.', ['dependency', 'state'])
+BREAKER_REJECTIONS = metrics.counter('circuit_breaker_rejections_total', 'Calls skipped because a circuit breaker was open.', ['dependency'])
+
+
+class CircuitOpenError(RuntimeError):
+    pass
+
+
+class CircuitBreaker:
+    def __init__(self, name: str, failure_rate_threshold: float = 0.5, slow_call_seconds: float = 5.0,
+                 slow_call_rate_threshold: float = 0.8, window_size: int = 20, min_calls: int = 5,
+                 open_seconds: float = 30.0, half_open_max_calls: int = 1):
+        self.name = name
+        self.failure_rate_threshold = failure_rate_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_call_rate_threshold = slow_call_rate_threshold
+        self.min_calls = min_calls
+        self.open_seconds = open_seconds
+        self.half_open_max_calls = half_open_max_calls
+        self._calls = deque(maxlen=window_size)  # (failed, slow) per call
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._half_open_in_flight = 0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._maybe_half_open()
+            return self._state
+
+    def _transition(self, state: str):
+        self._state = state
+        BREAKER_TRANSITIONS.inc(dependency=self.name, state=state)
+        if state == OPEN:
+            self._opened_at = time.monotonic()
+        self._half_open_in_flight = 0
+        if state == CLOSED:
+            self._calls.clear()
+
+    def _maybe_half_open(self):
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+            self._transition(HALF_OPEN)
+
+    def allow_request(self) -> bool:
+        with self._lock:
+            self._maybe_half_open()
+            if self._state == CLOSED:
+                return True
+            if self._state == HALF_OPEN and self._half_open_in_flight < self.half_open_max_calls:
+                self._half_open_in_flight += 1
+                return True
+        BREAKER_REJECTIONS.inc(dependency=self.name)
+        return False
+
+    def check(self):
+        """Raises CircuitOpenError instead of returning False, for callers that already handle exceptions."""
+        if not self.allow_request():
+            raise CircuitOpenError(f"Circuit breaker for {self.name} is open.")
+
+    def abandon(self):
+        """Frees the half-open probe slot of an allowed call that ended without an outcome, e.g. because it was cancelled."""
+        with self._lock:
+            if self._state == HALF_OPEN and self._half_open_in_flight > 0:
+                self._half_open_in_flight -= 1
+
+    def record(self, duration: float, failed: bool = False):
+        slow = duration >= self.slow_call_seconds
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._transition(OPEN if failed or slow else CLOSED)
+                return
+            self._calls.append((failed, slow))
+            if self._state == CLOSED and len(self._calls) >= self.min_calls:
+                n = len(self._calls)
+                failure_rate = sum(1 for f, _ in self._calls if f) / n
+                slow_rate = sum(1 for _, s in self._calls if s) / n
+                if failure_rate >= self.failure_rate_threshold or slow_rate >= self.slow_call_rate_threshold:
+                    self._transition(OPEN)
+
+    def snapshot(self) -> Dict[str, Any]:
+        state = self.state
+        with self._lock:
+            n = len(self._calls)
+            return {
+                "state": state,
+                "recent_calls": n,
+                "failure_rate": round(sum(1 for f, _ in self._calls if f) / n, 3) if n else 0.0,
+                "slow_call_rate": round(sum(1 for _, s in self._calls if s) / n, 3) if n else 0.0,
+                "retry_in_seconds": round(max(0.0, self.open_seconds - (time.monotonic() - self._opened_at)), 1) if state == OPEN else 0.0,
+            }
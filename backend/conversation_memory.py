@@ -0,0 +1,165 @@
+"""
+Per-session conversation state for multi-turn requests.
+
+Each session keeps a bounded ring buffer of recent turns plus the entities a
+follow-up is most likely to refer to (the products last shown, the last order).
+Turns that fall out of the buffer or push the history over its token budget
+are folded into a short extractive summary, so the prompt sent to Groq stays
+roughly constant in size no matter how long the conversation runs.
+"""
+import os
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from typing import Optional, Dict, Any, List
+
+CONVERSATION_MAX_TURNS = int(os.getenv('CONVERSATION_MAX_TURNS', '8'))
+CONVERSATION_TOKEN_BUDGET = int(os.getenv('CONVERSATION_TOKEN_BUDGET', '600'))
+CONVERSATION_MAX_SESSIONS = int(os.getenv('CONVERSATION_MAX_SESSIONS', '10000'))
+CONVERSATION_TTL_SECONDS = float(os.getenv('CONVERSATION_TTL_SECONDS', '1800'))
+
+MAX_TRACKED_PRODUCTS = 5
+SUMMARY_LINE_CHARS = 80
+
+_PRODUCT_ID_RE = re.compile(r'\bp\d{3,}\b', re.IGNORECASE)
+_ORDER_ID_RE = re.compile(r'\bord_\d+\b', re.IGNORECASE)
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token for English) used for budgeting."""
+    return max(1, len(text) // 4)
+
+
+def _clip(text: str, limit: int) -> str:
+    return text if len(text) <= limit else text[:limit - 1].rstrip() + "…"
+
+
+class ConversationTurn:
+    __slots__ = ('user_text', 'response_text', 'tool_name', 'tokens')
+
+    def __init__(self, user_text: str, response_text: str, tool_name: str):
+        self.user_text = user_text
+        self.response_text = response_text
+        self.tool_name = tool_name
+        self.tokens = estimate_tokens(user_text) + estimate_tokens(response_text)
+
+
+class ConversationState:
+    def __init__(self, session_id: str, max_turns: int = CONVERSATION_MAX_TURNS,
+                 token_budget: int = CONVERSATION_TOKEN_BUDGET):
+        self.session_id = session_id
+        self.turns = deque(maxlen=max_turns)
+        self.token_budget = token_budget
+        self.summary_lines = deque()
+        self.summary_tokens = 0
+        self.history_tokens = 0
+        self.last_product_ids: List[str] = []
+        self.last_order_id: Optional[str] = None
+        self.last_active = time.monotonic()
+
+    # --- Entity tracking ---
+
+    def _track_entities(self, user_text: str, parameters: Dict[str, Any], result: Any):
+        product_ids = []
+        if isinstance(result, list):
+            product_ids = [item["id"] for item in result if isinstance(item, dict) and "id" in item]
+        if not product_ids and parameters.get("product_id"):
+            product_ids = [str(parameters["product_id"])]
+        if not product_ids:
+            product_ids = [m.lower() for m in _PRODUCT_ID_RE.findall(user_text)]
+        if product_ids:
+            self.last_product_ids = product_ids[:MAX_TRACKED_PRODUCTS]
+
+        order_id = parameters.get("order_id")
+        if not order_id:
+            match = _ORDER_ID_RE.search(user_text)
+            order_id = match.group(0) if match else None
+        if order_id:
+            self.last_order_id = str(order_id).lower()
+
+    # --- History budgeting ---
+
+    def _fold_into_summary(self, turn: ConversationTurn):
+        line = _clip(f"User asked: {turn.user_text} ({turn.tool_name})", SUMMARY_LINE_CHARS)
+        self.summary_lines.append(line)
+        self.summary_tokens += estimate_tokens(line)
+        self.history_tokens -= turn.tokens
+        # The summary gets at most a quarter of the budget; the oldest lines go first.
+        while self.summary_tokens > self.token_budget // 4 and self.summary_lines:
+            self.summary_tokens -= estimate_tokens(self.summary_lines.popleft())
+
+    def record_turn(self, user_text: str, response_text: str, tool_name: str,
+                    parameters: Optional[Dict[str, Any]] = None, result: Any = None):
+        self.last_active = time.monotonic()
+        self._track_entities(user_text, parameters or {}, result)
+
+        if len(self.turns) == self.turns.maxlen:
+            self._fold_into_summary(self.turns.popleft())
+        turn = ConversationTurn(user_text, response_text, tool_name)
+        self.turns.append(turn)
+        self.history_tokens += turn.tokens
+        while self.history_tokens + self.summary_tokens > self.token_budget and len(self.turns) > 1:
+            self._fold_into_summary(self.turns.popleft())
+
+    def has_context(self) -> bool:
+        """True once earlier turns or tracked entities could shape how a request is understood."""
+        return bool(self.turns or self.summary_lines or self.last_product_ids or self.last_order_id)
+
+    # --- Prompt construction ---
+
+    def entity_note(self) -> str:
+        notes = []
+        if self.last_product_ids:
+            notes.append(f"Products last shown to the user: {', '.join(self.last_product_ids)}.")
+        if self.last_order_id:
+            notes.append(f"Order last discussed: {self.last_order_id}.")
+        return " ".join(notes)
+
+    def context_note(self) -> str:
+        """Summary and entities, for inclusion in a system prompt."""
+        parts = []
+        if self.summary_lines:
+            parts.append("Earlier in this conversation:\n" + "\n".join(self.summary_lines))
+        entities = self.entity_note()
+        if entities:
+            parts.append(entities)
+        return "\n".join(parts)
+
+    def history_messages(self) -> List[Dict[str, str]]:
+        messages = []
+        for turn in self.turns:
+            messages.append({"role": "user", "content": turn.user_text})
+            messages.append({"role": "assistant", "content": turn.response_text})
+        return messages
+
+
+class ConversationStore:
+    """LRU map of session id -> ConversationState with idle expiry."""
+
+    def __init__(self, max_sessions: int = CONVERSATION_MAX_SESSIONS, ttl_seconds: float = CONVERSATION_TTL_SECONDS):
+        self._sessions: "OrderedDict[str, ConversationState]" = OrderedDict()
+        self._max_sessions = max_sessions
+        self._ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+
+    def get(self, session_id: Optional[str] = None) -> ConversationState:
+        """Returns the state for `session_id`, starting a new session if it is unknown or expired."""
+        now = time.monotonic()
+        with self._lock:
+            state = self._sessions.get(session_id) if session_id else None
+            if state is not None and now - state.last_active > self._ttl_seconds:
+                del self._sessions[session_id]
+                state = None
+            if state is None:
+                state = ConversationState(session_id or uuid.uuid4().hex)
+                self._sessions[state.session_id] = state
+                while len(self._sessions) > self._max_sessions:
+                    self._sessions.popitem(last=False)
+            else:
+                self._sessions.move_to_end(session_id)
+            return state
+
+    def __len__(self) -> int:
+        return len(self._sessions)
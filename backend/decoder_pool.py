@@ -0,0 +1,210 @@
+"""
+Long-lived audio decoder workers.
+
+Compressed uploads (WebM/Opus from the browser, Ogg, MP3, ...) are decoded by a
+fixed pool of worker processes that each load FFmpeg's libraries once through
+PyAV, instead of spawning an `ffmpeg` process per request. The pool admits at
+most DECODER_POOL_SIZE + DECODER_QUEUE_SIZE jobs; beyond that, callers get
+DecoderBusyError straight away and can shed load instead of queueing without
+limit. A periodic health check rebuilds the pool if a worker has died or
+wedged: an idle pool is pinged, while a busy one counts as healthy as long as
+its jobs keep finishing, since a ping would only queue behind them.
+
+PyAV is listed in requirements.txt. Where it cannot be installed,
+`create_decoder_pool()` returns None and uploads fall back to the ffmpeg CLI.
+"""
+import asyncio
+import importlib.util
+import itertools
+import logging
+import os
+import time
+import wave
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+
+import metrics
+
+logger = logging.getLogger('MultiAgentOrchestrator')
+
+DECODER_POOL_ENABLED = os.getenv('DECODER_POOL_ENABLED', 'true').lower() == 'true'
+DECODER_POOL_SIZE = int(os.getenv('DECODER_POOL_SIZE', str(os.cpu_count() or 2)))
+DECODER_QUEUE_SIZE = int(os.getenv('DECODER_QUEUE_SIZE', '16'))
+DECODER_TIMEOUT_SECONDS = float(os.getenv('DECODER_TIMEOUT_SECONDS', '10'))
+DECODER_HEALTH_INTERVAL_SECONDS = float(os.getenv('DECODER_HEALTH_INTERVAL_SECONDS', '30'))
+PYAV_AVAILABLE = importlib.util.find_spec('av') is not None
+
+TARGET_SAMPLE_RATE = 16000
+
+DECODER_JOBS = metrics.counter('decoder_pool_jobs_total', 'Decode jobs submitted to the worker pool, by outcome.', ('outcome',))
+DECODER_RESTARTS = metrics.counter('decoder_pool_restarts_total', 'Times the decoder pool was rebuilt after a failed health check or crash.')
+
+
+class DecoderBusyError(Exception):
+    pass
+
+
+# --- Worker side (runs inside pool processes) ---
+
+def _init_worker():
+    import av  # load the FFmpeg libraries once per worker, not per job
+    av.logging.set_level(av.logging.ERROR)
+
+
+def _ping(delay: float = 0.0) -> int:
+    if delay:
+        time.sleep(delay)
+    return os.getpid()
+
+
+def _decode(input_path: str, output_path: str):
+    """Decodes the first audio stream of any FFmpeg-readable file to 16kHz mono 16-bit WAV."""
+    import av
+    resampler = av.AudioResampler(format='s16', layout='mono', rate=TARGET_SAMPLE_RATE)
+    with av.open(input_path) as container, wave.open(output_path, 'wb') as out:
+        out.setnchannels(1)
+        out.setsampwidth(2)
+        out.setframerate(TARGET_SAMPLE_RATE)
+        stream = container.streams.audio[0]
+        for frame in itertools.chain(container.decode(stream), [None]):  # None flushes the resampler
+            for resampled in resampler.resample(frame):
+                # Plane buffers can be padded past the last sample.
+                out.writeframes(bytes(resampled.planes[0])[:resampled.samples * 2])
+
+
+# --- Pool ---
+
+class DecoderPool:
+    def __init__(self, size: int = DECODER_POOL_SIZE, queue_size: int = DECODER_QUEUE_SIZE,
+                 timeout: float = DECODER_TIMEOUT_SECONDS):
+        self.size = size
+        self.capacity = size + queue_size
+        self.timeout = timeout
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._in_flight = 0
+        self._progress_at = 0.0  # when a job last finished, or work started on an idle pool
+        self._healthy = False
+        self._last_check = 0.0
+        self._health_task: Optional[asyncio.Task] = None
+
+    async def start(self, health_interval: float = DECODER_HEALTH_INTERVAL_SECONDS):
+        self._pool = ProcessPoolExecutor(max_workers=self.size, initializer=_init_worker)
+        # Workers are spawned lazily; overlapping pings bring them all up before the first upload.
+        await self.health_check(warm=True)
+        if health_interval > 0:
+            self._health_task = asyncio.create_task(self._run_health_checks(health_interval))
+
+    async def decode(self, input_path: str, output_path: str) -> bool:
+        if self._in_flight >= self.capacity:
+            DECODER_JOBS.inc(outcome='rejected')
+            raise DecoderBusyError(f"Decoder pool is full ({self._in_flight} jobs in flight)")
+        pool = self._pool
+        try:
+            job = asyncio.wrap_future(pool.submit(_decode, input_path, output_path))
+        except BrokenProcessPool:
+            self._worker_died(pool)
+            return False
+        # The slot is held until the worker is done with the job, not until this caller stops waiting:
+        # a timed-out or abandoned job keeps its worker busy until it finishes or the pool is rebuilt.
+        if self._in_flight == 0:
+            self._progress_at = time.monotonic()
+        self._in_flight += 1
+        job.add_done_callback(self._job_done)
+        try:
+            await asyncio.wait_for(asyncio.shield(job), self.timeout)
+            DECODER_JOBS.inc(outcome='ok')
+            return True
+        except asyncio.TimeoutError:
+            DECODER_JOBS.inc(outcome='timeout')
+            logger.error(f"Decoding {input_path} timed out after {self.timeout}s")
+            return False
+        except BrokenProcessPool:
+            self._worker_died(pool)
+            return False
+        except Exception as e:
+            DECODER_JOBS.inc(outcome='error')
+            logger.error(f"Audio decoding failed: {e}")
+            return False
+
+    def _job_done(self, job: asyncio.Future):
+        self._in_flight -= 1
+        self._progress_at = time.monotonic()
+
+    def _worker_died(self, pool: ProcessPoolExecutor):
+        DECODER_JOBS.inc(outcome='error')
+        # Every job on a broken pool fails at once; only the first to notice rebuilds it.
+        if self._pool is pool:
+            logger.error("Decoder worker died; rebuilding the pool")
+            self._restart()
+
+    async def health_check(self, warm: bool = False) -> bool:
+        if self._in_flight and not warm:
+            return self._check_progress()
+        loop = asyncio.get_running_loop()
+        delay = 0.05 if warm else 0.0
+        pool = self._pool
+        try:
+            pings = [loop.run_in_executor(pool, _ping, delay) for _ in range(self.size if warm else 1)]
+            await asyncio.wait_for(asyncio.gather(*pings), self.timeout)
+            self._healthy = True
+        except Exception as e:
+            logger.error(f"Decoder pool health check failed: {e!r}")
+            self._healthy = False
+            if self._pool is pool:
+                self._restart()
+        self._last_check = time.monotonic()
+        return self._healthy
+
+    def _check_progress(self) -> bool:
+        """A busy pool is healthy while some job finished within one decode timeout; otherwise every worker is stuck."""
+        stalled = time.monotonic() - self._progress_at
+        self._healthy = stalled < self.timeout
+        if not self._healthy:
+            logger.error(f"Decoder pool made no progress for {stalled:.1f}s with {self._in_flight} jobs in flight")
+            self._restart()
+        self._last_check = time.monotonic()
+        return self._healthy
+
+    async def _run_health_checks(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            await self.health_check()
+
+    def _restart(self):
+        DECODER_RESTARTS.inc()
+        self._kill()
+        self._pool = ProcessPoolExecutor(max_workers=self.size, initializer=_init_worker)
+
+    def _kill(self):
+        if self._pool is None:
+            return
+        # shutdown() cannot interrupt a wedged worker, so terminate the processes outright.
+        processes = list((self._pool._processes or {}).values())
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        for process in processes:
+            process.kill()
+
+    def snapshot(self) -> dict:
+        return {
+            'healthy': self._healthy,
+            'workers': self.size,
+            'in_flight': self._in_flight,
+            'capacity': self.capacity,
+            'last_check_age_seconds': round(time.monotonic() - self._last_check, 1) if self._last_check else None,
+        }
+
+    async def close(self):
+        if self._health_task is not None:
+            self._health_task.cancel()
+        self._kill()
+        self._pool = None
+
+
+def create_decoder_pool() -> Optional[DecoderPool]:
+    if not DECODER_POOL_ENABLED:
+        return None
+    if not PYAV_AVAILABLE:
+        logger.warning("PyAV is not installed; compressed uploads will be decoded with the ffmpeg CLI.")
+        return None
+    return DecoderPool()
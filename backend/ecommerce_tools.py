@@ -1,6 +1,13 @@
+import os
 import random
 from typing import Optional, Dict, Any, List
 
+import catalog_snapshot
+
+# Optional memory-mapped catalog built with `python catalog_snapshot.py build`.
+# When set, product lookups and search candidates come from the shared snapshot.
+CATALOG_SNAPSHOT_PATH = os.getenv('CATALOG_SNAPSHOT_PATH', '')
+
 # --- Mock E-commerce Database ---
 MOCK_PRODUCTS = [
   {
@@ -54,6 +61,7 @@ MOCK_ORDERS = {
 
 # --- NEW DUMMY DATA ---
 MOCK_SHOPPING_CART = {} # Simulates a user's shopping cart
+EMPTY_CART_MESSAGE = "Your shopping cart is empty."
 
 MOCK_PRODUCT_REVIEWS = {
     "p001": [
@@ -70,12 +78,51 @@ MOCK_PRODUCT_REVIEWS = {
 }
 
 
+_CATALOG_SNAPSHOT = catalog_snapshot.open_snapshot(CATALOG_SNAPSHOT_PATH) if CATALOG_SNAPSHOT_PATH else None
+
+# Bumped whenever a table changes, so caches of tool results can tell stale entries apart.
+DATA_VERSIONS = {"catalog": 0, "orders": 0, "reviews": 0, "cart": 0}
+
+def mark_changed(*tables: str):
+    for table in tables:
+        DATA_VERSIONS[table] += 1
+
+
+# --- Catalog Access ---
+
+def _find_product(product_id: str) -> Optional[Dict[str, Any]]:
+    if _CATALOG_SNAPSHOT is not None:
+        return _CATALOG_SNAPSHOT.find(product_id)
+    return next((p for p in MOCK_PRODUCTS if p["id"] == product_id), None)
+
+def _related_products(product: Dict[str, Any]) -> List[Dict[str, Any]]:
+    related_ids = product.get("related_product_ids", [])
+    if _CATALOG_SNAPSHOT is not None:
+        rows = sorted(row for row in map(_CATALOG_SNAPSHOT.row_of, set(related_ids)) if row is not None)
+        return list(_CATALOG_SNAPSHOT.products(rows))
+    return [p for p in MOCK_PRODUCTS if p["id"] in related_ids]
+
+def _top_rated_products(product: Dict[str, Any], limit: int) -> List[Dict[str, Any]]:
+    if _CATALOG_SNAPSHOT is not None:
+        rows = _CATALOG_SNAPSHOT.top_rated_rows(product["category"], limit, exclude=_CATALOG_SNAPSHOT.row_of(product["id"]))
+        return list(_CATALOG_SNAPSHOT.products(rows))
+    category_products = [p for p in MOCK_PRODUCTS if p["category"] == product["category"] and p["id"] != product["id"]]
+    return sorted(category_products, key=lambda p: p.get("rating", 0), reverse=True)[:limit]
+
+def _search_candidates(query: str):
+    """Products that may match `query`; the snapshot's inverted index narrows this when it can."""
+    if _CATALOG_SNAPSHOT is not None:
+        rows = _CATALOG_SNAPSHOT.candidate_rows(query)
+        return _CATALOG_SNAPSHOT.products(rows)
+    return MOCK_PRODUCTS
+
+
 # --- Tool Functions ---
 
 def search_products(query: str, category: Optional[str] = None, max_price: Optional[float] = None) -> List[Dict[str, Any]]:
     """Searches for products in the e-commerce catalog."""
     results = [
-        p for p in MOCK_PRODUCTS 
+        p for p in _search_candidates(query)
         if query.lower() in p['name'].lower() or 
            query.lower() in p['description'].lower() or
            any(query.lower() in tag for tag in p['tags'])
@@ -118,17 +165,13 @@ def get_general_help(topic: str) -> str:
 
 def recommend_products(product_id: str, criteria: str = "related") -> List[Dict[str, Any]]:
     """Recommends products based on a given product ID and criteria."""
-    product = next((p for p in MOCK_PRODUCTS if p["id"] == product_id), None)
+    product = _find_product(product_id)
     if not product:
         return [{"error": "Product not found."}]
     if criteria == "related":
-        related_ids = product.get("related_product_ids", [])
-        return [p for p in MOCK_PRODUCTS if p["id"] in related_ids]
+        return _related_products(product)
     elif criteria == "top-rated":
-        category = product["category"]
-        category_products = [p for p in MOCK_PRODUCTS if p["category"] == category and p["id"] != product_id]
-        top_rated = sorted(category_products, key=lambda p: p.get("rating", 0), reverse=True)
-        return top_rated[:3]
+        return _top_rated_products(product, 3)
     return []
 
 # --- NEW TOOL FUNCTIONS ---
@@ -141,7 +184,7 @@ def add_to_cart(product_id: str, quantity: int) -> Dict[str, Any]:
     :param quantity: The number of units to add.
     :return: A confirmation message.
     """
-    product = next((p for p in MOCK_PRODUCTS if p["id"] == product_id), None)
+    product = _find_product(product_id)
     if not product:
         return {"error": f"Product with ID '{product_id}' not found."}
     if product["stock"] < quantity:
@@ -151,6 +194,7 @@ def add_to_cart(product_id: str, quantity: int) -> Dict[str, Any]:
         MOCK_SHOPPING_CART[product_id] += quantity
     else:
         MOCK_SHOPPING_CART[product_id] = quantity
+    mark_changed("cart")
         
     return {"status": "success", "message": f"Added {quantity} x {product['name']} to your cart."}
 
@@ -161,13 +205,13 @@ def view_cart() -> Dict[str, Any]:
     :return: A summary of the cart.
     """
     if not MOCK_SHOPPING_CART:
-        return {"items": [], "total_price": 0, "message": "Your shopping cart is empty."}
+        return {"items": [], "total_price": 0, "message": EMPTY_CART_MESSAGE}
     
     cart_items = []
     total_price = 0.0
     
     for product_id, quantity in MOCK_SHOPPING_CART.items():
-        product = next((p for p in MOCK_PRODUCTS if p["id"] == product_id), None)
+        product = _find_product(product_id)
         if product:
             item_total = product["price"] * quantity
             total_price += item_total
@@ -0,0 +1,116 @@
+"""
+Degraded-mode paths used when Groq is unavailable or its circuit breaker is open:
+rule-based tool routing in place of LLM tool selection, and templated replies
+in place of LLM response synthesis.
+"""
+import re
+from typing import Dict, Any
+
+FALLBACK_ERROR_RESPONSE = "I'm having a little trouble right now. Could you say that again?"
+NO_TOOL_FOUND_RESPONSE = "I am not sure how to help with that. Could you please rephrase your request?"
+
+_ORDER_ID_RE = re.compile(r'\bord_\d+\b', re.IGNORECASE)
+_PRODUCT_ID_RE = re.compile(r'\bp\d{3,}\b', re.IGNORECASE)
+_QUANTITY_RE = re.compile(r'\b(\d+|one|two|three|four|five|six|seven|eight|nine|ten)\b', re.IGNORECASE)
+_REFERENCE_RE = re.compile(r'\b(those|these|that|this|it|them|one)\b', re.IGNORECASE)
+_SEARCH_PREFIX_RE = re.compile(
+    r"^.*?\b(find|search for|search|show me|looking for|look for|do you have|do you sell|i need|i want)\b", re.IGNORECASE)
+_WORD_RE = re.compile(r"[a-z0-9'-]+")
+
+_QUANTITY_WORDS = {'one': 1, 'two': 2, 'three': 3, 'four': 4, 'five': 5,
+                   'six': 6, 'seven': 7, 'eight': 8, 'nine': 9, 'ten': 10}
+_HELP_TOPICS = ('hour', 'open', 'return', 'refund', 'contact', 'support')
+_STOPWORDS = {'a', 'an', 'the', 'some', 'any', 'me', 'for', 'please', 'you', 'your', 'of', 'to', 'in', 'my', 'i', 'can'}
+
+
+def _quantity(text: str) -> int:
+    match = _QUANTITY_RE.search(text)
+    if not match:
+        return 1
+    word = match.group(1).lower()
+    return max(1, int(word) if word.isdigit() else _QUANTITY_WORDS[word])
+
+
+def refers_to_context(text: str) -> bool:
+    """True when `text` may point back at earlier turns ("add those", "where's my order") instead of naming ids."""
+    return bool(_REFERENCE_RE.search(text)) or ('order' in text.lower() and not _ORDER_ID_RE.search(text))
+
+
+def route_by_rules(text: str, conversation=None) -> Dict[str, Any]:
+    """Maps a request to {"tool_name", "parameters"} with keyword rules, using conversation entities for references."""
+    lower = text.lower()
+    product_ids = [m.lower() for m in _PRODUCT_ID_RE.findall(text)]
+    if not product_ids and conversation is not None and _REFERENCE_RE.search(lower):
+        product_ids = list(conversation.last_product_ids)
+    order_match = _ORDER_ID_RE.search(text)
+    order_id = order_match.group(0).lower() if order_match else None
+    if not order_id and conversation is not None and 'order' in lower:
+        order_id = conversation.last_order_id
+
+    if order_match or (order_id and 'order' in lower):
+        return {"tool_name": "get_order_status", "parameters": {"order_id": order_id}}
+    if 'review' in lower and product_ids:
+        return {"tool_name": "get_product_reviews", "parameters": {"product_id": product_ids[0]}}
+    if re.search(r'\b(add|buy|put)\b', lower) and product_ids:
+        text_without_ids = _PRODUCT_ID_RE.sub(' ', text)
+        return {"tool_name": "add_to_cart", "parameters": {"product_id": product_ids[0], "quantity": _quantity(text_without_ids)}}
+    if 'cart' in lower:
+        return {"tool_name": "view_cart", "parameters": {}}
+    if re.search(r'\b(recommend|similar|suggest|alternatives?)\b', lower) and product_ids:
+        criteria = "top-rated" if re.search(r'\b(top|best|highest)\b', lower) else "related"
+        return {"tool_name": "recommend_products", "parameters": {"product_id": product_ids[0], "criteria": criteria}}
+    topic = next((t for t in _HELP_TOPICS if t in lower), None)
+    if topic:
+        return {"tool_name": "get_general_help", "parameters": {"topic": topic}}
+
+    remainder = _SEARCH_PREFIX_RE.sub('', lower, count=1)
+    words = [w for w in _WORD_RE.findall(remainder) if w not in _STOPWORDS]
+    if words:
+        return {"tool_name": "search_products", "parameters": {"query": " ".join(words)}}
+    return {"tool_name": "no_tool_found", "parameters": {}}
+
+
+# --- Templated responses ---
+
+def _product_list(products) -> str:
+    return ", ".join(f"{p['name']} (${p['price']:.2f})" for p in products[:3])
+
+
+def render_template(tool_name: str, result: Any) -> str:
+    """A plain, friendly reply built directly from a tool result."""
+    if tool_name == "error":
+        return FALLBACK_ERROR_RESPONSE
+    if tool_name == "plan" and isinstance(result, dict):
+        return " ".join(render_template(step["tool_name"], step["result"]) for step in result.values())
+    if isinstance(result, str):
+        return result
+    if isinstance(result, dict) and "error" in result:
+        error = str(result["error"] or "something went wrong.")
+        return f"Sorry, {error[0].lower()}{error[1:]}"
+    if isinstance(result, list) and result and isinstance(result[0], dict) and "error" in result[0]:
+        return render_template(tool_name, result[0])
+
+    if tool_name == "search_products":
+        if not result:
+            return "I couldn't find any products matching that. Could you try different words?"
+        more = f" and {len(result) - 3} more" if len(result) > 3 else ""
+        return f"I found {len(result)} product{'s' if len(result) != 1 else ''}: {_product_list(result)}{more}."
+    if tool_name == "recommend_products":
+        if not result:
+            return "I don't have any recommendations for that product right now."
+        return f"You might also like: {_product_list(result)}."
+    if tool_name == "get_order_status":
+        return f"Your order is currently {result.get('status', 'being processed').lower()}, with a total of ${result.get('total', 0):.2f}."
+    if tool_name == "view_cart":
+        if result.get("message"):
+            return result["message"]
+        count = sum(item["quantity"] for item in result.get("items", []))
+        return f"You have {count} item{'s' if count != 1 else ''} in your cart, totalling ${result.get('total_price', 0):.2f}."
+    if tool_name == "get_product_reviews":
+        if result and "message" in result[0]:
+            return result[0]["message"]
+        average = sum(r["rating"] for r in result) / len(result)
+        return f"Customers rate it {average:.1f} out of 5. One reviewer says: \"{result[0]['comment']}\""
+    if isinstance(result, dict) and result.get("message"):
+        return result["message"]
+    return NO_TOOL_FOUND_RESPONSE
@@ -0,0 +1,183 @@
+"""
+Deadline-bound, hedged and retried Groq chat completions.
+
+Every call belongs to a pipeline stage with its own deadline. If the first
+request has not answered by the stage's observed p95 latency, an identical
+hedge request is fired and whichever finishes first wins; the other is
+cancelled. Transient errors (connection problems, 429s, 5xx) are retried with
+jittered exponential backoff as long as the stage deadline allows. With a
+SingleFlight group, concurrent calls with identical arguments share one request.
+"""
+import asyncio
+import json
+import logging
+import os
+import random
+import time
+from collections import deque
+from typing import Optional, Dict, Any
+
+import metrics
+import tracing
+from circuit_breaker import CircuitBreaker
+from single_flight import SingleFlight
+
+logger = logging.getLogger('MultiAgentOrchestrator')
+
+try:
+    import groq
+    _TRANSIENT_ERRORS = (groq.APIConnectionError, groq.RateLimitError, groq.InternalServerError)
+except ImportError:
+    _TRANSIENT_ERRORS = ()
+
+LLM_STAGE_DEADLINES = {
+    'emotion': float(os.getenv('LLM_DEADLINE_EMOTION', '3')),
+    'tool_selection': float(os.getenv('LLM_DEADLINE_TOOL_SELECTION', '5')),
+    'plan_resolution': float(os.getenv('LLM_DEADLINE_PLAN_RESOLUTION', '4')),
+    'synthesis': float(os.getenv('LLM_DEADLINE_SYNTHESIS', '6')),
+}
+LLM_DEFAULT_DEADLINE = float(os.getenv('LLM_DEFAULT_DEADLINE', '6'))
+LLM_MAX_RETRIES = int(os.getenv('LLM_MAX_RETRIES', '2'))
+LLM_RETRY_BASE_DELAY = float(os.getenv('LLM_RETRY_BASE_DELAY', '0.2'))
+LLM_RETRY_MAX_DELAY = float(os.getenv('LLM_RETRY_MAX_DELAY', '2'))
+LLM_HEDGING_ENABLED = os.getenv('LLM_HEDGING_ENABLED', 'true').lower() == 'true'
+LLM_HEDGE_QUANTILE = float(os.getenv('LLM_HEDGE_QUANTILE', '0.95'))
+# Until a stage has enough samples for a stable p95, hedge after this fixed delay.
+LLM_HEDGE_DEFAULT_DELAY = float(os.getenv('LLM_HEDGE_DEFAULT_DELAY', '1.5'))
+LLM_HEDGE_MIN_SAMPLES = 20
+LLM_LATENCY_WINDOW = 200
+
+LLM_HEDGES = metrics.counter('llm_hedged_requests_total', 'Duplicate LLM requests fired after the hedge delay.', ['stage'])
+LLM_HEDGE_WINS = metrics.counter('llm_hedge_wins_total', 'Hedged LLM requests that answered before the original.', ['stage'])
+LLM_RETRIES = metrics.counter('llm_retries_total', 'LLM requests retried after a transient error.', ['stage'])
+LLM_DEADLINES_EXCEEDED = metrics.counter('llm_deadline_exceeded_total', 'LLM calls abandoned at the stage deadline.', ['stage'])
+LLM_DURATION = metrics.histogram('llm_request_duration_seconds', 'LLM calls by stage, including hedges and retries.', ['stage'])
+LLM_TOKENS = metrics.counter('llm_tokens_total', 'LLM tokens by stage and direction (input prompt, output completion).', ['stage', 'direction'])
+
+
+class LLMDeadlineExceeded(TimeoutError):
+    pass
+
+
+class _LatencyWindow:
+    def __init__(self, size: int = LLM_LATENCY_WINDOW):
+        self._samples = deque(maxlen=size)
+
+    def add(self, seconds: float):
+        self._samples.append(seconds)
+
+    def quantile(self, q: float):
+        if len(self._samples) < LLM_HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class HedgedLLMClient:
+    def __init__(self, client, deadlines: Dict[str, float] = LLM_STAGE_DEADLINES, breaker: Optional[CircuitBreaker] = None,
+                 single_flight: Optional[SingleFlight] = None):
+        self._client = client
+        self._deadlines = deadlines
+        self.breaker = breaker
+        self._single_flight = single_flight
+        self._latency: Dict[str, _LatencyWindow] = {}
+
+    def hedge_delay(self, stage: str) -> float:
+        window = self._latency.setdefault(stage, _LatencyWindow())
+        p95 = window.quantile(LLM_HEDGE_QUANTILE)
+        return p95 if p95 is not None else LLM_HEDGE_DEFAULT_DELAY
+
+    async def _timed_call(self, stage: str, kwargs: Dict[str, Any]):
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        result = await self._client.chat.completions.create(**kwargs)
+        self._latency.setdefault(stage, _LatencyWindow()).add(loop.time() - start)
+        return result
+
+    async def _hedged(self, stage: str, kwargs: Dict[str, Any]):
+        primary = asyncio.create_task(self._timed_call(stage, kwargs))
+        tasks = {primary}
+        try:
+            if LLM_HEDGING_ENABLED:
+                done, _ = await asyncio.wait(tasks, timeout=self.hedge_delay(stage))
+                if not done:
+                    LLM_HEDGES.inc(stage=stage)
+                    tasks.add(asyncio.create_task(self._timed_call(stage, kwargs)))
+            error = None
+            while tasks:
+                done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not primary:
+                            LLM_HEDGE_WINS.inc(stage=stage)
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def complete(self, stage: str, **kwargs):
+        """
+        Runs a chat completion for `stage`, raising LLMDeadlineExceeded once its
+        deadline passes, or CircuitOpenError without calling Groq while the breaker is open.
+        """
+        if self._single_flight is None:
+            return await self._complete_traced(stage, kwargs)
+        key = (stage, json.dumps(kwargs, sort_keys=True, default=str))
+        return await self._single_flight.do(key, lambda: self._complete_traced(stage, kwargs))
+
+    async def _complete_traced(self, stage: str, kwargs: Dict[str, Any]):
+        # Checked by the call that reaches Groq, not by callers sharing it, so every allowed call is recorded.
+        if self.breaker is not None:
+            self.breaker.check()
+        with tracing.span(f"llm.{stage}", kind=tracing.KIND_CLIENT, **{'llm.stage': stage, 'llm.model': kwargs.get('model')}) as llm_span:
+            kwargs = dict(kwargs, extra_headers=tracing.inject(kwargs.get('extra_headers')))
+            return await self._complete_recorded(stage, kwargs, llm_span)
+
+    async def _complete_recorded(self, stage: str, kwargs: Dict[str, Any], llm_span):
+        start = time.monotonic()
+        try:
+            result = await self._complete(stage, kwargs)
+        except asyncio.CancelledError:
+            if self.breaker is not None:
+                self.breaker.abandon()
+            raise
+        except Exception:
+            elapsed = time.monotonic() - start
+            LLM_DURATION.observe(elapsed, stage=stage)
+            metrics.DEPENDENCY_ERRORS.inc(dependency='groq')
+            if self.breaker is not None:
+                self.breaker.record(elapsed, failed=True)
+            raise
+        elapsed = time.monotonic() - start
+        LLM_DURATION.observe(elapsed, stage=stage)
+        usage = getattr(result, 'usage', None)
+        if usage is not None:
+            LLM_TOKENS.inc(usage.prompt_tokens or 0, stage=stage, direction='input')
+            LLM_TOKENS.inc(usage.completion_tokens or 0, stage=stage, direction='output')
+            llm_span.set_attribute('llm.input_tokens', usage.prompt_tokens or 0)
+            llm_span.set_attribute('llm.output_tokens', usage.completion_tokens or 0)
+        if self.breaker is not None:
+            self.breaker.record(elapsed)
+        return result
+
+    async def _complete(self, stage: str, kwargs: Dict[str, Any]):
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self._deadlines.get(stage, LLM_DEFAULT_DEADLINE)
+        attempt = 0
+        while True:
+            remaining = deadline - loop.time()
+            try:
+                return await asyncio.wait_for(self._hedged(stage, dict(kwargs, timeout=remaining)), remaining)
+            except asyncio.TimeoutError:
+                LLM_DEADLINES_EXCEEDED.inc(stage=stage)
+                raise LLMDeadlineExceeded(f"LLM stage '{stage}' exceeded its deadline.")
+            except _TRANSIENT_ERRORS as e:
+                attempt += 1
+                backoff = random.uniform(0, min(LLM_RETRY_MAX_DELAY, LLM_RETRY_BASE_DELAY * 2 ** attempt))
+                if attempt > LLM_MAX_RETRIES or loop.time() + backoff >= deadline:
+                    raise
+                LLM_RETRIES.inc(stage=stage)
+                logger.warning(f"Transient LLM error in stage '{stage}' ({e}); retry {attempt} in {backoff:.2f}s")
+                await asyncio.sleep(backoff)
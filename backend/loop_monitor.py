@@ -0,0 +1,83 @@
+"""
+Event-loop lag monitor and blocking-call detector.
+
+A heartbeat task sleeps for a fixed interval and records how late it wakes up
+as `event_loop_lag_seconds`. A watchdog thread watches the heartbeat. When the
+loop has not ticked for LOOP_BLOCK_THRESHOLD_SECONDS, the watchdog logs the loop
+thread's current stack, which shows the coroutine or callback holding the loop.
+It logs once per blocking episode, so a long stall produces one report and not
+a flood. Unlike asyncio's debug mode, this catches the block while it is
+happening and costs one wake-up per interval.
+"""
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from typing import Optional
+
+import metrics
+
+logger = logging.getLogger('MultiAgentOrchestrator')
+
+LOOP_MONITOR_ENABLED = os.getenv('LOOP_MONITOR_ENABLED', 'true').lower() == 'true'
+LOOP_MONITOR_INTERVAL_SECONDS = float(os.getenv('LOOP_MONITOR_INTERVAL_SECONDS', '0.1'))
+LOOP_BLOCK_THRESHOLD_SECONDS = float(os.getenv('LOOP_BLOCK_THRESHOLD_SECONDS', '0.25'))
+
+LOOP_LAG = metrics.histogram('event_loop_lag_seconds', 'How late the event loop heartbeat woke up.',
+                             buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0))
+LOOP_BLOCKED = metrics.counter('event_loop_blocked_total', 'Times the event loop was blocked past the threshold.')
+
+
+class LoopMonitor:
+    def __init__(self, interval: float = LOOP_MONITOR_INTERVAL_SECONDS, threshold: float = LOOP_BLOCK_THRESHOLD_SECONDS):
+        self.interval = interval
+        self.threshold = threshold
+        self._last_tick = time.monotonic()
+        self._loop_thread_id: Optional[int] = None
+        self._heartbeat: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    def start(self):
+        """Starts monitoring the running loop; call from inside it."""
+        self._loop_thread_id = threading.get_ident()
+        self._last_tick = time.monotonic()
+        self._heartbeat = asyncio.create_task(self._beat())
+        self._watchdog = threading.Thread(target=self._watch, name='loop-watchdog', daemon=True)
+        self._watchdog.start()
+
+    async def _beat(self):
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            LOOP_LAG.observe(max(0.0, now - expected))
+            self._last_tick = now
+
+    def _watch(self):
+        reported = False
+        while not self._stopped.wait(self.interval):
+            # The heartbeat is due one interval after its last tick; anything past that is lag.
+            stalled = time.monotonic() - self._last_tick - self.interval
+            if stalled < self.threshold:
+                reported = False
+                continue
+            if reported:
+                continue
+            reported = True
+            LOOP_BLOCKED.inc()
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = "".join(traceback.format_stack(frame)) if frame is not None else "(stack unavailable)\n"
+            logger.warning(f"Event loop blocked for at least {stalled:.3f}s; loop thread is at:\n{stack.rstrip()}")
+
+    async def stop(self):
+        self._stopped.set()
+        if self._heartbeat is not None:
+            self._heartbeat.cancel()
+            try:
+                await self._heartbeat
+            except asyncio.CancelledError:
+                pass
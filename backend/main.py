@@ -1,19 +1,46 @@
 import os
+import asyncio
+import functools
 import tempfile
-import subprocess
 import logging
-import requests
+import time
 import re
-import speech_recognition as sr
 import json
+import secrets
 
-from fastapi import FastAPI, HTTPException, UploadFile, File
+from contextlib import asynccontextmanager, contextmanager
+from fastapi import FastAPI, HTTPException, Request, WebSocket, WebSocketDisconnect, Depends, Header, Query
+from fastapi.encoders import jsonable_encoder
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, FileResponse
 from pydantic import BaseModel
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Tuple
 
 # --- Import your new e-commerce tools ---
 import ecommerce_tools
+from conversation_memory import ConversationStore, ConversationState
+import planner
+import metrics
+import tracing
+import profiler
+from loop_monitor import LoopMonitor, LOOP_MONITOR_ENABLED
+from llm_client import HedgedLLMClient
+from circuit_breaker import CircuitBreaker, CircuitOpenError
+import fallbacks
+from tts_client import MurfClient
+import audio_store
+from audio_store import AudioStore, TTS_AUDIO_DELIVERY
+import audio_formats
+import audio_input
+import upload_stream
+import speculation
+from decoder_pool import create_decoder_pool, DecoderBusyError
+import stt_backends
+import vad
+from phrase_bank import PhraseBank, default_phrases, TTS_PHRASE_BANK_ENABLED, TTS_PHRASE_BANK_FORMATS
+from response_cache import ResponseCache, cache_key, RESPONSE_CACHE_ENABLED
+from single_flight import SingleFlight, SINGLE_FLIGHT_ENABLED
+from admission import AdmissionController, AdmissionMiddleware, ADMISSION_ENABLED
 
 # Load environment variables
 try:
@@ -28,10 +55,45 @@ logging.basicConfig(level=logging.INFO)
 GROQ_API_KEY = os.getenv('GROQ_API_KEY', '')
 MURF_API_KEY = os.getenv('MURF_API_KEY', '')
 MODEL_NAME = os.getenv('GROQ_MODEL', 'llama-3.1-8b-instant')
-MURF_GENERATE_URL = "https://api.murf.ai/v1/speech/generate"
-
-app = FastAPI(title="Agentic E-commerce Orchestrator", version="3.1.0") # Version bump for the fix
-
+MURF_GENERATE_URL = os.getenv('MURF_GENERATE_URL', 'https://api.murf.ai/v1/speech/generate')
+PLANNER_ENABLED = os.getenv('PLANNER_ENABLED', 'true').lower() == 'true'
+MURF_TIMEOUT_SECONDS = float(os.getenv('MURF_TIMEOUT_SECONDS', '15'))
+ADMIN_TOKEN = os.getenv('ADMIN_TOKEN', '') # Enables the /admin endpoints; sent as 'Authorization: Bearer <token>'
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+  # Open pooled upstream connections before the first request and close them on shutdown.
+  warm_phrases = None
+  tracing.configure()
+  if loop_monitor is not None:
+    loop_monitor.start()
+  if decoder_pool is not None:
+    await decoder_pool.start()
+  if MURF_API_KEY:
+    await murf_client.start()
+    # Remote Murf URLs expire, so the phrase bank needs the local audio cache.
+    if TTS_PHRASE_BANK_ENABLED and tts_cache is not None:
+      warm_phrases = asyncio.create_task(phrase_bank.warm(
+        voice_synthesizer.synthesize_speech, voice_synthesizer.emotion_voice_settings, TTS_PHRASE_BANK_FORMATS or [None]))
+  yield
+  if warm_phrases is not None:
+    warm_phrases.cancel()
+  stt_backend.close()
+  if decoder_pool is not None:
+    await decoder_pool.close()
+  await murf_client.aclose()
+  if groq_client:
+    await groq_client.close()
+  if loop_monitor is not None:
+    await loop_monitor.stop()
+  tracing.shutdown()
+
+app = FastAPI(title="Agentic E-commerce Orchestrator", version="3.1.0", lifespan=lifespan) # Version bump for the fix
+
+# Added first so CORS headers reach its 429/503 responses and tracing still sees rejected requests.
+admission_controller = AdmissionController() if ADMISSION_ENABLED else None
+if admission_controller is not None:
+  app.add_middleware(AdmissionMiddleware, controller=admission_controller, paths=("/chat", "/process_speech"))
 app.add_middleware(
   CORSMiddleware,
   allow_origins=["*"], # Adjust in production
@@ -39,17 +101,52 @@ app.add_middleware(
   allow_methods=["*"],
   allow_headers=["*"],
 )
+app.add_middleware(tracing.TracingMiddleware)
 
-recognizer = sr.Recognizer()
+stt_backend = stt_backends.create_backend()
+decoder_pool = create_decoder_pool()
+loop_monitor = LoopMonitor() if LOOP_MONITOR_ENABLED else None
 
 # Groq client init
 try:
-  from groq import Groq
-  groq_client = Groq(api_key=GROQ_API_KEY) if GROQ_API_KEY else None
+  from groq import AsyncGroq
+  # Retries are handled by HedgedLLMClient, which knows each stage's deadline.
+  groq_client = AsyncGroq(api_key=GROQ_API_KEY, max_retries=0) if GROQ_API_KEY else None
 except ImportError:
   groq_client = None
   logger.warning("Groq is not installed, LLM features disabled.")
 
+# Circuit breakers: while open, requests skip the dependency and degrade at once.
+groq_breaker = CircuitBreaker('groq', slow_call_seconds=float(os.getenv('GROQ_SLOW_CALL_SECONDS', '4')),
+                              open_seconds=float(os.getenv('GROQ_BREAKER_OPEN_SECONDS', '30')))
+murf_breaker = CircuitBreaker('murf', slow_call_seconds=float(os.getenv('MURF_SLOW_CALL_SECONDS', '6')),
+                              open_seconds=float(os.getenv('MURF_BREAKER_OPEN_SECONDS', '30')))
+# Concurrent identical Groq prompts and Murf syntheses share one upstream call.
+llm_flights = SingleFlight('llm') if SINGLE_FLIGHT_ENABLED else None
+tts_flights = SingleFlight('tts') if SINGLE_FLIGHT_ENABLED else None
+llm_client = HedgedLLMClient(groq_client, breaker=groq_breaker, single_flight=llm_flights) if groq_client else None
+murf_client = MurfClient(MURF_API_KEY, MURF_GENERATE_URL, MURF_TIMEOUT_SECONDS)
+tts_cache = AudioStore() if TTS_AUDIO_DELIVERY != 'remote' else None
+phrase_bank = PhraseBank(default_phrases())
+response_cache = ResponseCache(ecommerce_tools.DATA_VERSIONS) if RESPONSE_CACHE_ENABLED else None
+
+REQUEST_STAGE_SECONDS = metrics.histogram('request_stage_duration_seconds', 'Time spent in each stage of a voice or chat request.', ('stage',))
+TOOL_SECONDS = metrics.histogram('tool_execution_duration_seconds', 'Tool call durations, whichever path runs them.', ('tool',))
+
+@contextmanager
+def pipeline_stage(name: str):
+  """Times a pipeline stage into REQUEST_STAGE_SECONDS and wraps it in a trace span."""
+  with tracing.span(f"stage.{name}"), REQUEST_STAGE_SECONDS.time(stage=name):
+    yield
+
+def instrumented_tool(name: str, function):
+  """`function` wrapped in a trace span and timed into TOOL_SECONDS."""
+  @functools.wraps(function)
+  def run(*args, **kwargs):
+    with tracing.span(f"tool.{name}", **{"tool.name": name}), TOOL_SECONDS.time(tool=name):
+      return function(*args, **kwargs)
+  return run
+
 # [ AdvancedEmotionDetector CLASS as defined in your original code ]
 class AdvancedEmotionDetector:
     def __init__(self):
@@ -74,6 +171,8 @@ class AdvancedEmotionDetector:
             'medium': ['quite', 'fairly', 'somewhat', 'rather', 'pretty', 'kind of'],
             'low': ['a bit', 'a little', 'slightly', 'somewhat']
         }
+        self.keyword_patterns = {emotion: [re.compile(rf"\b{re.escape(keyword)}\b") for keyword in keywords]
+                                 for emotion, keywords in self.emotion_keywords.items()}
 
     def detect_emotion_intensity(self, text):
         text_lower = text.lower()
@@ -85,7 +184,16 @@ class AdvancedEmotionDetector:
         if any(intensifier in text_lower for intensifier in self.intensifiers['low']): return 'low'
         return 'medium'
 
-    def llm_emotion_detection(self, text):
+    def lexicon_emotion_detection(self, text):
+        """Keyword-only emotion detection, used when the LLM is unavailable."""
+        text_lower = text.lower()
+        scores = {emotion: sum(1 for pattern in patterns if pattern.search(text_lower))
+                  for emotion, patterns in self.keyword_patterns.items()}
+        emotion, hits = max(scores.items(), key=lambda item: item[1])
+        if not hits: return None, 0, 'medium'
+        return emotion, min(0.4 + 0.15 * hits, 0.9), self.detect_emotion_intensity(text)
+
+    async def llm_emotion_detection(self, text):
         if not groq_client: return None, 0, 'medium'
         try:
             emotion_list = list(self.emotion_keywords.keys())
@@ -93,7 +201,8 @@ class AdvancedEmotionDetector:
 Respond in this exact format:
 Primary: [emotion from list: {', '.join(emotion_list)}]
 Confidence: [0.1-1.0]"""
-            response = groq_client.chat.completions.create(
+            response = await llm_client.complete(
+                'emotion',
                 messages=[{"role": "user", "content": emotion_prompt}],
                 model=MODEL_NAME, temperature=0.3, max_tokens=50
             )
@@ -106,12 +215,16 @@ Confidence: [0.1-1.0]"""
                 if emotion in emotion_list:
                     return emotion, confidence, self.detect_emotion_intensity(text)
             return None, 0, 'medium'
+        except CircuitOpenError:
+            return None, 0, 'medium'
         except Exception as e:
             logger.error(f"LLM emotion detection failed: {e}")
             return None, 0, 'medium'
 
-    def detect_comprehensive_emotion(self, text):
-        llm_emotion, llm_confidence, llm_intensity = self.llm_emotion_detection(text)
+    async def detect_comprehensive_emotion(self, text):
+        llm_emotion, llm_confidence, llm_intensity = await self.llm_emotion_detection(text)
+        if not llm_emotion:
+            llm_emotion, llm_confidence, llm_intensity = self.lexicon_emotion_detection(text)
         return {
             'emotion': llm_emotion or 'neutral',
             'confidence': llm_confidence,
@@ -138,7 +251,16 @@ class VoiceSynthesizer:
             settings['pitch'] = max(settings['pitch'] * 0.98, 0.85)
         return settings
 
-    def synthesize_speech(self, text, emotion_data):
+    def _deliver(self, name, data):
+        return audio_store.data_uri(name, data) if TTS_AUDIO_DELIVERY == 'inline' else audio_store.local_url(name)
+
+    async def _deliver_cached(self, name):
+        if TTS_AUDIO_DELIVERY == 'inline':
+            data = await asyncio.to_thread(tts_cache.read, name)
+            return self._deliver(name, data) if data else None
+        return audio_store.local_url(name) if tts_cache.path_for(name) else None
+
+    async def synthesize_speech(self, text, emotion_data, audio_format=None):
         if not MURF_API_KEY:
             logger.warning("No Murf API key available; skipping TTS")
             return None
@@ -146,26 +268,77 @@ class VoiceSynthesizer:
         intensity = emotion_data.get('intensity', 'medium')
         base_settings = self.emotion_voice_settings.get(emotion, self.emotion_voice_settings['neutral'])
         settings = self.adjust_voice_for_intensity(base_settings, intensity)
-        
-        payload = {
-            "voiceId": "en-US-natalie", "style": "conversational", "text": text,
-            "rate": settings['rate'], "pitch": settings['pitch'], "format": "WAV", "sampleRate": 44100
+
+        # Bank phrases are keyed by their canonical spelling so near-identical replies share the pre-synthesized clip.
+        canonical = phrase_bank.canonical(text) if tts_cache is not None else None
+        if canonical:
+            text = canonical
+        # Formats Murf cannot produce need the local cache to hold the transcoded result.
+        output = audio_formats.negotiate_format(audio_format, allow_transcode=tts_cache is not None)
+        voice = {
+            "voiceId": "en-US-natalie", "style": "conversational",
+            "rate": settings['rate'], "pitch": settings['pitch'],
+            "format": output.upstream_format, "sampleRate": output.upstream_sample_rate
         }
-        headers = {"api-key": MURF_API_KEY, "Content-Type": "application/json"}
+        name = f"{audio_store.audio_key(text, {**voice, 'output': f'{output.name}@{output.sample_rate}'})}.{output.extension}"
+        if canonical:
+            # A local URL is only good while the store still holds the file; LRU eviction may have removed it.
+            banked = phrase_bank.get(name, exists=None if TTS_AUDIO_DELIVERY == 'inline' else tts_cache.path_for)
+            if banked:
+                return banked
+        payload = {**voice, "text": text}
+        if tts_flights is not None:
+            # `name` hashes everything that determines the audio, so equal names mean interchangeable results.
+            audio_url = await tts_flights.do(name, lambda: self._synthesize(name, payload, output))
+        else:
+            audio_url = await self._synthesize(name, payload, output)
+        if canonical and audio_url and tts_cache.path_for(name):
+            phrase_bank.put(name, audio_url)
+        return audio_url
+
+    async def _synthesize(self, name, payload, output):
+        if tts_cache is not None:
+            cached = await self._deliver_cached(name)
+            if cached:
+                return cached
+        if not murf_breaker.allow_request():
+            logger.info("Murf circuit breaker is open; replying text-only")
+            return None
+        start = time.monotonic()
         try:
-            response = requests.post(MURF_GENERATE_URL, json=payload, headers=headers, timeout=15)
-            response.raise_for_status()
-            audio_url = response.json().get('audioFile')
-            logger.info(f"Generated TTS audio URL: {audio_url}")
-            return audio_url
+            audio_url = (await murf_client.generate(payload)).get('audioFile')
+        except asyncio.CancelledError:
+            murf_breaker.abandon()
+            raise
         except Exception as e:
+            murf_breaker.record(time.monotonic() - start, failed=True)
+            metrics.DEPENDENCY_ERRORS.inc(dependency='murf')
             logger.error(f"Speech synthesis error: {e}")
-        return None
+            return None
+        murf_breaker.record(time.monotonic() - start)
+        logger.info(f"Generated TTS audio URL: {audio_url}")
+        if tts_cache is not None and audio_url:
+            try:
+                data = await murf_client.download(audio_url)
+                if output.needs_transcode:
+                    data = await audio_formats.transcode(data, output)
+                await asyncio.to_thread(tts_cache.put, name, data)
+                return self._deliver(name, data)
+            except Exception as e:
+                metrics.DEPENDENCY_ERRORS.inc(dependency='murf_download')
+                if output.needs_transcode:
+                    # Murf's own file is not in the format the client asked for.
+                    logger.error(f"Preparing {output.name} audio failed; replying text-only: {e}")
+                    return None
+                logger.error(f"Caching TTS audio failed, returning the remote URL: {e}")
+        return audio_url
 
 # --- Define and Register Agentic Tools ---
 AVAILABLE_TOOLS = {
     "search_products": {
         "function": ecommerce_tools.search_products,
+        "read_only": True,
+        "reads": ("catalog",),
         "description": "Searches for products in the e-commerce catalog based on a query, category, and maximum price.",
         "parameters": {
             "type": "object",
@@ -178,6 +351,8 @@ AVAILABLE_TOOLS = {
     },
     "get_order_status": {
         "function": ecommerce_tools.get_order_status,
+        "read_only": True,
+        "reads": ("orders",),
         "description": "Retrieves the status and details of a specific order using its ID.",
         "parameters": {
             "type": "object",
@@ -187,6 +362,8 @@ AVAILABLE_TOOLS = {
     },
     "recommend_products": {
         "function": ecommerce_tools.recommend_products,
+        "read_only": True,
+        "reads": ("catalog",),
         "description": "Recommends other products based on a specific product and criteria like 'related' items or 'top-rated' in the same category.",
         "parameters": {
             "type": "object",
@@ -199,6 +376,8 @@ AVAILABLE_TOOLS = {
     },
     "get_general_help": {
         "function": ecommerce_tools.get_general_help,
+        "read_only": True,
+        "reads": (),
         "description": "Provides general help or information about common topics like store hours, return policy, or contact info.",
         "parameters": {
             "type": "object",
@@ -220,11 +399,15 @@ AVAILABLE_TOOLS = {
     },
     "view_cart": {
         "function": ecommerce_tools.view_cart,
+        "read_only": True,
+        "reads": ("cart", "catalog"),
         "description": "Shows the current contents of the user's shopping cart, including items and total price.",
         "parameters": {"type": "object", "properties": {}}
     },
     "get_product_reviews": {
         "function": ecommerce_tools.get_product_reviews,
+        "read_only": True,
+        "reads": ("reviews",),
         "description": "Retrieves customer reviews for a specific product by its ID.",
         "parameters": {
             "type": "object",
@@ -236,70 +419,116 @@ AVAILABLE_TOOLS = {
     }
 }
 
+# Trace and time every tool call, whether it runs directly, inside a plan or speculatively.
+for _tool_name, _tool in AVAILABLE_TOOLS.items():
+    _tool["function"] = instrumented_tool(_tool_name, _tool["function"])
+
+# Read-only tools that may run on partial transcripts before the user finishes speaking.
+SPECULATIVE_TOOLS = speculation.speculative_tools(AVAILABLE_TOOLS) if speculation.SPECULATION_ENABLED else frozenset()
+
 # --- Agentic Core Logic ---
-def choose_and_execute_tool(text: str):
-    if not groq_client: return {"error": "LLM client not available."}
+def _plan_parameter_resolver(text: str):
+    """Builds the resolver the planner calls for steps whose parameters depend on earlier results."""
+    async def resolve(step: planner.PlanStep, dependency_results: Dict[str, Any]) -> Dict[str, Any]:
+        prompt = f"""The user asked: "{text}"
+Earlier steps returned: {json.dumps(dependency_results)}
+Fill in the parameters for the tool "{step.tool_name}" with schema {json.dumps(AVAILABLE_TOOLS[step.tool_name]["parameters"])}.
+Current parameters ("?" means undecided): {json.dumps(step.parameters)}
+Respond with ONLY the JSON object of parameters."""
+        completion = await llm_client.complete(
+            'plan_resolution',
+            messages=[{"role": "user", "content": prompt}],
+            model=MODEL_NAME, temperature=0.0, max_tokens=128, response_format={"type": "json_object"}
+        )
+        return json.loads(completion.choices[0].message.content)
+    return resolve
+
+async def execute_plan(text: str, raw_plan: Dict[str, Any]):
+    steps = planner.parse_plan(raw_plan, AVAILABLE_TOOLS)
+    logger.info(f"LLM planned {len(steps)} step(s): {[(s.id, s.tool_name, s.depends_on) for s in steps]}")
+    outcomes = await planner.execute_plan(steps, AVAILABLE_TOOLS, _plan_parameter_resolver(text))
+    last = outcomes[steps[-1].id]
+    return {"tool_name": "plan", "parameters": last["parameters"], "result": outcomes}
+
+async def _select_tool(text: str, conversation: Optional[ConversationState]) -> Dict[str, Any]:
+    """Asks the LLM for a tool call (or plan); falls back to rule-based routing when Groq is unavailable."""
+    if not llm_client:
+        return fallbacks.route_by_rules(text, conversation)
     tools_prompt = json.dumps([{"name": name, "description": data["description"], "parameters": data["parameters"]} for name, data in AVAILABLE_TOOLS.items()], indent=2)
     system_prompt = f"""You are an intelligent e-commerce assistant. Your task is to understand the user's request,
 select the appropriate tool from the provided list, and extract the necessary parameters to call it.
 Available tools: {tools_prompt}
 Respond with ONLY a single, valid JSON object in the format: {{"tool_name": "...", "parameters": {{...}} }}
 If no tool is suitable, respond with: {{"tool_name": "no_tool_found", "parameters": {{}} }}"""
+    if PLANNER_ENABLED:
+        system_prompt += "\n" + planner.PLAN_PROMPT.format(max_steps=planner.PLANNER_MAX_STEPS)
+    history = []
+    if conversation is not None:
+        context_note = conversation.context_note()
+        if context_note:
+            system_prompt += f"\nResolve references like 'those' or 'that order' using this context:\n{context_note}"
+        history = conversation.history_messages()
     try:
-        completion = groq_client.chat.completions.create(
-            messages=[{"role": "system", "content": system_prompt}, {"role": "user", "content": text}],
-            model=MODEL_NAME, temperature=0.0, max_tokens=256, response_format={"type": "json_object"}
+        completion = await llm_client.complete(
+            'tool_selection',
+            messages=[{"role": "system", "content": system_prompt}, *history, {"role": "user", "content": text}],
+            model=MODEL_NAME, temperature=0.0, max_tokens=512 if PLANNER_ENABLED else 256, response_format={"type": "json_object"}
         )
-        choice_json = json.loads(completion.choices[0].message.content)
+        return json.loads(completion.choices[0].message.content)
+    except CircuitOpenError:
+        return fallbacks.route_by_rules(text, conversation)
+    except Exception as e:
+        logger.error(f"LLM tool selection failed, using rule-based routing: {e}")
+        return fallbacks.route_by_rules(text, conversation)
+
+async def choose_and_execute_tool(text: str, conversation: Optional[ConversationState] = None,
+                                  speculative: Optional[speculation.SpeculativeExecutor] = None):
+    with pipeline_stage('tool_selection'):
+        choice_json = await _select_tool(text, conversation)
+    try:
+        if PLANNER_ENABLED and "steps" in choice_json:
+            with pipeline_stage('tool_execution'):
+                return await execute_plan(text, choice_json)
         tool_name = choice_json.get("tool_name")
         parameters = choice_json.get("parameters", {})
-        logger.info(f"LLM decided to use tool '{tool_name}' with parameters: {parameters}")
+        logger.info(f"Decided to use tool '{tool_name}' with parameters: {parameters}")
         if tool_name in AVAILABLE_TOOLS:
-            tool_function = AVAILABLE_TOOLS[tool_name]["function"]
-            result = tool_function(**parameters)
-            return {"tool_name": tool_name, "result": result}
+            claimed, result = await speculative.claim(tool_name, parameters) if speculative else (False, None)
+            if not claimed:
+                tool_function = AVAILABLE_TOOLS[tool_name]["function"]
+                with pipeline_stage('tool_execution'):
+                    result = tool_function(**parameters)
+            return {"tool_name": tool_name, "parameters": parameters, "result": result}
         else:
-            return {"tool_name": "no_tool_found", "result": "I am not sure how to help with that. Could you please rephrase your request?"}
+            return {"tool_name": "no_tool_found", "result": fallbacks.NO_TOOL_FOUND_RESPONSE}
     except Exception as e:
-        logger.error(f"Agentic tool selection failed: {e}")
+        logger.error(f"Agentic tool execution failed: {e}")
         return {"tool_name": "error", "result": f"An error occurred: {e}"}
 
 emotion_detector = AdvancedEmotionDetector()
 voice_synthesizer = VoiceSynthesizer()
-
-def convert_audio_to_wav(input_path: str, output_path: str) -> bool:
-  """Converts an audio file to WAV format using ffmpeg."""
-  try:
-    command = ['ffmpeg', '-i', input_path, '-ar', '16000', '-ac', '1', '-f', 'wav', output_path, '-y']
-    subprocess.run(command, check=True, capture_output=True)
-    logger.info(f"Successfully converted {input_path} to {output_path}")
-    return True
-  except (subprocess.CalledProcessError, FileNotFoundError) as e:
-    logger.error(f"Audio conversion failed: {e}")
-    # If ffmpeg command fails, log its output for debugging
-    if isinstance(e, subprocess.CalledProcessError):
-        logger.error(f"FFmpeg stderr: {e.stderr.decode()}")
-    return False
+conversation_store = ConversationStore()
 
 # API Models
 class TextInput(BaseModel):
   text: str
+  session_id: Optional[str] = None
+  audio_format: Optional[str] = None # Playable formats, most preferred first, e.g. "opus,mp3" or "mp3@24000"
 
 class ChatResponse(BaseModel):
   response_text: str
   emotion_data: Dict[str, Any]
   agent: str # Repurposed to show 'tool_used'
   audio_url: Optional[str] = None
-
-# --- Helper function to process text (used by both endpoints) ---
-async def process_text_request(text: str):
-    logger.info(f"Processing text: {text}")
-    emotion_data = emotion_detector.detect_comprehensive_emotion(text)
-    tool_output = choose_and_execute_tool(text)
-    tool_name = tool_output.get("tool_name", "error")
-    tool_result = tool_output.get("result", {})
-
-    response_text = ""
+  session_id: Optional[str] = None
+
+async def compose_response(text: str, emotion_data: Dict[str, Any], tool_name: str, tool_result: Any,
+                           conversation: ConversationState) -> Tuple[str, bool]:
+    """
+    The spoken reply: LLM-written when Groq is available, otherwise a template
+    over the tool result. The flag is True when Groq is configured but the
+    template had to stand in for it.
+    """
     if groq_client:
         system_prompt = f"""You are Natalie, an empathetic e-commerce assistant.
 User's emotion: {emotion_data['emotion']} (Intensity: {emotion_data['intensity']}).
@@ -312,70 +541,189 @@ Synthesize this information into a single, friendly, natural-sounding response.
 - If an error occurred or no tool was found, apologize and ask for clarification.
 - Do not mention the tool name or raw data explicitly.
 """
+        context_note = conversation.context_note()
+        if context_note:
+            system_prompt += f"Conversation context:\n{context_note}\n"
         try:
-            completion = groq_client.chat.completions.create(
+            completion = await llm_client.complete(
+                'synthesis',
                 messages=[{"role": "system", "content": system_prompt}],
                 model=MODEL_NAME, temperature=0.7, max_tokens=150,
             )
             response_text = completion.choices[0].message.content.strip()
             logger.info(f"LLM generated final response: {response_text}")
+            return response_text, False
+        except CircuitOpenError:
+            pass
         except Exception as e:
-            logger.error(f"LLM response generation failed: {e}")
-            response_text = "I'm having a little trouble right now. Could you say that again?"
-    else:
-        response_text = str(tool_result)
-
-    audio_url = voice_synthesizer.synthesize_speech(response_text, emotion_data)
-    return ChatResponse(
-        response_text=response_text,
-        emotion_data=emotion_data,
-        agent=tool_name,
-        audio_url=audio_url,
-    )
+            logger.error(f"LLM response generation failed, using a templated reply: {e}")
+    return fallbacks.render_template(tool_name, tool_result), bool(groq_client)
+
+def _cached_audio_available(entry) -> bool:
+    """A cached /audio URL is only good while the store still holds the file; LRU eviction may have removed it."""
+    audio_url = entry.response.get("audio_url") or ""
+    if tts_cache is None or not audio_url.startswith(audio_store.local_url("")):
+        return True
+    return tts_cache.path_for(audio_url[len(audio_store.local_url("")):]) is not None
+
+# --- Helper function to process text (used by both endpoints) ---
+async def process_text_request(text: str, session_id: Optional[str] = None, audio_format: Optional[str] = None,
+                               speculative: Optional[speculation.SpeculativeExecutor] = None):
+    logger.info(f"Processing text: {text}")
+    conversation = conversation_store.get(session_id)
+    key = None
+    # Only context-free requests are cached: history and entities reach the LLM prompts and can change the answer.
+    if response_cache is not None and not conversation.has_context() and not fallbacks.refers_to_context(text):
+        # The lexicon bucket is free to compute and picks the voice settings, so it can key the cached audio.
+        emotion = emotion_detector.lexicon_emotion_detection(text)[0]
+        key = cache_key(text, emotion, emotion_detector.detect_emotion_intensity(text), audio_format)
+        cached = response_cache.get(key, valid=_cached_audio_available)
+        if cached is not None:
+            conversation.record_turn(text, cached.response["response_text"], cached.tool_name, cached.parameters, cached.tool_result)
+            return ChatResponse(**cached.response, session_id=conversation.session_id)
+        data_versions = response_cache.versions()
+
+    with pipeline_stage('emotion'):
+        emotion_data = await emotion_detector.detect_comprehensive_emotion(text)
+    tool_output = await choose_and_execute_tool(text, conversation, speculative)
+    tool_name = tool_output.get("tool_name", "error")
+    tool_result = tool_output.get("result", {})
+
+    with pipeline_stage('synthesis'):
+        response_text, templated = await compose_response(text, emotion_data, tool_name, tool_result, conversation)
+
+    conversation.record_turn(text, response_text, tool_name, tool_output.get("parameters"), tool_result)
+    with pipeline_stage('tts'):
+        audio_url = await voice_synthesizer.synthesize_speech(response_text, emotion_data, audio_format)
+    response = {"response_text": response_text, "emotion_data": emotion_data, "agent": tool_name, "audio_url": audio_url}
+
+    tool = AVAILABLE_TOOLS.get(tool_name, {})
+    # Degraded replies (templated text, missing audio) are not cached, so they end with the outage.
+    degraded = templated or bool(MURF_API_KEY and not audio_url)
+    if key is not None and tool.get("read_only") and not degraded:
+        response_cache.put(key, response, tool_name, tool_output.get("parameters"), tool_result, tool.get("reads", ()), data_versions)
+    return ChatResponse(**response, session_id=conversation.session_id)
 
 # --- Endpoints ---
-@app.post("/process_speech", response_model=ChatResponse)
-async def process_speech(audio_file: UploadFile = File(...)):
-  temp_webm = None
+# The multipart body is parsed by upload_stream rather than FastAPI, so describe it for the OpenAPI docs by hand.
+PROCESS_SPEECH_BODY = {"requestBody": {"required": True, "content": {"multipart/form-data": {"schema": {
+  "type": "object", "required": ["audio_file"], "properties": {
+    "audio_file": {"type": "string", "format": "binary"},
+    "session_id": {"type": "string"},
+    "audio_format": {"type": "string"},
+  }}}}}}
+
+@app.post("/process_speech", response_model=ChatResponse, openapi_extra=PROCESS_SPEECH_BODY)
+async def process_speech(request: Request):
+  temp_upload = None
   temp_wav = None
+  utterances = []
   try:
-    # Step 1: Save the incoming WebM file from the browser
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".webm") as tmp_webm:
-        tmp_webm.write(await audio_file.read())
-        temp_webm = tmp_webm.name
+    # Step 1: Stream the uploaded recording (WebM from the browser, or WAV from other clients) to disk
+    try:
+      with pipeline_stage('upload'):
+        temp_upload, form = await upload_stream.receive_upload(request)
+    except upload_stream.UploadTooLargeError as e:
+      raise HTTPException(status_code=413, detail=str(e))
+    except upload_stream.MalformedUploadError as e:
+      raise HTTPException(status_code=400, detail=str(e))
+    session_id, audio_format = form.get("session_id") or None, form.get("audio_format") or None
 
     # Step 2: Prepare a path for the output WAV file
     with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as tmp_wav:
         temp_wav = tmp_wav.name
 
-    # Step 3: Convert the WebM file to WAV using the helper function
-    if not convert_audio_to_wav(temp_webm, temp_wav):
+    # Step 3: Normalize to 16kHz mono WAV; PCM WAV is handled in-process, everything else by the decoder pool
+    with pipeline_stage('decode'):
+        converted = await audio_input.convert_to_wav(temp_upload, temp_wav, decoder_pool)
+    if not converted:
         raise HTTPException(status_code=500, detail="Audio conversion failed.")
 
-    # Step 4: Process the properly converted WAV file
-    with sr.AudioFile(temp_wav) as source:
-      audio = recognizer.record(source)
-      text = recognizer.recognize_google(audio)
-    
-    return await process_text_request(text)
-
-  except sr.UnknownValueError:
+    # Step 4: Trim silence and split on long pauses; reject silent recordings before any STT call
+    with pipeline_stage('vad'):
+        utterances = await asyncio.to_thread(vad.split_utterances, temp_wav)
+    if not utterances:
+        raise HTTPException(status_code=400, detail="No speech detected in the recording")
+
+    # Step 5: Transcribe the utterances with the configured STT backend
+    with pipeline_stage('stt'):
+        results = await asyncio.gather(*(stt_backend.transcribe(path) for path in utterances), return_exceptions=True)
+    if any(isinstance(r, stt_backends.STTUnavailableError) for r in results):
+        metrics.DEPENDENCY_ERRORS.inc(dependency='stt')
+    texts = [r for r in results if isinstance(r, str) and r.strip()]
+    if not texts:
+        # Every utterance failed: surface an outage over "no speech" so the client sees a 503.
+        raise next((r for r in results if isinstance(r, stt_backends.STTUnavailableError)),
+                   next((r for r in results if isinstance(r, Exception)), stt_backends.NoSpeechError("Could not understand the audio")))
+    text = " ".join(texts)
+
+    return await process_text_request(text, session_id, audio_format)
+
+  except HTTPException:
+    raise
+  except DecoderBusyError:
+    raise HTTPException(status_code=503, detail="Server is busy decoding audio, please retry", headers={"Retry-After": "1"})
+  except stt_backends.NoSpeechError:
     raise HTTPException(status_code=400, detail="Could not understand the audio")
-  except sr.RequestError as e:
+  except stt_backends.STTUnavailableError as e:
     raise HTTPException(status_code=503, detail=f"Speech recognition service unavailable: {e}")
   except Exception as e:
     logger.error(f"Speech processing error: {e}")
     raise HTTPException(status_code=500, detail="Speech processing failed")
   finally:
-    # Clean up both temporary files
-    if temp_webm and os.path.exists(temp_webm):
-      os.unlink(temp_webm)
-    if temp_wav and os.path.exists(temp_wav):
-      os.unlink(temp_wav)
+    # Clean up all temporary files
+    for path in {temp_upload, temp_wav, *utterances}:
+      if path and os.path.exists(path):
+        os.unlink(path)
 
 @app.post("/chat", response_model=ChatResponse)
 async def chat(input_data: TextInput):
-  return await process_text_request(input_data.text)
+  return await process_text_request(input_data.text, input_data.session_id, input_data.audio_format)
+
+@app.websocket("/ws/speech")
+async def stream_speech(websocket: WebSocket, session_id: Optional[str] = None):
+  """
+  Streaming transcripts from a client-side recognizer. The client sends
+  {"type": "partial", "text": ...} while the user speaks and
+  {"type": "final", "text": ..., "audio_format": ...} when they stop; each final
+  is answered with {"type": "response", ...ChatResponse fields}. Partials may
+  start read-only tool calls early (see speculation).
+  """
+  await websocket.accept()
+  conversation = conversation_store.get(session_id)
+  speculative = speculation.SpeculativeExecutor(AVAILABLE_TOOLS, SPECULATIVE_TOOLS, conversation)
+  try:
+    while True:
+      message = await websocket.receive_json()
+      text = (message.get("text") or "").strip()
+      if message.get("type") == "partial":
+        if text:
+          speculative.observe_partial(text)
+      elif message.get("type") == "final":
+        try:
+          if not text:
+            await websocket.send_json({"type": "error", "detail": "Empty transcript"})
+            continue
+          with tracing.span("WS /ws/speech final", kind=tracing.KIND_SERVER):
+            response = await process_text_request(text, conversation.session_id, message.get("audio_format"), speculative)
+          await websocket.send_json({"type": "response", **jsonable_encoder(response)})
+        finally:
+          speculative.discard()
+      else:
+        await websocket.send_json({"type": "error", "detail": "Expected a 'partial' or 'final' message"})
+  except WebSocketDisconnect:
+    pass
+  finally:
+    speculative.discard()
+
+@app.get("/audio/{name}")
+async def get_audio(name: str):
+  """Serves cached TTS audio. Names are content hashes, so responses never change and can be cached forever."""
+  path = tts_cache.path_for(name) if tts_cache is not None else None
+  if not path:
+    raise HTTPException(status_code=404, detail="Audio not found")
+  media_type = audio_store.MEDIA_TYPES[name.rsplit('.', 1)[1]]
+  return FileResponse(path, media_type=media_type, headers={"Cache-Control": "public, max-age=31536000, immutable"})
 
 @app.get("/")
 async def root():
@@ -383,7 +731,44 @@ async def root():
 
 @app.get("/health")
 async def health():
-  return {"status": "healthy"}
+  breakers = {"groq": groq_breaker.snapshot(), "murf": murf_breaker.snapshot()}
+  degraded = any(b["state"] != "closed" for b in breakers.values())
+  health_report = {"dependencies": breakers}
+  if decoder_pool is not None:
+    health_report["decoder_pool"] = decoder_pool.snapshot()
+    degraded = degraded or not health_report["decoder_pool"]["healthy"]
+  if admission_controller is not None:
+    health_report["admission"] = admission_controller.snapshot()
+  return {"status": "degraded" if degraded else "healthy", **health_report}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+  return PlainTextResponse(metrics.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+# --- Admin ---
+def require_admin(authorization: Optional[str] = Header(None)):
+  if not ADMIN_TOKEN:
+    raise HTTPException(status_code=404, detail="Not Found")
+  scheme, _, token = (authorization or "").partition(" ")
+  if scheme.lower() != "bearer" or not secrets.compare_digest(token.encode(), ADMIN_TOKEN.encode()):
+    raise HTTPException(status_code=401, detail="Invalid admin token", headers={"WWW-Authenticate": "Bearer"})
+
+@app.get("/admin/profile/cpu", response_class=PlainTextResponse, dependencies=[Depends(require_admin)])
+async def profile_cpu(seconds: float = Query(10.0, gt=0, le=profiler.PROFILE_MAX_SECONDS),
+                      hz: int = Query(profiler.PROFILE_DEFAULT_HZ, gt=0, le=profiler.PROFILE_MAX_HZ)):
+  """Samples all thread stacks of the live process; returns collapsed stacks for flamegraph.pl or speedscope."""
+  try:
+    return PlainTextResponse(await asyncio.to_thread(profiler.sample_cpu, seconds, hz))
+  except profiler.ProfilerBusyError as e:
+    raise HTTPException(status_code=409, detail=str(e))
+
+@app.get("/admin/profile/heap", response_class=PlainTextResponse, dependencies=[Depends(require_admin)])
+async def profile_heap(seconds: float = Query(10.0, gt=0, le=profiler.PROFILE_MAX_SECONDS)):
+  """Traces allocations with tracemalloc; returns collapsed stacks of live allocations weighted by bytes."""
+  try:
+    return PlainTextResponse(await asyncio.to_thread(profiler.sample_heap, seconds))
+  except profiler.ProfilerBusyError as e:
+    raise HTTPException(status_code=409, detail=str(e))
 
 if __name__ == "__main__":
   import uvicorn
@@ -0,0 +1,81 @@
+"""
+Pre-synthesized audio for near-fixed replies.
+
+Error fallbacks, help answers and other templated strings are synthesized for
+every emotion voice setting when the server starts. Replies that match one of
+them (ignoring case and whitespace) are answered from memory without a TTS call.
+"""
+import asyncio
+import logging
+import os
+import re
+from typing import Any, Callable, Optional, Dict, List, Iterable
+
+import ecommerce_tools
+import fallbacks
+import metrics
+
+logger = logging.getLogger('MultiAgentOrchestrator')
+
+TTS_PHRASE_BANK_ENABLED = os.getenv('TTS_PHRASE_BANK_ENABLED', 'true').lower() == 'true'
+# Output formats to pre-warm, one format spec each (see audio_formats), comma-separated.
+TTS_PHRASE_BANK_FORMATS = [f for f in os.getenv('TTS_PHRASE_BANK_FORMATS', '').split(',') if f.strip()]
+TTS_PHRASE_BANK_CONCURRENCY = int(os.getenv('TTS_PHRASE_BANK_CONCURRENCY', '4'))
+
+INTENSITIES = ('low', 'medium', 'high')
+
+PHRASE_BANK_HITS = metrics.counter('tts_phrase_bank_hits_total', 'Replies served from pre-synthesized phrase audio.')
+
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def normalize(text: str) -> str:
+    return _WHITESPACE_RE.sub(' ', text).strip().lower()
+
+
+def default_phrases() -> List[str]:
+    help_topics = ('hours', 'return', 'contact', '')
+    return [
+        fallbacks.FALLBACK_ERROR_RESPONSE,
+        fallbacks.NO_TOOL_FOUND_RESPONSE,
+        ecommerce_tools.EMPTY_CART_MESSAGE,
+        *dict.fromkeys(ecommerce_tools.get_general_help(topic) for topic in help_topics),
+    ]
+
+
+class PhraseBank:
+    def __init__(self, phrases: Iterable[str]):
+        self._canonical = {normalize(p): p for p in phrases}
+        self._audio: Dict[str, str] = {}  # cache name -> delivered audio URL
+
+    def canonical(self, text: str) -> Optional[str]:
+        """The bank's spelling of `text` if it is a bank phrase, so it maps to the pre-synthesized audio."""
+        return self._canonical.get(normalize(text))
+
+    def get(self, name: str, exists: Optional[Callable[[str], Any]] = None) -> Optional[str]:
+        """The banked audio for `name`; with `exists`, an entry whose file has since been evicted is dropped instead."""
+        audio = self._audio.get(name)
+        if audio and exists is not None and not exists(name):
+            del self._audio[name]
+            return None
+        if audio:
+            PHRASE_BANK_HITS.inc()
+        return audio
+
+    def put(self, name: str, audio: str):
+        self._audio[name] = audio
+
+    def __len__(self) -> int:
+        return len(self._audio)
+
+    async def warm(self, synthesize, emotions: Iterable[str], formats: List[Optional[str]]):
+        """Synthesizes every phrase for every emotion, intensity and format via `synthesize(text, emotion_data, format)`."""
+        slots = asyncio.Semaphore(TTS_PHRASE_BANK_CONCURRENCY)
+
+        async def one(phrase, emotion, intensity, audio_format):
+            async with slots:
+                await synthesize(phrase, {'emotion': emotion, 'intensity': intensity}, audio_format)
+
+        jobs = [one(p, e, i, f) for p in self._canonical.values() for e in emotions for i in INTENSITIES for f in formats]
+        await asyncio.gather(*jobs, return_exceptions=True)
+        logger.info(f"Phrase bank warmed: {len(self)} clips for {len(self._canonical)} phrases")
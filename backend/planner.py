@@ -0,0 +1,211 @@
+"""
+Multi-step tool plans.
+
+The LLM may answer a request with a small DAG of tool calls instead of a single
+call. Each step names a tool, its parameters and the steps it depends on.
+Steps start as soon as their dependencies finish, so independent calls run
+concurrently on the default thread pool. Parameters can reference earlier
+results with "$<step_id>.<path>" (e.g. "$s1.0.id"); a dependent step whose
+parameters still need a decision (the "?" placeholder) is completed by a
+caller-supplied resolver that sees the dependency results. Steps whose tool is
+not `read_only` run in plan order, one at a time, with no other step beside
+them, since they share mutable state such as the cart.
+"""
+import asyncio
+import logging
+import os
+import re
+from typing import Optional, Dict, Any, List, Callable, Awaitable
+
+logger = logging.getLogger('MultiAgentOrchestrator')
+
+PLANNER_MAX_STEPS = int(os.getenv('PLANNER_MAX_STEPS', '6'))
+PLANNER_LATENCY_BUDGET_SECONDS = float(os.getenv('PLANNER_LATENCY_BUDGET_SECONDS', '8'))
+
+PLACEHOLDER = "?"
+_REF_RE = re.compile(r'^\$(\w+)((?:\.[\w-]+)*)$')
+
+PLAN_PROMPT = """If the request needs several tools (for example, comparing two products and then acting on the result),
+respond instead with a plan: {{"steps": [{{"id": "s1", "tool_name": "...", "parameters": {{...}}, "depends_on": []}}, ...]}}
+- Use at most {max_steps} steps. Steps without dependencies run in parallel.
+- A parameter may reference an earlier result as "$<step id>.<path>", e.g. "$s1.0.id"; list that step in depends_on.
+- If a parameter can only be decided after seeing earlier results, set it to "?" and list those steps in depends_on."""
+
+
+class PlanError(ValueError):
+    pass
+
+
+class PlanStep:
+    __slots__ = ('id', 'tool_name', 'parameters', 'depends_on', 'after')
+
+    def __init__(self, id: str, tool_name: str, parameters: Dict[str, Any], depends_on: List[str],
+                 after: Optional[List[str]] = None):
+        self.id = id
+        self.tool_name = tool_name
+        self.parameters = parameters
+        self.depends_on = depends_on
+        # Ordering-only predecessors: waited for, but their failure does not skip this step.
+        self.after = after or []
+
+
+def _references(value: Any) -> List[str]:
+    """Step ids named by "$step.path" strings anywhere in `value`."""
+    if isinstance(value, dict):
+        return [ref for v in value.values() for ref in _references(v)]
+    if isinstance(value, list):
+        return [ref for v in value for ref in _references(v)]
+    if isinstance(value, str):
+        match = _REF_RE.match(value)
+        if match:
+            return [match.group(1)]
+    return []
+
+
+def parse_plan(raw: Dict[str, Any], available_tools: Dict[str, Any], max_steps: int = PLANNER_MAX_STEPS) -> List[PlanStep]:
+    """
+    Validates an LLM plan: known tools, unique ids, dependencies on earlier
+    steps only (so it is acyclic), and every step referenced in parameters
+    listed in depends_on. Orders write steps after everything before them and
+    everything after them behind the write.
+    """
+    raw_steps = raw.get("steps")
+    if not isinstance(raw_steps, list) or not raw_steps:
+        raise PlanError("Plan has no steps.")
+    if len(raw_steps) > max_steps:
+        raise PlanError(f"Plan has {len(raw_steps)} steps; the limit is {max_steps}.")
+
+    step_ids = {str(item.get("id") or f"s{i + 1}") for i, item in enumerate(raw_steps)}
+    steps, seen, last_write = [], set(), None
+    for i, item in enumerate(raw_steps):
+        step_id = str(item.get("id") or f"s{i + 1}")
+        tool_name = item.get("tool_name")
+        depends_on = [str(d) for d in item.get("depends_on") or []]
+        if step_id in seen:
+            raise PlanError(f"Duplicate step id '{step_id}'.")
+        if tool_name not in available_tools:
+            raise PlanError(f"Unknown tool '{tool_name}' in step '{step_id}'.")
+        unknown = [d for d in depends_on if d not in seen]
+        if unknown:
+            raise PlanError(f"Step '{step_id}' depends on unknown or later steps: {unknown}.")
+        parameters = dict(item.get("parameters") or {})
+        # Only strings naming a plan step are references; anything else ("$50") is a literal.
+        undeclared = sorted({ref for ref in _references(parameters) if ref in step_ids and ref not in depends_on})
+        if undeclared:
+            raise PlanError(f"Step '{step_id}' references steps it does not depend on: {undeclared}.")
+        if not available_tools[tool_name].get("read_only"):
+            after = [s.id for s in steps if s.id not in depends_on]
+            last_write = step_id
+        else:
+            after = [last_write] if last_write is not None and last_write not in depends_on else []
+        seen.add(step_id)
+        steps.append(PlanStep(step_id, tool_name, parameters, depends_on, after))
+    return steps
+
+
+def _lookup(value: Any, path: List[str]) -> Any:
+    for key in path:
+        if isinstance(value, list):
+            value = value[int(key)]
+        elif isinstance(value, dict):
+            value = value[key]
+        else:
+            raise KeyError(key)
+    return value
+
+
+def resolve_references(value: Any, results: Dict[str, Any]) -> Any:
+    """Substitutes "$step.path" strings with values from finished steps."""
+    if isinstance(value, dict):
+        return {k: resolve_references(v, results) for k, v in value.items()}
+    if isinstance(value, list):
+        return [resolve_references(v, results) for v in value]
+    if isinstance(value, str):
+        match = _REF_RE.match(value)
+        if match and match.group(1) in results:
+            path = [p for p in match.group(2).split('.') if p]
+            try:
+                return _lookup(results[match.group(1)], path)
+            except (KeyError, IndexError, ValueError):
+                raise PlanError(f"Reference '{value}' does not match the result of step '{match.group(1)}'.")
+    return value
+
+
+def is_error(result: Any) -> bool:
+    """Tools report failure as {"error": ...} or, for list results, [{"error": ...}]."""
+    if isinstance(result, list) and result:
+        result = result[0]
+    return isinstance(result, dict) and "error" in result
+
+
+def _needs_resolution(parameters: Dict[str, Any]) -> bool:
+    return any(v == PLACEHOLDER for v in parameters.values())
+
+
+ParameterResolver = Callable[[PlanStep, Dict[str, Any]], Awaitable[Dict[str, Any]]]
+
+
+async def execute_plan(steps: List[PlanStep], available_tools: Dict[str, Any],
+                       resolve_parameters: Optional[ParameterResolver] = None,
+                       latency_budget: float = PLANNER_LATENCY_BUDGET_SECONDS) -> Dict[str, Dict[str, Any]]:
+    """
+    Runs every step once its dependencies are done. Returns, per step id, the
+    tool name, final parameters and result. Steps still running when the
+    latency budget is spent are cancelled and reported as errors, except write
+    steps whose tool call has started: a thread cannot be stopped, so those are
+    waited for and report what they actually did.
+    """
+    results: Dict[str, Any] = {}
+    outcomes: Dict[str, Dict[str, Any]] = {
+        s.id: {"tool_name": s.tool_name, "parameters": s.parameters, "result": {"error": "Not run."}} for s in steps
+    }
+    tasks: Dict[str, asyncio.Task] = {}
+    writes: Dict[str, asyncio.Future] = {}  # started tool calls of write steps
+
+    async def run_step(step: PlanStep):
+        if step.after:
+            await asyncio.gather(*(tasks[s] for s in step.after))
+        if step.depends_on:
+            await asyncio.gather(*(tasks[d] for d in step.depends_on))
+            failed = [d for d in step.depends_on if is_error(results[d])]
+            if failed:
+                results[step.id] = {"error": f"Skipped because step(s) {failed} failed."}
+                outcomes[step.id]["result"] = results[step.id]
+                return
+        try:
+            parameters = resolve_references(step.parameters, results)
+            if _needs_resolution(parameters):
+                if resolve_parameters is None:
+                    raise PlanError(f"Step '{step.id}' has undecided parameters.")
+                dependency_results = {d: results[d] for d in step.depends_on}
+                parameters = await resolve_parameters(step, dependency_results)
+            outcomes[step.id]["parameters"] = parameters
+            tool = available_tools[step.tool_name]
+            call = asyncio.ensure_future(asyncio.to_thread(tool["function"], **parameters))
+            if not tool.get("read_only"):
+                writes[step.id] = call
+            result = await asyncio.shield(call)
+        except Exception as e:
+            logger.error(f"Plan step '{step.id}' ({step.tool_name}) failed: {e}")
+            result = {"error": str(e)}
+        results[step.id] = result
+        outcomes[step.id]["result"] = result
+
+    for step in steps:
+        tasks[step.id] = asyncio.create_task(run_step(step))
+    done, pending = await asyncio.wait(tasks.values(), timeout=latency_budget)
+    if pending:
+        logger.warning(f"Plan exceeded its {latency_budget}s latency budget; cancelling {len(pending)} step(s).")
+        for task in pending:
+            task.cancel()
+        for step_id, task in tasks.items():
+            if task not in pending:
+                continue
+            if step_id in writes:
+                try:
+                    outcomes[step_id]["result"] = await writes[step_id]
+                except Exception as e:
+                    outcomes[step_id]["result"] = {"error": str(e)}
+            else:
+                outcomes[step_id]["result"] = {"error": "Latency budget exceeded."}
+    return outcomes
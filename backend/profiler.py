@@ -0,0 +1,95 @@
+"""
+On-demand profiling of the live process.
+
+`sample_cpu` is a wall-clock sampling profiler: a background thread reads every
+other thread's Python stack through `sys._current_frames()` at a fixed rate for
+the requested window. The event loop thread's stack includes the coroutine
+currently running on it. `sample_heap` traces allocations with tracemalloc for
+the window and reports the ones still alive at the end.
+
+Both return collapsed stacks: one `frame;frame;...;frame weight` line per
+distinct stack, root first. flamegraph.pl, speedscope and inferno read this
+format directly. CPU weights are sample counts; heap weights are bytes.
+"""
+import collections
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from typing import Dict
+
+PROFILE_MAX_SECONDS = float(os.getenv('PROFILE_MAX_SECONDS', '60'))
+PROFILE_DEFAULT_HZ = int(os.getenv('PROFILE_DEFAULT_HZ', '100'))
+PROFILE_MAX_HZ = int(os.getenv('PROFILE_MAX_HZ', '1000'))
+PROFILE_HEAP_FRAMES = int(os.getenv('PROFILE_HEAP_FRAMES', '25'))
+
+_active = threading.Lock()
+
+
+class ProfilerBusyError(Exception):
+    pass
+
+
+def _sanitize(label: str) -> str:
+    # ';' separates frames and ' ' separates the weight in the collapsed format.
+    return label.replace(';', ':').replace(' ', '_')
+
+
+def _collapse(stacks: Dict[str, int]) -> str:
+    return "".join(f"{stack} {weight}\n" for stack, weight in sorted(stacks.items(), key=lambda item: -item[1]))
+
+
+def sample_cpu(seconds: float, hz: int = PROFILE_DEFAULT_HZ) -> str:
+    """Samples every thread's stack `hz` times a second for `seconds`; returns collapsed stacks prefixed by thread name."""
+    if not _active.acquire(blocking=False):
+        raise ProfilerBusyError("A profile is already being captured")
+    try:
+        interval = 1.0 / max(1, hz)
+        me = threading.get_ident()
+        counts = collections.Counter()
+        deadline = time.monotonic() + min(seconds, PROFILE_MAX_SECONDS)
+        while time.monotonic() < deadline:
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(_sanitize(f"{code.co_name}({os.path.basename(code.co_filename)}:{frame.f_lineno})"))
+                    frame = frame.f_back
+                stack.append(_sanitize(names.get(ident, str(ident))))
+                counts[";".join(reversed(stack))] += 1
+            time.sleep(interval)
+        return _collapse(counts)
+    finally:
+        _active.release()
+
+
+def sample_heap(seconds: float) -> str:
+    """Traces allocations for `seconds`; returns collapsed stacks of those still alive, weighted by bytes."""
+    if not _active.acquire(blocking=False):
+        raise ProfilerBusyError("A profile is already being captured")
+    started_here = not tracemalloc.is_tracing()
+    try:
+        if started_here:
+            tracemalloc.start(PROFILE_HEAP_FRAMES)
+        baseline = tracemalloc.take_snapshot() if not started_here else None
+        time.sleep(min(seconds, PROFILE_MAX_SECONDS))
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+        ))
+        stats = snapshot.compare_to(baseline, 'traceback') if baseline else snapshot.statistics('traceback')
+        sizes = collections.Counter()
+        for stat in stats:
+            size = getattr(stat, 'size_diff', stat.size)
+            if size > 0:
+                # Frames run oldest to most recent, i.e. root first.
+                sizes[";".join(_sanitize(f"{os.path.basename(f.filename)}:{f.lineno}") for f in stat.traceback)] += size
+        return _collapse(sizes)
+    finally:
+        if started_here:
+            tracemalloc.stop()
+        _active.release()
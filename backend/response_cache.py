@@ -0,0 +1,111 @@
+"""
+Whole-response cache for repeated read-only questions.
+
+"What are your store hours?" gets the same answer every time, yet each ask
+pays for emotion detection, tool selection, reply synthesis and TTS. This
+cache stores the finished reply, including its audio URL. It is keyed on the
+normalized text, the lexicon emotion bucket (which sets the voice) and the
+requested audio format.
+
+Only replies produced by a tool registered as `read_only` are stored. Each
+entry records the version of every data table its tool reads
+(ecommerce_tools.DATA_VERSIONS). A lookup that finds any of those tables
+changed treats the entry as stale, so catalog, order, review and cart updates
+invalidate exactly the answers built on them. Entries also expire after
+RESPONSE_CACHE_TTL_SECONDS, which bounds how long a remote audio URL is
+reused. Callers look up and store replies only for sessions with no history
+yet, and never for requests that refer back to a conversation ("add those",
+"where is that order"). History and tracked entities reach the LLM prompts, so
+any reply produced with them may depend on that session.
+"""
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+import metrics
+
+RESPONSE_CACHE_ENABLED = os.getenv('RESPONSE_CACHE_ENABLED', 'true').lower() == 'true'
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv('RESPONSE_CACHE_MAX_ENTRIES', '2048'))
+RESPONSE_CACHE_TTL_SECONDS = float(os.getenv('RESPONSE_CACHE_TTL_SECONDS', '300'))
+
+RESPONSE_CACHE_LOOKUPS = metrics.counter('response_cache_lookups_total', 'Response cache lookups by outcome.', ('outcome',))
+
+_PUNCTUATION_RE = re.compile(r"[^\w\s']+")
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def normalize(text: str) -> str:
+    """Lowercase with punctuation dropped and whitespace collapsed, so "Return policy?" matches "return policy"."""
+    return _WHITESPACE_RE.sub(' ', _PUNCTUATION_RE.sub(' ', text)).strip().lower()
+
+
+def cache_key(text: str, emotion: Optional[str], intensity: str, audio_format: Optional[str]) -> Tuple[str, str, str, str]:
+    return normalize(text), emotion or 'neutral', intensity, (audio_format or '').replace(' ', '').lower()
+
+
+class CachedResponse:
+    __slots__ = ('response', 'tool_name', 'parameters', 'tool_result', 'versions', 'expires_at')
+
+    def __init__(self, response: Dict[str, Any], tool_name: str, parameters: Optional[Dict[str, Any]], tool_result: Any,
+                 versions: Dict[str, int], expires_at: float):
+        self.response = response
+        self.tool_name = tool_name
+        self.parameters = parameters
+        self.tool_result = tool_result
+        self.versions = versions
+        self.expires_at = expires_at
+
+
+class ResponseCache:
+    """LRU of finished replies, validated against data versions on every lookup."""
+
+    def __init__(self, data_versions: Dict[str, int], max_entries: int = RESPONSE_CACHE_MAX_ENTRIES,
+                 ttl_seconds: float = RESPONSE_CACHE_TTL_SECONDS):
+        self._data_versions = data_versions
+        self._entries: "OrderedDict[tuple, CachedResponse]" = OrderedDict()
+        self._max_entries = max_entries
+        self._ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple, valid: Optional[Callable[[CachedResponse], bool]] = None) -> Optional[CachedResponse]:
+        """The entry for `key` if fresh; `valid` can reject it for outside reasons, e.g. its audio file was evicted."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                RESPONSE_CACHE_LOOKUPS.inc(outcome='miss')
+                return None
+            if now >= entry.expires_at or any(self._data_versions[t] != v for t, v in entry.versions.items()):
+                del self._entries[key]
+                RESPONSE_CACHE_LOOKUPS.inc(outcome='stale')
+                return None
+            self._entries.move_to_end(key)
+        if valid is not None and not valid(entry):
+            with self._lock:
+                if self._entries.get(key) is entry:
+                    del self._entries[key]
+            RESPONSE_CACHE_LOOKUPS.inc(outcome='stale')
+            return None
+        RESPONSE_CACHE_LOOKUPS.inc(outcome='hit')
+        return entry
+
+    def versions(self) -> Dict[str, int]:
+        """Current data versions; take them before running the tool so a change made meanwhile marks the entry stale."""
+        return dict(self._data_versions)
+
+    def put(self, key: tuple, response: Dict[str, Any], tool_name: str, parameters: Optional[Dict[str, Any]],
+            tool_result: Any, reads: Iterable[str], versions: Dict[str, int]):
+        """Stores a reply built from the `reads` tables as they were at `versions`."""
+        entry = CachedResponse(response, tool_name, parameters, tool_result,
+                               {table: versions[table] for table in reads}, time.monotonic() + self._ttl_seconds)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
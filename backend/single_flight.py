@@ -0,0 +1,57 @@
+"""
+Single-flight deduplication of identical concurrent upstream calls.
+
+Under load many requests ask Groq the same prompt, or ask Murf for the same
+sentence in the same voice, at the same moment. A SingleFlight group runs one
+call per key. Callers that arrive while it is in flight wait for that call and
+receive its result or exception. Nothing is cached: once the call finishes,
+the next caller with the same key starts a fresh one.
+
+The shared call runs as its own task. A caller that is cancelled, for example
+because its client disconnected, stops waiting without cancelling the call for
+everyone else.
+"""
+import asyncio
+import os
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+import metrics
+
+SINGLE_FLIGHT_ENABLED = os.getenv('SINGLE_FLIGHT_ENABLED', 'true').lower() == 'true'
+
+SINGLE_FLIGHT_CALLS = metrics.counter(
+    'single_flight_calls_total',
+    'Calls through a single-flight group: "leader" started the upstream call, "shared" joined one already in flight.',
+    ('group', 'outcome'))
+
+
+def _retrieve(task: asyncio.Task):
+    # Mark a failure as retrieved even when every waiter was cancelled, so asyncio does not log it as unhandled.
+    if not task.cancelled():
+        task.exception()
+
+
+class SingleFlight:
+    def __init__(self, name: str):
+        self.name = name
+        self._in_flight: Dict[Hashable, asyncio.Task] = {}
+
+    async def do(self, key: Hashable, call: Callable[[], Awaitable[Any]]) -> Any:
+        """Returns the result of `call()`, sharing one in-flight call among concurrent callers with the same key."""
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(call())
+            self._in_flight[key] = task
+            task.add_done_callback(_retrieve)
+            task.add_done_callback(lambda done: self._forget(key, done))
+            SINGLE_FLIGHT_CALLS.inc(group=self.name, outcome='leader')
+        else:
+            SINGLE_FLIGHT_CALLS.inc(group=self.name, outcome='shared')
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, task: asyncio.Task):
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+
+    def __len__(self) -> int:
+        return len(self._in_flight)
@@ -0,0 +1,103 @@
+"""
+Speculative tool execution on partial transcripts.
+
+While a user is still speaking, every partial transcript goes through the
+rule-based router. Once the routed call has stayed the same for
+SPECULATION_STABLE_PARTIALS partials in a row, it starts in the background.
+When the final transcript is processed, a speculative result is used only if
+the final tool selection makes exactly the same call. Anything else is
+discarded.
+
+Only tools flagged `read_only` in the tool registry and listed in
+SPECULATIVE_TOOLS can run this way. Discarding a result must never leave a
+trace in the cart or anywhere else.
+"""
+import asyncio
+import json
+import logging
+import os
+from typing import Any, Dict, Optional, Tuple
+
+import fallbacks
+import metrics
+
+logger = logging.getLogger('MultiAgentOrchestrator')
+
+SPECULATION_ENABLED = os.getenv('SPECULATION_ENABLED', 'true').lower() == 'true'
+SPECULATIVE_TOOLS = [t.strip() for t in os.getenv(
+    'SPECULATIVE_TOOLS', 'get_order_status,search_products,get_product_reviews').split(',') if t.strip()]
+SPECULATION_STABLE_PARTIALS = int(os.getenv('SPECULATION_STABLE_PARTIALS', '2'))
+SPECULATION_MIN_WORDS = int(os.getenv('SPECULATION_MIN_WORDS', '3'))
+SPECULATION_MAX_PER_UTTERANCE = int(os.getenv('SPECULATION_MAX_PER_UTTERANCE', '3'))
+
+SPECULATIVE_STARTED = metrics.counter('speculative_executions_total', 'Tool calls started from partial transcripts.', ('tool',))
+SPECULATIVE_HITS = metrics.counter('speculative_hits_total', 'Speculative tool results used for the final request.', ('tool',))
+SPECULATIVE_DISCARDED = metrics.counter('speculative_discards_total', 'Speculative tool results thrown away.', ('tool',))
+
+
+def call_key(tool_name: str, parameters: Optional[Dict[str, Any]]) -> Tuple[str, str]:
+    """Identity of a tool call, ignoring case, surrounding whitespace and unset parameters."""
+    normalized = {
+        k: v.strip().lower() if isinstance(v, str) else v
+        for k, v in (parameters or {}).items() if v is not None
+    }
+    return tool_name, json.dumps(normalized, sort_keys=True)
+
+
+def speculative_tools(available_tools: Dict[str, Dict[str, Any]]) -> frozenset:
+    """The configured speculative tools, refusing any that are not flagged read-only."""
+    unsafe = [t for t in SPECULATIVE_TOOLS if not available_tools.get(t, {}).get('read_only')]
+    if unsafe:
+        raise ValueError(f"Tools without side-effect-free ('read_only') registration cannot run speculatively: {unsafe}")
+    return frozenset(SPECULATIVE_TOOLS)
+
+
+class SpeculativeExecutor:
+    """Speculation state for one utterance of one streaming session."""
+
+    def __init__(self, available_tools: Dict[str, Dict[str, Any]], allowed: frozenset, conversation=None):
+        self._tools = available_tools
+        self._allowed = allowed
+        self._conversation = conversation
+        self._tasks: Dict[Tuple[str, str], asyncio.Task] = {}
+        self._last_key: Optional[Tuple[str, str]] = None
+        self._stable = 0
+
+    def observe_partial(self, text: str):
+        """Routes a partial transcript and starts the call once the route has been stable long enough."""
+        if len(text.split()) < SPECULATION_MIN_WORDS:
+            return
+        choice = fallbacks.route_by_rules(text, self._conversation)
+        tool_name, parameters = choice.get("tool_name"), choice.get("parameters", {})
+        key = call_key(tool_name, parameters)
+        self._stable = self._stable + 1 if key == self._last_key else 1
+        self._last_key = key
+        if (tool_name not in self._allowed or key in self._tasks or self._stable < SPECULATION_STABLE_PARTIALS
+                or len(self._tasks) >= SPECULATION_MAX_PER_UTTERANCE):
+            return
+        tool_function = self._tools[tool_name]["function"]
+        logger.info(f"Speculatively running '{tool_name}' with parameters: {parameters}")
+        SPECULATIVE_STARTED.inc(tool=tool_name)
+        self._tasks[key] = asyncio.create_task(asyncio.to_thread(tool_function, **parameters))
+
+    async def claim(self, tool_name: str, parameters: Optional[Dict[str, Any]]) -> Tuple[bool, Any]:
+        """(True, result) when a speculative run of exactly this call finished successfully, else (False, None)."""
+        task = self._tasks.pop(call_key(tool_name, parameters), None)
+        if task is None:
+            return False, None
+        try:
+            result = await task
+        except Exception as e:
+            logger.warning(f"Speculative '{tool_name}' failed, running it again: {e}")
+            return False, None
+        SPECULATIVE_HITS.inc(tool=tool_name)
+        return True, result
+
+    def discard(self):
+        """Drops every unclaimed speculative call; the executor is then ready for the next utterance."""
+        for (tool_name, _), task in self._tasks.items():
+            task.cancel()
+            SPECULATIVE_DISCARDED.inc(tool=tool_name)
+        self._tasks.clear()
+        self._last_key = None
+        self._stable = 0
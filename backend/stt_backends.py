@@ -0,0 +1,154 @@
+"""
+Speech-to-text backends.
+
+Every backend exposes `async transcribe(wav_path) -> str` for a 16kHz mono WAV
+file, raising NoSpeechError when nothing intelligible was said and
+STTUnavailableError when the engine cannot be reached. Select one with
+STT_BACKEND:
+
+    google  Google Web Speech API via SpeechRecognition (remote, run in a thread)
+    vosk    Local offline Vosk model in a process pool, so throughput scales with cores
+    stub    Fixed transcripts for tests and load benchmarks; no model or network
+"""
+import asyncio
+import importlib.util
+import json
+import logging
+import os
+import time
+import wave
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+logger = logging.getLogger('MultiAgentOrchestrator')
+
+STT_BACKEND = os.getenv('STT_BACKEND', 'google').lower()
+STT_PROCESS_POOL_SIZE = int(os.getenv('STT_PROCESS_POOL_SIZE', str(os.cpu_count() or 2)))
+VOSK_MODEL_PATH = os.getenv('VOSK_MODEL_PATH', '')
+# Overrides the Google Web Speech URL, e.g. to point load tests at a local stand-in.
+GOOGLE_STT_ENDPOINT = os.getenv('GOOGLE_STT_ENDPOINT', '')
+STT_STUB_TEXT = os.getenv('STT_STUB_TEXT', 'What are your store hours?')
+STT_STUB_LATENCY_SECONDS = float(os.getenv('STT_STUB_LATENCY_SECONDS', '0'))
+
+
+class NoSpeechError(Exception):
+    pass
+
+
+class STTUnavailableError(Exception):
+    pass
+
+
+class STTBackend:
+    name = 'base'
+
+    async def transcribe(self, wav_path: str) -> str:
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class GoogleSTTBackend(STTBackend):
+    name = 'google'
+
+    def __init__(self):
+        import speech_recognition as sr
+        self._sr = sr
+        self._recognizer = sr.Recognizer()
+
+    def _recognize(self, wav_path: str) -> str:
+        sr = self._sr
+        try:
+            with sr.AudioFile(wav_path) as source:
+                audio = self._recognizer.record(source)
+            options = {'endpoint': GOOGLE_STT_ENDPOINT} if GOOGLE_STT_ENDPOINT else {}
+            return self._recognizer.recognize_google(audio, **options)
+        except sr.UnknownValueError:
+            raise NoSpeechError("Could not understand the audio")
+        except sr.RequestError as e:
+            raise STTUnavailableError(str(e))
+
+    async def transcribe(self, wav_path: str) -> str:
+        return await asyncio.to_thread(self._recognize, wav_path)
+
+
+# --- Vosk (runs inside pool worker processes) ---
+
+_vosk_model = None
+
+
+def _init_vosk_worker(model_path: str):
+    global _vosk_model
+    import vosk
+    vosk.SetLogLevel(-1)
+    _vosk_model = vosk.Model(model_path)
+
+
+def _vosk_transcribe(wav_path: str) -> str:
+    import vosk
+    with wave.open(wav_path, 'rb') as wav:
+        recognizer = vosk.KaldiRecognizer(_vosk_model, wav.getframerate())
+        while True:
+            data = wav.readframes(4000)
+            if not data:
+                break
+            recognizer.AcceptWaveform(data)
+    return json.loads(recognizer.FinalResult()).get('text', '')
+
+
+class VoskSTTBackend(STTBackend):
+    name = 'vosk'
+
+    def __init__(self, model_path: str = VOSK_MODEL_PATH, workers: int = STT_PROCESS_POOL_SIZE):
+        if importlib.util.find_spec('vosk') is None:
+            raise STTUnavailableError("The vosk package is not installed.")
+        if not model_path or not os.path.isdir(model_path):
+            raise STTUnavailableError("VOSK_MODEL_PATH must point to an unpacked Vosk model directory.")
+        self._pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_vosk_worker, initargs=(model_path,))
+
+    async def transcribe(self, wav_path: str) -> str:
+        text = await asyncio.get_running_loop().run_in_executor(self._pool, _vosk_transcribe, wav_path)
+        if not text.strip():
+            raise NoSpeechError("Could not understand the audio")
+        return text
+
+    def close(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+class StubSTTBackend(STTBackend):
+    """Returns the transcript from the `.txt` file next to the WAV when present, else STT_STUB_TEXT."""
+    name = 'stub'
+
+    def __init__(self, text: str = STT_STUB_TEXT, latency: float = STT_STUB_LATENCY_SECONDS):
+        self._text = text
+        self._latency = latency
+
+    async def transcribe(self, wav_path: str) -> str:
+        start = time.monotonic()
+        sidecar = os.path.splitext(wav_path)[0] + '.txt'
+        text = self._text
+        if os.path.exists(sidecar):
+            with open(sidecar) as f:
+                text = f.read().strip()
+        remaining = self._latency - (time.monotonic() - start)
+        if remaining > 0:
+            await asyncio.sleep(remaining)
+        if not text:
+            raise NoSpeechError("Could not understand the audio")
+        return text
+
+
+BACKENDS = {
+    'google': GoogleSTTBackend,
+    'vosk': VoskSTTBackend,
+    'stub': StubSTTBackend,
+}
+
+
+def create_backend(name: Optional[str] = None) -> STTBackend:
+    name = (name or STT_BACKEND).lower()
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown STT backend '{name}'. Choose from: {', '.join(BACKENDS)}")
+    return BACKENDS[name]()
@@ -0,0 +1,13 @@
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# main.py reads its configuration at import time: run it offline, without the Groq and Murf keys
+# a developer's .env may hold (load_dotenv does not override variables that are already set).
+os.environ.setdefault('STT_BACKEND', 'stub')
+os.environ['GROQ_API_KEY'] = ''
+os.environ['MURF_API_KEY'] = ''
+os.environ.setdefault('DECODER_POOL_ENABLED', 'false')
+os.environ.setdefault('TTS_CACHE_DIR', tempfile.mkdtemp(prefix='tts-cache-test-'))
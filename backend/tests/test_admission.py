@@ -0,0 +1,154 @@
+import asyncio
+
+import httpx
+import pytest
+from starlette.responses import JSONResponse
+
+from admission import AdmissionController, AdmissionMiddleware, AdmissionRejected
+
+
+def _controller(**kwargs):
+    return AdmissionController(**{'initial_limit': 4, 'min_limit': 2, 'max_limit': 16, 'queue_size': 2,
+                                  'queue_timeout': 0.1, 'tolerance': 2.0, **kwargs})
+
+
+async def _fill(controller, count):
+    for _ in range(count):
+        await controller.acquire()
+
+
+def test_limit_grows_while_in_use_and_latency_is_steady():
+    async def scenario():
+        controller = _controller()
+        for _ in range(50):
+            await _fill(controller, int(controller.limit))
+            for _ in range(int(controller.limit)):
+                controller.release(0.1)
+        return controller.limit
+    assert asyncio.run(scenario()) > 4
+
+
+def test_limit_does_not_grow_when_idle():
+    async def scenario():
+        controller = _controller()
+        for _ in range(50):
+            await controller.acquire()
+            controller.release(0.1)
+        return controller.limit
+    assert asyncio.run(scenario()) == 4
+
+
+def test_limit_shrinks_when_latency_rises():
+    async def scenario():
+        controller = _controller(initial_limit=12)
+        for _ in range(20):
+            await controller.acquire()
+            controller.release(0.1)
+        for _ in range(20):
+            await controller.acquire()
+            controller.release(1.0)
+        return controller.limit
+    assert asyncio.run(scenario()) == 2  # clamped at min_limit
+
+
+def test_failures_back_off_and_cancellations_do_not():
+    async def scenario():
+        controller = _controller(initial_limit=10)
+        await controller.acquire()
+        controller.abandon()
+        after_abandon = controller.limit
+        await controller.acquire()
+        controller.release(0.1, failed=True)
+        return after_abandon, controller.limit, controller.in_flight
+    assert asyncio.run(scenario()) == (10, pytest.approx(9.0), 0)
+
+
+def test_full_queue_is_rejected_with_429_and_timeouts_with_503():
+    async def scenario():
+        controller = _controller()
+        await _fill(controller, 4)
+        waiters = [asyncio.create_task(controller.acquire()) for _ in range(2)]
+        await asyncio.sleep(0)
+        with pytest.raises(AdmissionRejected) as full:
+            await controller.acquire()
+        timed_out = await asyncio.gather(*waiters, return_exceptions=True)
+        return full.value.status_code, [e.status_code for e in timed_out], controller.snapshot()
+    full, timed_out, snapshot = asyncio.run(scenario())
+    assert full == 429
+    assert timed_out == [503, 503]
+    assert snapshot['queued'] == 0 and snapshot['in_flight'] == 4
+
+
+def test_release_hands_the_slot_to_the_oldest_waiter():
+    async def scenario():
+        controller = _controller(min_limit=4, max_limit=4, queue_timeout=1.0)
+        await _fill(controller, 4)
+        first = asyncio.create_task(controller.acquire())
+        second = asyncio.create_task(controller.acquire())
+        await asyncio.sleep(0)
+        controller.release(0.1)
+        await asyncio.sleep(0.01)
+        order = (first.done(), second.done())
+        controller.release(0.1)
+        await asyncio.gather(first, second)
+        return order, controller.in_flight
+    assert asyncio.run(scenario()) == ((True, False), 4)
+
+
+def _serve(controller, app):
+    middleware = AdmissionMiddleware(app, controller, ("/chat",))
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=middleware), base_url="http://test")
+
+
+def test_middleware_rejections_carry_retry_after():
+    async def scenario():
+        controller = _controller(initial_limit=2, queue_size=0)
+        release = asyncio.Event()
+
+        async def app(scope, receive, send):
+            await release.wait()
+            await JSONResponse({})(scope, receive, send)
+
+        async with _serve(controller, app) as client:
+            running = [asyncio.create_task(client.post("/chat")) for _ in range(2)]
+            await asyncio.sleep(0.05)
+            rejected = await client.post("/chat")
+            other_path = asyncio.create_task(client.post("/health"))
+            release.set()
+            await asyncio.gather(*running, other_path)
+        return rejected, other_path.result().status_code
+    rejected, other_status = asyncio.run(scenario())
+    assert rejected.status_code == 429
+    assert int(rejected.headers["Retry-After"]) >= 1
+    assert other_status == 200
+
+
+def test_middleware_does_not_count_cancelled_requests_as_failures():
+    async def scenario():
+        controller = _controller(initial_limit=8)
+        started = asyncio.Event()
+
+        async def app(scope, receive, send):
+            started.set()
+            await asyncio.sleep(10)
+
+        async with _serve(controller, app) as client:
+            request = asyncio.create_task(client.post("/chat"))
+            await started.wait()
+            request.cancel()
+            await asyncio.gather(request, return_exceptions=True)
+        return controller.limit, controller.in_flight
+    assert asyncio.run(scenario()) == (8, 0)
+
+
+def test_middleware_backs_off_on_server_errors():
+    async def scenario():
+        controller = _controller(initial_limit=8)
+
+        async def app(scope, receive, send):
+            await JSONResponse({}, status_code=503)(scope, receive, send)
+
+        async with _serve(controller, app) as client:
+            await client.post("/chat")
+        return controller.limit
+    assert asyncio.run(scenario()) == pytest.approx(7.2)
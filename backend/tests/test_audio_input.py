@@ -0,0 +1,63 @@
+import wave
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+import audio_input
+from audio_input import TARGET_SAMPLE_RATE, resample, sniff_container
+
+
+def _sine(freq, rate, seconds=0.5):
+    return np.sin(2 * np.pi * freq * np.arange(int(rate * seconds)) / rate).astype(np.float32)
+
+
+def _rms(signal):
+    trimmed = signal[audio_input.RESAMPLE_FILTER_TAPS:-audio_input.RESAMPLE_FILTER_TAPS]  # skip filter edges
+    return float(np.sqrt(np.mean(trimmed * trimmed)))
+
+
+@pytest.mark.parametrize("rate", [8000, 22050, 44100, 48000])
+def test_resample_keeps_duration_and_in_band_tones(rate):
+    out = resample(_sine(1000, rate), rate)
+    assert len(out) == pytest.approx(TARGET_SAMPLE_RATE * 0.5, abs=1)
+    assert _rms(out) == pytest.approx(_rms(_sine(1000, TARGET_SAMPLE_RATE)), rel=0.05)
+
+
+@pytest.mark.parametrize("rate", [44100, 48000])
+def test_downsampling_filters_tones_above_the_new_nyquist(rate):
+    # Without the low-pass a 12 kHz tone would alias to 4 kHz at full strength.
+    assert _rms(resample(_sine(12000, rate), rate)) < 0.05
+
+
+def _write_wav(path, samples, rate, channels=1):
+    with wave.open(path, 'wb') as out:
+        out.setnchannels(channels)
+        out.setsampwidth(2)
+        out.setframerate(rate)
+        out.writeframes((samples * 32767).astype('<i2').tobytes())
+
+
+def test_target_format_wav_is_passed_through(tmp_path):
+    source, target = str(tmp_path / "in.wav"), str(tmp_path / "out.wav")
+    _write_wav(source, _sine(440, TARGET_SAMPLE_RATE), TARGET_SAMPLE_RATE)
+    assert audio_input._convert_wav_in_process(source, target) == 'passthrough'
+
+
+def test_stereo_wav_is_downmixed_and_resampled(tmp_path):
+    source, target = str(tmp_path / "in.wav"), str(tmp_path / "out.wav")
+    left = _sine(440, 48000)
+    _write_wav(source, np.stack([left, left], axis=1).reshape(-1), 48000, channels=2)
+    assert audio_input._convert_wav_in_process(source, target) == 'numpy'
+    with wave.open(target, 'rb') as wav:
+        assert (wav.getnchannels(), wav.getsampwidth(), wav.getframerate()) == (1, 2, TARGET_SAMPLE_RATE)
+        assert wav.getnframes() == TARGET_SAMPLE_RATE // 2
+
+
+@pytest.mark.parametrize("header, container", [
+    (b"RIFF\0\0\0\0WAVE", "wav"), (b"\x1a\x45\xdf\xa3" + b"\0" * 8, "webm"), (b"OggS" + b"\0" * 8, "ogg"),
+    (b"ID3\x04" + b"\0" * 8, "mp3"), (b"\0\0\0\x20ftypisom", "mp4"),
+    (b"fLaC" + b"\0" * 8, "flac"), (b"hello world!", "unknown"),
+])
+def test_sniff_container(header, container):
+    assert sniff_container(header) == container
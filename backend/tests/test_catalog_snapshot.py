@@ -0,0 +1,47 @@
+"""The snapshot-backed catalog must answer every tool call exactly like the in-memory scan."""
+import pytest
+
+import catalog_snapshot
+import ecommerce_tools
+
+
+def _queries():
+    words = set()
+    for p in ecommerce_tools.MOCK_PRODUCTS:
+        words.update(catalog_snapshot._tokens(" ".join([p["name"], p["description"], " ".join(p["tags"])])))
+    queries = {w[i:j] for w in words for i in range(len(w)) for j in range(i + 1, len(w) + 1)}
+    # Multi-word, punctuated and absent queries.
+    queries.update(["men", "ear", "trail running", "moisture-wicking", "women's yoga", "e", "", "zzz", "x yoga"])
+    return sorted(queries)
+
+
+@pytest.fixture
+def snapshot(tmp_path):
+    path = str(tmp_path / "catalog.snap")
+    catalog_snapshot.write_snapshot(ecommerce_tools.MOCK_PRODUCTS, path)
+    return catalog_snapshot.open_snapshot(path)
+
+
+def _with_snapshot(monkeypatch, snapshot, call):
+    monkeypatch.setattr(ecommerce_tools, "_CATALOG_SNAPSHOT", None)
+    expected = call()
+    monkeypatch.setattr(ecommerce_tools, "_CATALOG_SNAPSHOT", snapshot)
+    return expected, call()
+
+
+def _ids(products):
+    return [p.get("id", p.get("error")) for p in products]
+
+
+def test_search_matches_scan(monkeypatch, snapshot):
+    for query in _queries():
+        expected, actual = _with_snapshot(monkeypatch, snapshot, lambda: ecommerce_tools.search_products(query))
+        assert _ids(actual) == _ids(expected), query
+
+
+@pytest.mark.parametrize("criteria", ["related", "top-rated", "unknown"])
+def test_recommendations_match_scan(monkeypatch, snapshot, criteria):
+    for product_id in [p["id"] for p in ecommerce_tools.MOCK_PRODUCTS] + ["p999"]:
+        expected, actual = _with_snapshot(
+            monkeypatch, snapshot, lambda: ecommerce_tools.recommend_products(product_id, criteria))
+        assert _ids(actual) == _ids(expected), product_id
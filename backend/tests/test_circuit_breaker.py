@@ -0,0 +1,57 @@
+import fallbacks
+from circuit_breaker import CircuitBreaker, CLOSED, OPEN, HALF_OPEN
+
+
+def _breaker(**kwargs):
+    return CircuitBreaker('test', **{'window_size': 4, 'min_calls': 4, 'slow_call_seconds': 1.0,
+                                     'open_seconds': 60.0, **kwargs})
+
+
+def test_opens_at_failure_rate():
+    breaker = _breaker()
+    for failed in (False, True, False):
+        breaker.record(0.1, failed=failed)
+    assert breaker.state == CLOSED  # below min_calls
+    breaker.record(0.1, failed=True)
+    assert breaker.state == OPEN
+    assert not breaker.allow_request()
+
+
+def test_opens_on_slow_calls():
+    breaker = _breaker()
+    for _ in range(4):
+        breaker.record(2.0)
+    assert breaker.state == OPEN
+
+
+def test_half_open_probe_closes_or_reopens():
+    breaker = _breaker(open_seconds=0.0)
+    for _ in range(4):
+        breaker.record(0.1, failed=True)
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow_request()
+    assert not breaker.allow_request()  # one probe at a time
+    breaker.record(0.1)
+    assert breaker.state == CLOSED
+
+    for _ in range(4):
+        breaker.record(0.1, failed=True)
+    assert breaker.allow_request()
+    breaker.record(0.1, failed=True)
+    assert breaker._state == OPEN
+
+
+def test_abandoned_probe_frees_its_slot():
+    breaker = _breaker(open_seconds=0.0)
+    for _ in range(4):
+        breaker.record(0.1, failed=True)
+    assert breaker.allow_request()
+    breaker.abandon()  # e.g. the probe was cancelled by a client disconnect
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow_request()
+
+
+def test_template_survives_empty_error():
+    assert fallbacks.render_template("search_products", {"error": ""}) == "Sorry, something went wrong."
+    plan = {"s1": {"tool_name": "view_cart", "result": {"error": ""}}}
+    assert fallbacks.render_template("plan", plan) == "Sorry, something went wrong."
@@ -0,0 +1,66 @@
+import asyncio
+import os
+import time
+
+import pytest
+
+import decoder_pool
+from decoder_pool import DecoderPool, DECODER_RESTARTS
+
+pytest.importorskip("av")
+
+
+def _fake_decode(input_path, output_path):
+    # Workers are forked, so they see this stand-in; "crash" kills the worker, anything else is a duration.
+    if input_path == "crash":
+        time.sleep(0.1)
+        os._exit(1)
+    time.sleep(float(input_path))
+
+
+def _run(coro_fn, monkeypatch, **kwargs):
+    monkeypatch.setattr(decoder_pool, "_decode", _fake_decode)
+
+    async def run():
+        pool = DecoderPool(**kwargs)
+        await pool.start(health_interval=0)
+        try:
+            return await coro_fn(pool)
+        finally:
+            await pool.close()
+    return asyncio.run(run())
+
+
+def test_busy_pool_that_keeps_finishing_is_healthy(monkeypatch):
+    async def scenario(pool):
+        restarts = DECODER_RESTARTS.value()
+        jobs = [asyncio.create_task(pool.decode("0.2", "out")) for _ in range(3)]
+        await asyncio.sleep(0.25)
+        start = time.monotonic()
+        healthy = await pool.health_check()
+        waited = time.monotonic() - start
+        assert await asyncio.gather(*jobs) == [True] * 3
+        return healthy, waited < 0.1, DECODER_RESTARTS.value() - restarts
+    # The check does not queue a ping behind the remaining decodes.
+    assert _run(scenario, monkeypatch, size=1, queue_size=4, timeout=1.0) == (True, True, 0)
+
+
+def test_stalled_pool_is_rebuilt(monkeypatch):
+    async def scenario(pool):
+        restarts = DECODER_RESTARTS.value()
+        job = asyncio.create_task(pool.decode("5", "out"))
+        await asyncio.sleep(0.4)
+        healthy = await pool.health_check()
+        assert await job is False
+        await asyncio.sleep(0.2)  # the killed job's slot is freed once the executor reports it broken
+        return healthy, DECODER_RESTARTS.value() - restarts, pool._in_flight
+    assert _run(scenario, monkeypatch, size=1, queue_size=0, timeout=0.3) == (False, 1, 0)
+
+
+def test_crashed_worker_rebuilds_the_pool_once(monkeypatch):
+    async def scenario(pool):
+        restarts = DECODER_RESTARTS.value()
+        await asyncio.gather(pool.decode("crash", "out"), *(pool.decode("0.5", "out") for _ in range(3)))
+        after = await asyncio.gather(*(pool.decode("0.1", "out") for _ in range(4)))
+        return DECODER_RESTARTS.value() - restarts, after, pool._in_flight
+    assert _run(scenario, monkeypatch, size=4, queue_size=0, timeout=2) == (1, [True] * 4, 0)
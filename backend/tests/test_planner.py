@@ -0,0 +1,113 @@
+import asyncio
+import time
+
+import pytest
+
+import planner
+from planner import PlanError, execute_plan, parse_plan
+
+
+def _tools(log=None, cart=None):
+    log = log if log is not None else []
+
+    def tool(name, result=None, delay=0.0):
+        def run(**parameters):
+            log.append(("start", name))
+            time.sleep(delay)
+            log.append(("end", name))
+            return result(parameters) if callable(result) else result
+        return run
+
+    def add_to_cart(product_id, delay=0.0):
+        time.sleep(delay)
+        cart.append(product_id)
+        return {"status": "success"}
+
+    return {
+        "search_products": {"function": tool("search", [{"id": "p001"}, {"id": "p002"}]), "read_only": True},
+        "recommend_products": {"function": tool("recommend", [{"error": "Product not found."}]), "read_only": True},
+        "get_order_status": {"function": tool("order", {"error": "Order not found."}), "read_only": True},
+        "get_product_reviews": {"function": tool("reviews", lambda p: [{"product": p.get("product_id")}], 0.05),
+                                "read_only": True},
+        "slow_lookup": {"function": tool("slow", {"ok": True}, 1.0), "read_only": True},
+        "view_cart": {"function": tool("view", {"items": []}, 0.05), "read_only": True},
+        "add_to_cart": {"function": add_to_cart if cart is not None else tool("add", {"status": "success"}, 0.05),
+                        "read_only": False},
+    }
+
+
+def _plan(*steps):
+    return {"steps": [dict(zip(("id", "tool_name", "parameters", "depends_on"), step)) for step in steps]}
+
+
+def _execute(raw, tools, **kwargs):
+    return asyncio.run(execute_plan(parse_plan(raw, tools), tools, **kwargs))
+
+
+# --- parse_plan ---
+
+def test_rejects_unknown_tools_and_forward_dependencies():
+    tools = _tools()
+    with pytest.raises(PlanError):
+        parse_plan(_plan(("s1", "delete_everything", {}, [])), tools)
+    with pytest.raises(PlanError):
+        parse_plan(_plan(("s1", "view_cart", {}, ["s2"]), ("s2", "view_cart", {}, [])), tools)
+    with pytest.raises(PlanError):
+        parse_plan(_plan(*[(f"s{i}", "view_cart", {}, []) for i in range(planner.PLANNER_MAX_STEPS + 1)]), tools)
+
+
+def test_rejects_references_to_undeclared_dependencies():
+    tools = _tools()
+    with pytest.raises(PlanError):
+        parse_plan(_plan(("s1", "search_products", {}, []),
+                         ("s2", "get_product_reviews", {"product_id": "$s1.0.id"}, [])), tools)
+    # Strings that do not name a step are literals.
+    steps = parse_plan(_plan(("s1", "search_products", {"query": "$50 shoes"}, [])), tools)
+    assert steps[0].parameters == {"query": "$50 shoes"}
+
+
+# --- execute_plan ---
+
+def test_resolves_references_from_dependencies():
+    outcomes = _execute(_plan(("s1", "search_products", {}, []),
+                              ("s2", "get_product_reviews", {"product_id": "$s1.1.id"}, ["s1"])), _tools())
+    assert outcomes["s2"]["result"] == [{"product": "p002"}]
+
+
+@pytest.mark.parametrize("failing_tool", ["get_order_status", "recommend_products"])
+def test_dependency_failure_skips_dependents(failing_tool):
+    log = []
+    outcomes = _execute(_plan(("s1", failing_tool, {}, []), ("s2", "view_cart", {}, ["s1"])), _tools(log))
+    assert "Skipped" in outcomes["s2"]["result"]["error"]
+    assert ("start", "view") not in log
+
+
+def test_write_steps_run_alone_and_in_order():
+    log = []
+    _execute(_plan(("s1", "view_cart", {}, []), ("s2", "add_to_cart", {}, []),
+                   ("s3", "view_cart", {}, []), ("s4", "search_products", {}, [])), _tools(log))
+    add_start, add_end = log.index(("start", "add")), log.index(("end", "add"))
+    assert add_end == add_start + 1
+    assert log.index(("end", "view")) < add_start
+    assert log.index(("start", "search")) > add_end
+
+
+def test_budget_cancels_reads_but_reports_started_writes():
+    cart = []
+    outcomes = _execute(_plan(("s1", "add_to_cart", {"product_id": "p001", "delay": 0.3}, []),
+                              ("s2", "slow_lookup", {}, [])),
+                        _tools(cart=cart), latency_budget=0.1)
+    # The cart did change, so the plan must not claim otherwise.
+    assert cart == ["p001"]
+    assert outcomes["s1"]["result"] == {"status": "success"}
+    assert outcomes["s2"]["result"] == {"error": "Latency budget exceeded."}
+
+
+def test_budget_stops_writes_that_have_not_started():
+    cart = []
+    outcomes = _execute(_plan(("s1", "add_to_cart", {"product_id": "p001", "delay": 0.3}, []),
+                              ("s2", "add_to_cart", {"product_id": "p002"}, [])),
+                        _tools(cart=cart), latency_budget=0.1)
+    time.sleep(0.1)
+    assert cart == ["p001"]
+    assert outcomes["s2"]["result"] == {"error": "Latency budget exceeded."}
@@ -0,0 +1,154 @@
+import asyncio
+
+import pytest
+
+import response_cache
+from response_cache import ResponseCache, cache_key
+
+import main
+
+
+def _put(cache, key, reads=("catalog",), versions=None):
+    cache.put(key, {"response_text": "ok"}, "search_products", {"query": "mat"}, [], reads,
+              versions or cache.versions())
+
+
+# --- ResponseCache ---
+
+def test_normalized_text_shares_a_key():
+    assert cache_key("Return policy?", "neutral", "medium", "MP3") == cache_key("  return  policy ", None, "medium", "mp3")
+
+
+def test_change_to_a_read_table_invalidates():
+    versions = {"catalog": 0, "cart": 0}
+    cache = ResponseCache(versions)
+    key = cache_key("yoga mats", "neutral", "medium", None)
+    _put(cache, key)
+    versions["cart"] += 1
+    assert cache.get(key) is not None  # the reply does not read the cart
+    versions["catalog"] += 1
+    assert cache.get(key) is None
+    assert len(cache) == 0
+
+
+def test_change_while_the_tool_ran_marks_the_entry_stale():
+    versions = {"catalog": 0}
+    cache = ResponseCache(versions)
+    key = cache_key("yoga mats", "neutral", "medium", None)
+    before = cache.versions()
+    versions["catalog"] += 1
+    _put(cache, key, versions=before)
+    assert cache.get(key) is None
+
+
+def test_entries_expire(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(response_cache.time, "monotonic", lambda: now[0])
+    cache = ResponseCache({"catalog": 0}, ttl_seconds=10)
+    key = cache_key("yoga mats", "neutral", "medium", None)
+    _put(cache, key)
+    now[0] += 9
+    assert cache.get(key) is not None
+    now[0] += 2
+    assert cache.get(key) is None
+
+
+def test_least_recently_used_is_evicted():
+    cache = ResponseCache({"catalog": 0}, max_entries=2)
+    keys = [cache_key(text, "neutral", "medium", None) for text in ("a", "b", "c")]
+    _put(cache, keys[0])
+    _put(cache, keys[1])
+    cache.get(keys[0])
+    _put(cache, keys[2])
+    assert cache.get(keys[0]) is not None
+    assert cache.get(keys[1]) is None
+
+
+def test_rejected_entry_is_dropped():
+    cache = ResponseCache({"catalog": 0})
+    key = cache_key("yoga mats", "neutral", "medium", None)
+    _put(cache, key)
+    assert cache.get(key, valid=lambda entry: False) is None
+    assert len(cache) == 0
+
+
+# --- process_text_request ---
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = ResponseCache(main.ecommerce_tools.DATA_VERSIONS)
+    monkeypatch.setattr(main, "response_cache", cache)
+    return cache
+
+
+def _ask(text, session_id=None):
+    return asyncio.run(main.process_text_request(text, session_id))
+
+
+def test_read_only_reply_is_served_to_a_new_session(cache):
+    first = _ask("what are your store hours")
+    assert len(cache) == 1
+    second = _ask("What are your store hours?")
+    assert second.response_text == first.response_text
+    assert second.session_id != first.session_id
+
+
+def test_write_tool_reply_is_not_cached(cache, monkeypatch):
+    monkeypatch.setattr(main.ecommerce_tools, "MOCK_SHOPPING_CART", {})
+    _ask("add p004 to my cart")
+    assert len(cache) == 0
+
+
+def test_degraded_reply_is_not_cached(cache, monkeypatch):
+    async def no_audio(*args, **kwargs):
+        return None
+    monkeypatch.setattr(main, "MURF_API_KEY", "key")
+    monkeypatch.setattr(main.voice_synthesizer, "synthesize_speech", no_audio)
+    _ask("what are your store hours")
+    assert len(cache) == 0
+
+
+def test_sessions_do_not_share_context_dependent_answers(cache, monkeypatch):
+    # Stands in for the LLM, which resolves "the reviews" from the session's tracked products.
+    async def choose(text, conversation=None, speculative=None):
+        product_ids = conversation.last_product_ids if conversation else []
+        if not product_ids:
+            return {"tool_name": "get_product_reviews", "parameters": {}, "result": [{"message": "Which product?"}]}
+        return {"tool_name": "get_product_reviews", "parameters": {"product_id": product_ids[0]},
+                "result": [{"message": f"Reviews of {product_ids[0]}."}]}
+    monkeypatch.setattr(main, "choose_and_execute_tool", choose)
+
+    session_a = main.conversation_store.get(None)
+    session_a.last_product_ids = ["p001"]
+    assert _ask("show me reviews", session_a.session_id).response_text == "Reviews of p001."
+    assert len(cache) == 0
+
+    reply_b = _ask("show me reviews")
+    assert reply_b.response_text == "Which product?"
+    assert main.conversation_store.get(reply_b.session_id).last_product_ids == []
+
+    # The context-free reply now cached for B must not be replayed to A either.
+    assert _ask("show me reviews", session_a.session_id).response_text == "Reviews of p001."
+
+
+def test_evicted_audio_is_not_served(cache, monkeypatch, tmp_path):
+    store = main.AudioStore(str(tmp_path))
+    name = "0" * 64 + ".mp3"
+    store.put(name, b"audio")
+
+    synthesized = []
+
+    async def local_audio(*args, **kwargs):
+        synthesized.append(name)
+        return main.audio_store.local_url(name)
+    monkeypatch.setattr(main, "tts_cache", store)
+    monkeypatch.setattr(main, "MURF_API_KEY", "key")
+    monkeypatch.setattr(main.voice_synthesizer, "synthesize_speech", local_audio)
+
+    _ask("what are your store hours")
+    _ask("what are your store hours")
+    assert len(synthesized) == 1
+    (tmp_path / name).unlink()  # evicted, possibly by another worker
+    _ask("what are your store hours")
+    assert len(synthesized) == 2
+    assert len(cache) == 1  # stored again from the fresh reply
@@ -0,0 +1,56 @@
+import asyncio
+
+import pytest
+
+from single_flight import SingleFlight
+
+
+def _counted(calls, result="ok", delay=0.05, error=None):
+    async def call():
+        calls.append(1)
+        await asyncio.sleep(delay)
+        if error:
+            raise error
+        return result
+    return call
+
+
+def test_concurrent_callers_share_one_call():
+    async def scenario():
+        group, calls = SingleFlight('test'), []
+        results = await asyncio.gather(*(group.do("key", _counted(calls)) for _ in range(5)),
+                                       group.do("other", _counted(calls, "other")))
+        return results, len(calls), len(group)
+    assert asyncio.run(scenario()) == (["ok"] * 5 + ["other"], 2, 0)
+
+
+def test_finished_calls_are_not_cached():
+    async def scenario():
+        group, calls = SingleFlight('test'), []
+        await group.do("key", _counted(calls))
+        await group.do("key", _counted(calls))
+        return len(calls)
+    assert asyncio.run(scenario()) == 2
+
+
+def test_exception_reaches_every_caller():
+    async def scenario():
+        group, calls = SingleFlight('test'), []
+        return await asyncio.gather(*(group.do("key", _counted(calls, error=RuntimeError("down")))
+                                      for _ in range(3)), return_exceptions=True), len(calls)
+    results, calls = asyncio.run(scenario())
+    assert calls == 1
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+
+def test_cancelled_caller_does_not_cancel_the_others():
+    async def scenario():
+        group, calls = SingleFlight('test'), []
+        first = asyncio.create_task(group.do("key", _counted(calls, delay=0.1)))
+        second = asyncio.create_task(group.do("key", _counted(calls, delay=0.1)))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second, len(calls)
+    assert asyncio.run(scenario()) == ("ok", 1)
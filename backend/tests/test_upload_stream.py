@@ -0,0 +1,86 @@
+import asyncio
+import os
+import tempfile
+
+import pytest
+
+import upload_stream
+from upload_stream import MalformedUploadError, UploadTooLargeError, receive_upload
+
+BOUNDARY = "testboundary"
+
+
+def _part(name, value, filename=None):
+    disposition = f'form-data; name="{name}"' + (f'; filename="{filename}"' if filename else '')
+    return f"--{BOUNDARY}\r\nContent-Disposition: {disposition}\r\n\r\n".encode() + value + b"\r\n"
+
+
+def _body(*parts):
+    return b"".join(parts) + f"--{BOUNDARY}--\r\n".encode()
+
+
+class _Request:
+    def __init__(self, body, chunk_size=7, declare_length=True,
+                 content_type=f"multipart/form-data; boundary={BOUNDARY}"):
+        self.body = body
+        self.chunk_size = chunk_size
+        self.read = 0
+        self.headers = {'content-type': content_type}
+        if declare_length:
+            self.headers['content-length'] = str(len(body))
+
+    async def stream(self):
+        for i in range(0, len(self.body), self.chunk_size):
+            self.read = i + self.chunk_size
+            yield self.body[i:i + self.chunk_size]
+
+
+def _receive(request, **kwargs):
+    return asyncio.run(receive_upload(request, **kwargs))
+
+
+@pytest.fixture
+def temp_files(monkeypatch, tmp_path):
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+    return tmp_path
+
+
+def test_file_and_fields_are_parsed_across_chunks(temp_files):
+    audio = bytes(range(256)) * 40
+    body = _body(_part("language", b"en"), _part("audio_file", audio, "a.webm"), _part("voice", b"calm"))
+    path, fields = _receive(_Request(body))
+    with open(path, "rb") as f:
+        assert f.read() == audio
+    assert fields == {"language": "en", "voice": "calm"}
+    os.unlink(path)
+
+
+def test_declared_oversize_body_is_rejected_unread(temp_files):
+    request = _Request(_body(_part("audio_file", b"x" * 2048, "a.webm")))
+    request.headers['content-length'] = str(upload_stream.MULTIPART_OVERHEAD_BYTES + 1025)
+    with pytest.raises(UploadTooLargeError):
+        _receive(request, max_bytes=1024)
+    assert request.read == 0
+
+
+def test_undeclared_oversize_file_is_cut_off(temp_files):
+    request = _Request(_body(_part("audio_file", b"x" * 4096, "a.webm")), chunk_size=256, declare_length=False)
+    with pytest.raises(UploadTooLargeError):
+        _receive(request, max_bytes=1024)
+    assert request.read < 2048
+    assert list(temp_files.iterdir()) == []
+
+
+@pytest.mark.parametrize("body, content_type", [
+    (_body(_part("language", b"en")), None),
+    (_body(_part("audio_file", b"a", "a.webm"), _part("audio_file", b"b", "b.webm")), None),
+    (_body(_part("language", b"x" * (upload_stream.MAX_FORM_FIELD_BYTES + 1)), _part("audio_file", b"a", "a.webm")),
+     None),
+    (b"not a multipart body", None),
+    (_body(_part("audio_file", b"a", "a.webm")), "application/json"),
+])
+def test_malformed_uploads_are_rejected(temp_files, body, content_type):
+    request = _Request(body) if content_type is None else _Request(body, content_type=content_type)
+    with pytest.raises(MalformedUploadError):
+        _receive(request)
+    assert list(temp_files.iterdir()) == []
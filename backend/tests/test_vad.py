@@ -0,0 +1,70 @@
+import wave
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+import vad
+
+RATE = 16000
+
+
+def _tone(seconds, dbfs, freq=220.0):
+    t = np.arange(int(seconds * RATE)) / RATE
+    amplitude = 10 ** (dbfs / 20) * np.sqrt(2)  # RMS of a sine is amplitude / sqrt(2)
+    return (amplitude * np.sin(2 * np.pi * freq * t) * 32767).astype('<i2')
+
+
+def _silence(seconds, dbfs=-70.0):
+    rng = np.random.default_rng(0)
+    return (rng.normal(0, 10 ** (dbfs / 20), int(seconds * RATE)) * 32767).astype('<i2')
+
+
+def _seconds(segments):
+    return [(start / RATE, end / RATE) for start, end in segments]
+
+
+def test_silence_is_rejected():
+    assert vad.speech_segments(_silence(2.0), RATE) == []
+    assert vad.speech_segments(np.zeros(RATE, dtype='<i2'), RATE) == []
+
+
+def test_leading_and_trailing_silence_is_trimmed():
+    samples = np.concatenate([_silence(1.0), _tone(1.0, -20), _silence(1.0)])
+    [(start, end)] = _seconds(vad.speech_segments(samples, RATE))
+    pad = vad.VAD_PADDING_MS / 1000
+    assert start == pytest.approx(1.0 - pad, abs=0.05)
+    assert end == pytest.approx(2.0 + pad, abs=0.05)
+
+
+@pytest.mark.parametrize("dbfs", [-15, -35])
+def test_speech_with_no_silence_is_kept(dbfs):
+    # Every frame is speech, so the 10th-percentile "noise floor" sits at speech level.
+    samples = _tone(2.0, dbfs) + _tone(2.0, dbfs - 6, freq=3.0)  # plus a slow drift
+    [(start, end)] = _seconds(vad.speech_segments(samples, RATE))
+    assert start == 0 and end == pytest.approx(2.0, abs=0.05)
+
+
+def test_speech_over_loud_background_noise_is_found():
+    samples = np.concatenate([_silence(1.0, -35), _tone(1.0, -10) + _silence(1.0, -35), _silence(1.0, -35)])
+    [(start, end)] = _seconds(vad.speech_segments(samples, RATE))
+    assert 0.5 < start < 1.0 and 2.0 < end < 2.5
+
+
+def test_steady_hum_is_not_speech():
+    assert vad.speech_segments(_tone(2.0, -45, freq=50.0), RATE) == []
+
+
+def test_long_pause_splits_utterances(tmp_path, monkeypatch):
+    monkeypatch.setattr(vad, "VAD_ENABLED", True)
+    path = str(tmp_path / "in.wav")
+    with wave.open(path, 'wb') as out:
+        out.setnchannels(1)
+        out.setsampwidth(2)
+        out.setframerate(RATE)
+        out.writeframes(np.concatenate([_tone(0.5, -20), _silence(1.5), _tone(0.5, -20)]).tobytes())
+    paths = vad.split_utterances(path)
+    assert len(paths) == 2
+    for part in paths:
+        with wave.open(part, 'rb') as wav:
+            assert wav.getframerate() == RATE and wav.getnframes() < RATE
@@ -0,0 +1,307 @@
+"""
+Lightweight OpenTelemetry-style tracing.
+
+Spans nest through a context variable, so a span opened in a request handler is
+the parent of everything awaited, threaded (`asyncio.to_thread` copies the
+context) or spawned as a task beneath it. Incoming W3C `traceparent` headers
+continue the caller's trace, and `traceparent()` produces the header for
+outbound Groq and Murf calls.
+
+Finished spans go on a bounded queue that a background thread hands to the
+exporter in batches, so request handlers never wait on I/O. Choose the exporter
+with TRACING_EXPORTER:
+
+    none     tracing disabled; span() is a no-op (default)
+    console  one JSON line per span in the application log
+    file     JSON lines appended to TRACING_FILE_PATH
+    otlp     OTLP/HTTP JSON to a collector at OTLP_ENDPOINT
+"""
+import contextvars
+import json
+import logging
+import os
+import queue
+import random
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import metrics
+
+logger = logging.getLogger('MultiAgentOrchestrator')
+
+TRACING_EXPORTER = os.getenv('TRACING_EXPORTER', 'none').lower()
+TRACING_SAMPLE_RATE = float(os.getenv('TRACING_SAMPLE_RATE', '1.0'))
+TRACING_SERVICE_NAME = os.getenv('TRACING_SERVICE_NAME', 'agentic-ecommerce-orchestrator')
+TRACING_FILE_PATH = os.getenv('TRACING_FILE_PATH', 'traces.jsonl')
+TRACING_QUEUE_SIZE = int(os.getenv('TRACING_QUEUE_SIZE', '4096'))
+TRACING_BATCH_SIZE = int(os.getenv('TRACING_BATCH_SIZE', '256'))
+TRACING_FLUSH_SECONDS = float(os.getenv('TRACING_FLUSH_SECONDS', '2'))
+OTLP_ENDPOINT = os.getenv('OTLP_ENDPOINT', 'http://localhost:4318/v1/traces')
+
+SPANS_DROPPED = metrics.counter('tracing_spans_dropped_total', 'Finished spans dropped because the export queue was full.')
+EXPORT_ERRORS = metrics.counter('tracing_export_errors_total', 'Span batches the exporter failed to deliver.')
+
+KIND_INTERNAL, KIND_SERVER, KIND_CLIENT = 1, 2, 3
+
+_TRACEPARENT_RE = re.compile(r'^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$')
+_current: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar('current_span', default=None)
+
+
+class SpanContext:
+    __slots__ = ('trace_id', 'span_id', 'sampled')
+
+    def __init__(self, trace_id: str, span_id: str, sampled: bool):
+        self.trace_id = trace_id
+        self.span_id = span_id
+        self.sampled = sampled
+
+
+def parse_traceparent(header: Optional[str]) -> Optional[SpanContext]:
+    match = _TRACEPARENT_RE.match((header or '').strip().lower())
+    if not match or match.group(1) == '0' * 32 or match.group(2) == '0' * 16:
+        return None
+    return SpanContext(match.group(1), match.group(2), bool(int(match.group(3), 16) & 1))
+
+
+class Span:
+    __slots__ = ('name', 'kind', 'context', 'parent_id', 'attributes', 'start_ns', 'end_ns', 'error', '_token')
+
+    def __init__(self, name: str, kind: int, context: SpanContext, parent_id: Optional[str], attributes: Dict[str, Any]):
+        self.name = name
+        self.kind = kind
+        self.context = context
+        self.parent_id = parent_id
+        self.attributes = attributes
+        self.start_ns = 0
+        self.end_ns = 0
+        self.error: Optional[str] = None
+        self._token = None
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def __enter__(self):
+        self.start_ns = time.time_ns()
+        self._token = _current.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.end_ns = time.time_ns()
+        _current.reset(self._token)
+        if exc_type is not None and not issubclass(exc_type, GeneratorExit):
+            self.error = f"{exc_type.__name__}: {exc}"
+        if self.context.sampled:
+            _processor.submit(self)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'name': self.name, 'trace_id': self.context.trace_id, 'span_id': self.context.span_id,
+            'parent_id': self.parent_id, 'kind': self.kind, 'start_ns': self.start_ns, 'end_ns': self.end_ns,
+            'duration_ms': round((self.end_ns - self.start_ns) / 1e6, 3), 'attributes': self.attributes,
+            'error': self.error,
+        }
+
+
+class _NoopSpan:
+    def set_attribute(self, key: str, value: Any):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+def span(name: str, kind: int = KIND_INTERNAL, parent: Optional[SpanContext] = None, **attributes):
+    """
+    A context manager for a span named `name`, child of `parent` when given,
+    else of the current span, else the root of a new (possibly unsampled) trace.
+    """
+    if _processor.exporter is None:
+        return _NOOP_SPAN
+    parent = parent or (_current.get().context if _current.get() is not None else None)
+    if parent is None:
+        context = SpanContext(f'{random.getrandbits(128):032x}', f'{random.getrandbits(64):016x}',
+                              random.random() < TRACING_SAMPLE_RATE)
+    else:
+        context = SpanContext(parent.trace_id, f'{random.getrandbits(64):016x}', parent.sampled)
+    return Span(name, kind, context, parent.span_id if parent else None, attributes)
+
+
+def traceparent() -> Optional[str]:
+    """The W3C traceparent header value for the current span, or None outside a trace."""
+    current = _current.get()
+    if current is None:
+        return None
+    return f"00-{current.context.trace_id}-{current.context.span_id}-{'01' if current.context.sampled else '00'}"
+
+
+def inject(headers: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+    """`headers` plus a traceparent for the current span, if there is one."""
+    headers = dict(headers or {})
+    value = traceparent()
+    if value:
+        headers['traceparent'] = value
+    return headers
+
+
+# --- Exporters ---
+
+class ConsoleExporter:
+    def export(self, spans: List[Span]):
+        for s in spans:
+            logger.info(f"span {json.dumps(s.to_dict(), default=str)}")
+
+    def close(self):
+        pass
+
+
+class FileExporter:
+    def __init__(self, path: str = TRACING_FILE_PATH):
+        self._file = open(path, 'a', buffering=1)
+
+    def export(self, spans: List[Span]):
+        self._file.write(''.join(json.dumps(s.to_dict(), default=str) + '\n' for s in spans))
+
+    def close(self):
+        self._file.close()
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, int):
+        return {'intValue': str(value)}
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    return {'stringValue': str(value)}
+
+
+class OTLPExporter:
+    """OTLP/HTTP with the JSON encoding, which any OpenTelemetry collector accepts on port 4318."""
+
+    def __init__(self, endpoint: str = OTLP_ENDPOINT):
+        import httpx
+        self._endpoint = endpoint
+        self._client = httpx.Client(timeout=5.0)
+        self._resource = {'attributes': [{'key': 'service.name', 'value': {'stringValue': TRACING_SERVICE_NAME}}]}
+
+    def _encode(self, s: Span) -> Dict[str, Any]:
+        encoded = {
+            'traceId': s.context.trace_id, 'spanId': s.context.span_id, 'name': s.name, 'kind': s.kind,
+            'startTimeUnixNano': str(s.start_ns), 'endTimeUnixNano': str(s.end_ns),
+            'attributes': [{'key': k, 'value': _otlp_value(v)} for k, v in s.attributes.items()],
+            'status': {'code': 2, 'message': s.error} if s.error else {'code': 1},
+        }
+        if s.parent_id:
+            encoded['parentSpanId'] = s.parent_id
+        return encoded
+
+    def export(self, spans: List[Span]):
+        body = {'resourceSpans': [{'resource': self._resource, 'scopeSpans': [
+            {'scope': {'name': TRACING_SERVICE_NAME}, 'spans': [self._encode(s) for s in spans]}]}]}
+        self._client.post(self._endpoint, json=body).raise_for_status()
+
+    def close(self):
+        self._client.close()
+
+
+EXPORTERS = {
+    'console': ConsoleExporter,
+    'file': FileExporter,
+    'otlp': OTLPExporter,
+}
+
+
+class _BatchProcessor:
+    """Queues finished spans and exports them from a daemon thread in batches."""
+
+    def __init__(self):
+        self.exporter = None  # None while tracing is off; span() checks it on every call
+        self._sink = None
+        self._queue: "queue.Queue[Optional[Span]]" = queue.Queue(maxsize=TRACING_QUEUE_SIZE)
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, exporter):
+        self.exporter = self._sink = exporter
+        self._thread = threading.Thread(target=self._run, name='span-exporter', daemon=True)
+        self._thread.start()
+
+    def submit(self, s: Span):
+        try:
+            self._queue.put_nowait(s)
+        except queue.Full:
+            SPANS_DROPPED.inc()
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            batch, deadline = [], time.monotonic() + TRACING_FLUSH_SECONDS
+            while len(batch) < TRACING_BATCH_SIZE:
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            if batch:
+                try:
+                    self._sink.export(batch)
+                except Exception as e:
+                    EXPORT_ERRORS.inc()
+                    logger.warning(f"Exporting {len(batch)} span(s) failed: {e}")
+
+    def shutdown(self, timeout: float = 5.0):
+        if self._thread is None:
+            return
+        self.exporter = None  # new spans become no-ops
+        self._queue.put(None)
+        self._thread.join(timeout)
+        self._thread = None
+        self._sink.close()
+
+
+_processor = _BatchProcessor()
+
+
+def configure(exporter_name: str = TRACING_EXPORTER):
+    """Starts exporting spans with the named exporter; 'none' leaves tracing disabled."""
+    if exporter_name == 'none' or _processor.exporter is not None:
+        return
+    if exporter_name not in EXPORTERS:
+        raise ValueError(f"Unknown tracing exporter '{exporter_name}'. Choose from: none, {', '.join(EXPORTERS)}")
+    _processor.start(EXPORTERS[exporter_name]())
+    logger.info(f"Tracing enabled with the {exporter_name} exporter")
+
+
+def shutdown():
+    """Flushes queued spans and closes the exporter."""
+    _processor.shutdown()
+
+
+class TracingMiddleware:
+    """ASGI middleware opening a server span per HTTP request, continuing any incoming traceparent."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or _processor.exporter is None:
+            return await self.app(scope, receive, send)
+        headers = dict(scope.get('headers') or [])
+        parent = parse_traceparent(headers.get(b'traceparent', b'').decode('latin-1'))
+        with span(f"{scope['method']} {scope['path']}", kind=KIND_SERVER, parent=parent,
+                  **{'http.method': scope['method'], 'http.target': scope['path']}) as server_span:
+            async def send_with_status(message):
+                if message['type'] == 'http.response.start':
+                    server_span.set_attribute('http.status_code', message['status'])
+                await send(message)
+            await self.app(scope, receive, send_with_status)
@@ -0,0 +1,98 @@
+"""
+Shared, connection-pooled HTTP client for the Murf TTS API.
+
+One AsyncClient is opened in the FastAPI lifespan and reused by every request,
+so TCP and TLS handshakes to api.murf.ai are paid once per pooled connection
+instead of once per reply. HTTP/2 is used when the optional `h2` package is
+installed; otherwise HTTP/1.1 keep-alive.
+"""
+import asyncio
+import importlib.util
+import logging
+import os
+from typing import Optional, Dict, Any
+
+import httpx
+
+import metrics
+import tracing
+
+logger = logging.getLogger('MultiAgentOrchestrator')
+
+MURF_MAX_CONNECTIONS = int(os.getenv('MURF_MAX_CONNECTIONS', '20'))
+MURF_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv('MURF_MAX_KEEPALIVE_CONNECTIONS', '10'))
+MURF_KEEPALIVE_EXPIRY_SECONDS = float(os.getenv('MURF_KEEPALIVE_EXPIRY_SECONDS', '60'))
+MURF_CONNECT_TIMEOUT_SECONDS = float(os.getenv('MURF_CONNECT_TIMEOUT_SECONDS', '3'))
+MURF_WARMUP_CONNECTIONS = int(os.getenv('MURF_WARMUP_CONNECTIONS', '2'))
+
+HTTP2_AVAILABLE = importlib.util.find_spec('h2') is not None
+
+MURF_HTTP_REQUESTS = metrics.counter('murf_http_requests_total', 'Requests sent to Murf.', ['http_version'])
+MURF_HTTP_CONNECTIONS = metrics.counter('murf_http_connections_opened_total', 'New TCP connections opened to Murf; the rest reused a pooled connection.')
+
+
+async def _trace_connections(event_name: str, info: Dict[str, Any]):
+    if event_name == 'connection.connect_tcp.complete':
+        MURF_HTTP_CONNECTIONS.inc()
+
+
+class MurfClient:
+    def __init__(self, api_key: str, generate_url: str, timeout: float):
+        self._api_key = api_key
+        self._generate_url = generate_url
+        self._timeout = timeout
+        self._client: Optional[httpx.AsyncClient] = None
+
+    async def start(self):
+        self._client = httpx.AsyncClient(
+            http2=HTTP2_AVAILABLE,
+            limits=httpx.Limits(
+                max_connections=MURF_MAX_CONNECTIONS,
+                max_keepalive_connections=MURF_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=MURF_KEEPALIVE_EXPIRY_SECONDS,
+            ),
+            timeout=httpx.Timeout(self._timeout, connect=MURF_CONNECT_TIMEOUT_SECONDS),
+        )
+        await self.warm_up()
+
+    async def warm_up(self):
+        """Opens pooled connections ahead of the first reply. Any HTTP response counts; errors are only logged."""
+        url = httpx.URL(self._generate_url).copy_with(path="/", query=None)
+        # Concurrent requests force separate HTTP/1.1 connections; HTTP/2 multiplexes onto one.
+        count = 1 if HTTP2_AVAILABLE else MURF_WARMUP_CONNECTIONS
+        results = await asyncio.gather(
+            *(self._client.head(url, extensions={"trace": _trace_connections}) for _ in range(count)),
+            return_exceptions=True,
+        )
+        errors = [r for r in results if isinstance(r, Exception)]
+        if errors:
+            logger.warning(f"Murf connection warm-up failed: {errors[0]}")
+        else:
+            logger.info(f"Murf HTTP client ready with {count} warm connection(s) (http2={HTTP2_AVAILABLE})")
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def generate(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        if self._client is None:
+            await self.start()
+        with tracing.span("murf.generate", kind=tracing.KIND_CLIENT) as murf_span:
+            response = await self._client.post(
+                self._generate_url, json=payload, headers=tracing.inject({"api-key": self._api_key}),
+                extensions={"trace": _trace_connections},
+            )
+            murf_span.set_attribute('http.status_code', response.status_code)
+            MURF_HTTP_REQUESTS.inc(http_version=response.http_version)
+            response.raise_for_status()
+            return response.json()
+
+    async def download(self, url: str) -> bytes:
+        """Fetches a generated audio file. The API key is only ever sent to the generate endpoint."""
+        if self._client is None:
+            await self.start()
+        with tracing.span("murf.download", kind=tracing.KIND_CLIENT):
+            response = await self._client.get(url)
+            response.raise_for_status()
+            return response.content
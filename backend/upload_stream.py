@@ -0,0 +1,147 @@
+"""
+Streams multipart audio uploads to disk.
+
+The request body is fed chunk by chunk through python-multipart's push parser
+and the file part is written to a temp file as it arrives. The whole upload is
+never held in memory, so per-request memory stays constant whatever the
+recording length. A declared Content-Length over the limit is rejected before
+any of the body is read; bodies without one are cut off as soon as they pass it.
+"""
+import asyncio
+import logging
+import os
+import tempfile
+from typing import Dict, Tuple
+
+try:
+    import python_multipart as multipart
+    from python_multipart.exceptions import FormParserError
+    from python_multipart.multipart import parse_options_header
+except ImportError:  # python-multipart < 0.0.13
+    import multipart
+    from multipart.exceptions import FormParserError
+    from multipart.multipart import parse_options_header
+
+logger = logging.getLogger('MultiAgentOrchestrator')
+
+MAX_UPLOAD_BYTES = int(os.getenv('MAX_UPLOAD_BYTES', str(10 * 1024 * 1024)))
+MAX_FORM_FIELD_BYTES = 4096
+# Multipart boundaries, part headers and the small text fields ride on top of the file itself.
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+
+class UploadTooLargeError(Exception):
+    pass
+
+
+class MalformedUploadError(Exception):
+    pass
+
+
+class _UploadParser:
+    """python-multipart callbacks: file data is buffered per body chunk, text fields are kept whole."""
+
+    def __init__(self, file_field: str, max_bytes: int):
+        self.file_field = file_field
+        self.max_bytes = max_bytes
+        self.fields: Dict[str, str] = {}
+        self.file_seen = False
+        self.file_bytes = 0
+        self.pending = []  # file data parsed from the current body chunk, not yet written
+        self._header_field = b''
+        self._header_value = b''
+        self._headers = {}
+        self._name = None
+        self._is_file = False
+        self._value = bytearray()
+
+    def callbacks(self):
+        return {
+            'on_part_begin': self.on_part_begin,
+            'on_part_data': self.on_part_data,
+            'on_part_end': self.on_part_end,
+            'on_header_field': self.on_header_field,
+            'on_header_value': self.on_header_value,
+            'on_header_end': self.on_header_end,
+            'on_headers_finished': self.on_headers_finished,
+        }
+
+    def on_part_begin(self):
+        self._headers = {}
+        self._value = bytearray()
+
+    def on_header_field(self, data: bytes, start: int, end: int):
+        self._header_field += data[start:end]
+
+    def on_header_value(self, data: bytes, start: int, end: int):
+        self._header_value += data[start:end]
+
+    def on_header_end(self):
+        self._headers[self._header_field.lower()] = self._header_value
+        self._header_field = self._header_value = b''
+
+    def on_headers_finished(self):
+        _, options = parse_options_header(self._headers.get(b'content-disposition', b''))
+        self._name = options.get(b'name', b'').decode('latin-1')
+        self._is_file = self._name == self.file_field
+        if self._is_file:
+            if self.file_seen:
+                raise MalformedUploadError(f"More than one '{self.file_field}' part")
+            self.file_seen = True
+
+    def on_part_data(self, data: bytes, start: int, end: int):
+        if self._is_file:
+            self.file_bytes += end - start
+            if self.file_bytes > self.max_bytes:
+                raise UploadTooLargeError(f"Upload exceeds {self.max_bytes} bytes")
+            self.pending.append(data[start:end])
+        else:
+            self._value += data[start:end]
+            if len(self._value) > MAX_FORM_FIELD_BYTES:
+                raise MalformedUploadError(f"Form field '{self._name}' is too long")
+
+    def on_part_end(self):
+        if not self._is_file and self._name:
+            self.fields[self._name] = self._value.decode('utf-8', errors='replace')
+
+
+async def receive_upload(request, file_field: str = 'audio_file',
+                         max_bytes: int = MAX_UPLOAD_BYTES) -> Tuple[str, Dict[str, str]]:
+    """
+    Streams the multipart body of `request` into a temp file. Returns the file's
+    path (the caller deletes it) and the text form fields.
+    """
+    content_type, options = parse_options_header(request.headers.get('content-type', ''))
+    if content_type != b'multipart/form-data' or b'boundary' not in options:
+        raise MalformedUploadError("Expected a multipart/form-data body")
+
+    max_body = max_bytes + MULTIPART_OVERHEAD_BYTES
+    declared = request.headers.get('content-length')
+    if declared and declared.isdigit() and int(declared) > max_body:
+        raise UploadTooLargeError(f"Upload exceeds {max_bytes} bytes")
+
+    state = _UploadParser(file_field, max_bytes)
+    parser = multipart.MultipartParser(options[b'boundary'], state.callbacks())
+    fd, path = tempfile.mkstemp(suffix='.upload')
+    received = 0
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            async for chunk in request.stream():
+                received += len(chunk)
+                if received > max_body:
+                    raise UploadTooLargeError(f"Upload exceeds {max_bytes} bytes")
+                parser.write(chunk)
+                if state.pending:
+                    data, state.pending = b''.join(state.pending), []
+                    await asyncio.to_thread(out.write, data)
+            parser.finalize()
+        if not state.file_seen:
+            raise MalformedUploadError(f"Missing '{file_field}' file part")
+    except FormParserError as e:
+        os.unlink(path)
+        raise MalformedUploadError(f"Malformed multipart body: {e}")
+    except BaseException:
+        os.unlink(path)
+        raise
+    logger.info(f"Received {state.file_bytes} byte upload")
+    return path, state.fields
@@ -0,0 +1,115 @@
+"""
+Energy-based voice-activity detection for uploaded recordings.
+
+Runs between audio conversion and transcription on 16-bit mono PCM. Frames are
+classified as speech when their energy clears an adaptive threshold above the
+recording's noise floor; all frame math is vectorized with NumPy. The floor is
+capped at an absolute level, and a recording with no quiet stretch to measure
+it from (speech from end to end) is gated at that level instead. Leading and
+trailing silence is trimmed, recordings with no speech are rejected before any
+STT call, and long pauses split a recording into separate utterances.
+"""
+import logging
+import os
+import tempfile
+import wave
+from typing import List, Tuple
+
+logger = logging.getLogger('MultiAgentOrchestrator')
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+    logger.warning("NumPy is not installed; voice-activity detection is disabled.")
+
+VAD_ENABLED = os.getenv('VAD_ENABLED', 'true').lower() == 'true' and np is not None
+VAD_FRAME_MS = 30
+VAD_THRESHOLD_DB = float(os.getenv('VAD_THRESHOLD_DB', '12'))   # above the noise floor
+VAD_MIN_ENERGY_DBFS = float(os.getenv('VAD_MIN_ENERGY_DBFS', '-50'))
+VAD_MAX_NOISE_FLOOR_DBFS = float(os.getenv('VAD_MAX_NOISE_FLOOR_DBFS', '-40'))
+VAD_PADDING_MS = int(os.getenv('VAD_PADDING_MS', '200'))
+VAD_MIN_SPEECH_MS = int(os.getenv('VAD_MIN_SPEECH_MS', '150'))
+VAD_SPLIT_SILENCE_MS = int(os.getenv('VAD_SPLIT_SILENCE_MS', '800'))
+VAD_MAX_UTTERANCE_SECONDS = float(os.getenv('VAD_MAX_UTTERANCE_SECONDS', '30'))
+
+
+def frame_energies_db(samples, frame_length: int):
+    """Per-frame RMS energy in dBFS for int16 samples; a trailing partial frame is dropped."""
+    n_frames = len(samples) // frame_length
+    frames = samples[:n_frames * frame_length].astype(np.float32).reshape(n_frames, frame_length) / 32768.0
+    rms = np.sqrt(np.mean(frames * frames, axis=1))
+    return 20.0 * np.log10(np.maximum(rms, 1e-10))
+
+
+def speech_segments(samples, sample_rate: int) -> List[Tuple[int, int]]:
+    """Speech regions as (start, end) sample offsets, padded, merged across short pauses and length-capped."""
+    frame_length = sample_rate * VAD_FRAME_MS // 1000
+    energies = frame_energies_db(samples, frame_length)
+    if energies.size == 0:
+        return []
+    quiet, loud = np.percentile(energies, [10, 90])
+    if loud - quiet < VAD_THRESHOLD_DB:
+        # Too little spread to tell speech from noise: the 10th percentile is not a noise floor.
+        threshold = VAD_MAX_NOISE_FLOOR_DBFS
+    else:
+        threshold = min(quiet, VAD_MAX_NOISE_FLOOR_DBFS) + VAD_THRESHOLD_DB
+    speech = energies > max(threshold, VAD_MIN_ENERGY_DBFS)
+
+    # Pad speech on both sides so word onsets and tails are not clipped.
+    pad = VAD_PADDING_MS // VAD_FRAME_MS
+    if pad:
+        speech = np.convolve(speech.astype(np.int8), np.ones(2 * pad + 1, dtype=np.int8), mode='same') > 0
+
+    # Run boundaries: indices where the mask flips.
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], speech.astype(np.int8), [0]))))
+    runs = list(zip(edges[0::2], edges[1::2]))
+
+    split_gap = VAD_SPLIT_SILENCE_MS // VAD_FRAME_MS
+    merged = []
+    for start, end in runs:
+        if merged and start - merged[-1][1] < split_gap:
+            merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+
+    min_frames = max(1, VAD_MIN_SPEECH_MS // VAD_FRAME_MS)
+    max_frames = int(VAD_MAX_UTTERANCE_SECONDS * 1000 // VAD_FRAME_MS)
+    segments = []
+    for start, end in merged:
+        if end - start < min_frames:
+            continue
+        for chunk_start in range(start, end, max_frames):
+            chunk_end = min(chunk_start + max_frames, end)
+            segments.append((int(chunk_start) * frame_length, int(chunk_end) * frame_length))
+    return segments
+
+
+def split_utterances(wav_path: str) -> List[str]:
+    """
+    Writes each detected utterance of a 16-bit mono WAV to its own temp file and
+    returns the paths (empty when there is no speech). With VAD disabled, or for
+    formats it cannot read, the original path is returned unchanged.
+    """
+    if not VAD_ENABLED:
+        return [wav_path]
+    with wave.open(wav_path, 'rb') as wav:
+        if wav.getsampwidth() != 2 or wav.getnchannels() != 1:
+            return [wav_path]
+        sample_rate = wav.getframerate()
+        samples = np.frombuffer(wav.readframes(wav.getnframes()), dtype='<i2')
+
+    segments = speech_segments(samples, sample_rate)
+    logger.info(f"VAD kept {sum(e - s for s, e in segments) / sample_rate:.2f}s of "
+                f"{len(samples) / sample_rate:.2f}s in {len(segments)} utterance(s)")
+    paths = []
+    for start, end in segments:
+        fd, path = tempfile.mkstemp(suffix='.wav')
+        os.close(fd)
+        with wave.open(path, 'wb') as out:
+            out.setnchannels(1)
+            out.setsampwidth(2)
+            out.setframerate(sample_rate)
+            out.writeframes(samples[start:end].tobytes())
+        paths.append(path)
+    return paths